@@ -0,0 +1,218 @@
+# account_cache.py
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from types import SimpleNamespace
+
+import strategy
+
+logger = logging.getLogger('bot')
+
+# bot_state field holding the JSON account snapshot the bot publishes
+SNAPSHOT_FIELD = 'account'
+
+
+def snapshot_fields(account):
+    """
+    The account fields callers use, as plain values.
+    """
+    status = account.status
+    return {
+        'buying_power': float(account.buying_power),
+        'cash': float(account.cash),
+        'status': str(getattr(status, 'value', status)),
+    }
+
+
+class AccountCache:
+    """
+    Last account snapshot fetched from Alpaca, trusted for max_age seconds.
+
+    The per-entry budget (a third of buying power) is computed when the
+    snapshot arrives, so sizing an order is one division and entering a
+    position needs no REST call while the snapshot is fresh. Concurrent
+    refreshes share one request, and listeners are called with the cache
+    whenever the snapshot changes (the bot publishes it to Redis).
+    """
+
+    def __init__(self, fetch, max_age=90.0):
+        self._fetch = fetch
+        self.max_age = max_age
+        self.account = None
+        self.cash = None
+        self.buying_power = None
+        self.entry_budget = None
+        self.fetched_at = None
+        self.fetches = 0
+        self.listeners = []
+        self._generation = 0
+        self._inflight = None
+        self._inflight_generation = None
+
+    def is_fresh(self):
+        return self.fetched_at is not None and time.monotonic() - self.fetched_at < self.max_age
+
+    def invalidate(self):
+        """
+        Marks the snapshot stale, e.g. after a fill changed the balances.
+        Fetches already in flight will not overwrite it.
+        """
+        self._generation += 1
+        self.fetched_at = None
+
+    def snapshot(self):
+        """
+        Returns the current snapshot as plain values, or None before the first fetch.
+        """
+        if self.account is None:
+            return None
+        fields = snapshot_fields(self.account)
+        fields.update(cash=self.cash, buying_power=self.buying_power)
+        return fields
+
+    def restore(self, fields):
+        """
+        Loads balances saved before a restart (as returned by snapshot()).
+        They stay stale, so the next entry still fetches the account, but
+        the balance is known and published straight away.
+        """
+        if self.account is not None:
+            return
+        self.account = SimpleNamespace(**fields)
+        self.cash = float(fields['cash'])
+        self.buying_power = float(fields['buying_power'])
+        self.entry_budget = self.buying_power / strategy.BUYING_POWER_DIVISOR
+        self._notify()
+
+    async def refresh(self):
+        """
+        Fetches a new snapshot with the async fetch(). Callers arriving while a
+        fetch started after the last invalidate() is running wait for it.
+        """
+        if self._inflight is None or self._inflight_generation != self._generation:
+            self._inflight_generation = self._generation
+            self._inflight = asyncio.ensure_future(self._refresh(self._generation))
+        return await asyncio.shield(self._inflight)
+
+    async def _refresh(self, generation):
+        try:
+            account = await self._fetch()
+        finally:
+            if self._inflight_generation == generation:
+                self._inflight = None
+        self.fetches += 1
+        if generation == self._generation:
+            self.account = account
+            self.cash = float(account.cash)
+            self.buying_power = float(account.buying_power)
+            self.entry_budget = self.buying_power / strategy.BUYING_POWER_DIVISOR
+            self.fetched_at = time.monotonic()
+            self._notify()
+        return account
+
+    def _notify(self):
+        for listener in self.listeners:
+            try:
+                listener(self)
+            except Exception as e:
+                logger.error(f"Error publishing account snapshot: {e}")
+
+    def apply_fill(self, cash_delta):
+        """
+        Adjusts the snapshot for a fill reported on the trade-update stream,
+        so it stays usable without a REST call. Fetches already in flight
+        will not overwrite it.
+        """
+        if self.cash is None:
+            return
+        self._generation += 1
+        self.cash += cash_delta
+        self.buying_power += cash_delta
+        self.entry_budget = self.buying_power / strategy.BUYING_POWER_DIVISOR
+        self._notify()
+
+    def refresh_soon(self):
+        """
+        Invalidates the snapshot and refreshes it in the background.
+        """
+        self.invalidate()
+        task = asyncio.create_task(self.refresh())
+        task.add_done_callback(self._log_refresh_error)
+        return task
+
+    @staticmethod
+    def _log_refresh_error(task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Error refreshing account snapshot: {task.exception()}")
+
+    async def get_entry_budget(self):
+        """
+        Returns the cash to spend on one entry, fetching only when stale.
+        """
+        if self.is_fresh():
+            return self.entry_budget
+        account = await self.refresh()
+        return float(account.buying_power) / strategy.BUYING_POWER_DIVISOR
+
+
+class SharedAccountInfo:
+    """
+    Account snapshot for synchronous callers outside the bot's event loop
+    (the web app and helper scripts).
+
+    The snapshot the bot publishes to Redis is used while it is younger
+    than max_age. Otherwise fetch() is called, at most once per max_age:
+    threads that ask while a fetch is running wait for it and share it.
+    Without fetch, a missing snapshot returns None, so the web dyno never
+    calls Alpaca.
+    """
+
+    def __init__(self, redis_client=None, fetch=None, max_age=120.0, key='bot_state'):
+        self.redis_client = redis_client
+        self._fetch = fetch
+        self.max_age = max_age
+        self.key = key
+        self.fetches = 0
+        self._cached = None
+        self._cached_at = None
+        self._lock = threading.Lock()
+
+    def published(self):
+        """
+        Returns the snapshot published to Redis if it is fresh enough.
+        """
+        if self.redis_client is None:
+            return None
+        try:
+            raw = self.redis_client.hget(self.key, SNAPSHOT_FIELD)
+        except Exception as e:
+            logger.error(f"Error reading account snapshot from Redis: {e}")
+            return None
+        if raw is None:
+            return None
+        snapshot = json.loads(raw)
+        if time.time() - snapshot.get('updated_at', 0) >= self.max_age:
+            return None
+        return snapshot
+
+    def _fresh(self):
+        return self._cached_at is not None and time.monotonic() - self._cached_at < self.max_age
+
+    def get(self):
+        """
+        Returns {'buying_power', 'cash', 'status', 'updated_at'}, or None.
+        """
+        snapshot = self.published()
+        if snapshot is not None or self._fetch is None:
+            return snapshot
+        if not self._fresh():
+            with self._lock:
+                # Another thread may have fetched it while we waited
+                if not self._fresh():
+                    self._cached = dict(snapshot_fields(self._fetch()), updated_at=time.time())
+                    self._cached_at = time.monotonic()
+                    self.fetches += 1
+        return self._cached
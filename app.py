@@ -1,14 +1,23 @@
 # app.py
 
-from flask import Flask, render_template_string, request, redirect, url_for, flash
+from flask import Flask, Response, request, redirect, url_for, jsonify
 import logging
 import os
 from flask_httpauth import HTTPBasicAuth
 import redis
 import json
-import ssl
+import queue
+import threading
+import time
 import traceback
 
+from command_bus import make_command
+from bars import DEFAULT_HISTORY, bars_key
+from symbols import parse_symbols
+from metrics import render_prometheus
+from redis_state import redis_tls_kwargs
+from strategy import DEFAULT_ENTRY_THRESHOLD
+
 app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'supersecretkey')  # For flashing messages
 
@@ -31,15 +40,8 @@ def verify_password(username, password):
 REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379')
 
 try:
-    if REDIS_URL.startswith('rediss://'):
-        # SSL/TLS connection to Heroku Redis
-        redis_client = redis.Redis.from_url(
-            REDIS_URL,
-            ssl_cert_reqs=None  # Disables SSL certificate verification
-        )
-    else:
-        # Non-SSL connection (local development)
-        redis_client = redis.Redis.from_url(REDIS_URL)
+    # TLS options are chosen the same way as in the bot
+    redis_client = redis.Redis.from_url(REDIS_URL, **redis_tls_kwargs(REDIS_URL))
 
     # Test the Redis connection
     redis_client.ping()
@@ -48,53 +50,114 @@ except Exception as e:
     app.logger.error(f"Redis connection error: {e}")
     redis_client = None  # Set redis_client to None to prevent further errors
 
-# Shared configuration dictionary
-config = {
-    'ENTRY_THRESHOLD': 60000  # Default value
-}
+# Nothing below is changed after import, so any number of gunicorn workers
+# serve the same pages; all live state is read from Redis per request
 
-# In-memory log storage (for simplicity)
-log_messages = []
+# The bot appends its log records to this capped Redis Stream
+LOG_STREAM_KEY = 'bot_logs'
+LOG_FETCH_LIMIT = int(os.environ.get('LOG_FETCH_LIMIT', 200))
 
-@app.route('/')
-@auth.login_required
-def index():
-    try:
-        if redis_client is None:
-            return "Redis connection failed. Please try again later.", 500
+# The bot publishes changed bot_state fields on this channel
+STATE_CHANNEL = 'bot_state_updates'
+SSE_HEARTBEAT_INTERVAL = 15
+# Updates a slow /stream client may fall behind before it is resynced
+SSE_CLIENT_QUEUE = int(os.environ.get('SSE_CLIENT_QUEUE', 100))
 
-        # Retrieve bot state from Redis
-        try:
-            bot_state = redis_client.hgetall('bot_state')
-        except Exception as e:
-            app.logger.error(f"Error retrieving bot state: {e}")
-            bot_state = {}
-
-        # Convert bytes to appropriate types
-        state = {}
-        for key, value in bot_state.items():
-            key = key.decode('utf-8')
-            if key == 'position':
-                state[key] = json.loads(value.decode('utf-8'))
-            else:
-                try:
-                    state[key] = float(value)
-                except ValueError:
-                    state[key] = value.decode('utf-8')
-
-        # Ensure all expected keys are present
-        state.setdefault('status', 'Unknown')
-        state.setdefault('latest_price', 'N/A')
-        state.setdefault('account_balance', 'N/A')
-        state.setdefault('position', None)
-        state.setdefault('pnl', 'N/A')
-
-        return render_template_string('''
+# Put in a client's queue when it may have missed updates
+RESYNC = object()
+
+
+class StateBroadcaster:
+    """
+    One bot_state_updates subscription per web worker, fanned out to every
+    /stream client through its own queue, so Redis sees one pubsub
+    connection per worker instead of one per browser. The subscriber
+    thread starts with the first client, i.e. after gunicorn has forked.
+    A client whose queue fills up, and every client after a reconnect, is
+    sent RESYNC instead of the updates it missed.
+    """
+
+    def __init__(self, redis_client, channel, queue_size=SSE_CLIENT_QUEUE):
+        self.redis_client = redis_client
+        self.channel = channel
+        self.queue_size = queue_size
+        self.clients = set()
+        self.subscribed = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self):
+        """
+        Returns a new client queue once the channel is subscribed.
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='state-broadcaster', daemon=True)
+                self._thread.start()
+        self.subscribed.wait(timeout=5)
+        client = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self.clients.add(client)
+        return client
+
+    def unsubscribe(self, client):
+        with self._lock:
+            self.clients.discard(client)
+
+    def _send(self, item):
+        with self._lock:
+            clients = list(self.clients)
+        for client in clients:
+            try:
+                client.put_nowait(item)
+            except queue.Full:
+                # Too far behind: drop its backlog and send a fresh snapshot
+                while True:
+                    try:
+                        client.get_nowait()
+                    except queue.Empty:
+                        break
+                client.put_nowait(RESYNC)
+
+    def _run(self):
+        while True:
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                if self.subscribed.is_set():
+                    # Updates may have been published while reconnecting
+                    self._send(RESYNC)
+                self.subscribed.set()
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self._send(message['data'].decode('utf-8'))
+            except Exception as e:
+                app.logger.error(f"State subscription lost: {e}")
+                time.sleep(1)
+            finally:
+                pubsub.close()
+
+state_broadcaster = StateBroadcaster(redis_client, STATE_CHANNEL) if redis_client is not None else None
+
+# Incremented by the bot on every bot_state write (see StatePublisher)
+STATE_VERSION_KEY = 'bot_state:version'
+# Seconds a browser may reuse an /api/state response (never shared caches)
+API_STATE_MAX_AGE = int(os.environ.get('API_STATE_MAX_AGE', 1))
+
+# Each bot worker writes its metrics snapshot to a field of this hash
+METRICS_KEY = 'bot_metrics'
+
+# Chart symbol and the most bars one /bars request returns
+CHART_SYMBOL = parse_symbols(os.environ.get('SYMBOLS', 'BTC/USD'))[0]
+BARS_FETCH_LIMIT = 500
+
+# Dashboard page shell; live values arrive over /stream
+INDEX_TEMPLATE = '''
             <!DOCTYPE html>
             <html>
             <head>
                 <title>Trading Bot Control Panel</title>
-                <meta http-equiv="refresh" content="5"> <!-- Refresh every 5 seconds -->
                 <style>
                     body { 
                         font-family: Arial, sans-serif; 
@@ -154,6 +217,7 @@ def index():
                         margin-left: 10px;
                     }
                     .flash {
+                        display: none;
                         padding: 10px;
                         background-color: #d4edda;
                         color: #155724;
@@ -169,6 +233,13 @@ def index():
                         font-size: 16px;
                         margin-right: 10px;
                     }
+                    .chart canvas {
+                        width: 100%;
+                        height: 300px;
+                        background-color: #fff;
+                        border-radius: 5px;
+                        box-shadow: 0 0 10px rgba(0,0,0,0.1);
+                    }
                 </style>
             </head>
             <body>
@@ -176,98 +247,389 @@ def index():
                     <div class="header">
                         <h1>Trading Bot Control Panel</h1>
                     </div>
-                    {% with messages = get_flashed_messages() %}
-                      {% if messages %}
-                        {% for message in messages %}
-                          <div class="flash">{{ message }}</div>
-                        {% endfor %}
-                      {% endif %}
-                    {% endwith %}
+                    <div class="flash" id="flash"></div>
                     <div class="status">
-                        <h2>Bot Status: {{ state['status'] }}</h2>
-                        <p>Latest Price: ${{ state['latest_price'] }}</p>
-                        <p>Account Balance: ${{ state['account_balance'] }}</p>
-                        {% if state['position'] %}
-                            <p>Current Position: {{ state['position']['qty'] }} units at entry price ${{ state['position']['entry_price'] }}</p>
-                            <p>Current P/L: ${{ state['pnl'] }}</p>
-                        {% else %}
-                            <p>No open positions.</p>
-                        {% endif %}
+                        <h2>Bot Status: <span id="status">Unknown</span></h2>
+                        <p>Latest Price: $<span id="latest_price">N/A</span></p>
+                        <p>Account Balance: $<span id="account_balance">N/A</span></p>
+                        <p>Buying Power: $<span id="buying_power">N/A</span> (account <span id="account_status">N/A</span>)</p>
+                        <div id="position_info" style="display: none;">
+                            <p>Current Position: <span id="position_qty"></span> units at entry price $<span id="position_entry_price"></span></p>
+                            <p>Current P/L: $<span id="pnl">N/A</span></p>
+                        </div>
+                        <p id="no_position">No open positions.</p>
                     </div>
                     <div class="threshold-form">
                         <h2>Configure Entry Threshold</h2>
-                        <form action="{{ url_for('update_threshold') }}" method="post">
+                        <form class="command-form" action="{{ url_for('update_threshold') }}" method="post">
                             <label for="entry_threshold">Entry Threshold ($): </label>
-                            <input type="number" id="entry_threshold" name="entry_threshold" min="0" step="100" value="{{ state.get('entry_threshold', config['ENTRY_THRESHOLD']) }}" required>
+                            <input type="number" id="entry_threshold" name="entry_threshold" min="0" step="100" value="{{ default_threshold }}" required>
                             <button type="submit">Update Threshold</button>
                         </form>
                     </div>
                     <div class="actions">
                         <h2>Actions</h2>
-                        <form action="{{ url_for('execute_trade') }}" method="post">
+                        <form class="command-form" action="{{ url_for('execute_trade') }}" method="post">
                             <button type="submit">Execute Trade Now</button>
                         </form>
                     </div>
-                    <h2>Logs</h2>
-                    <div class="logs" id="logContainer">
-                        {% for message in log_messages %}
-                            {% if 'ERROR' in message %}
-                                <span style="color: red;">{{ message }}</span><br>
-                            {% elif 'WARNING' in message %}
-                                <span style="color: orange;">{{ message }}</span><br>
-                            {% elif 'INFO' in message %}
-                                <span style="color: green;">{{ message }}</span><br>
-                            {% else %}
-                                {{ message }}<br>
-                            {% endif %}
-                        {% endfor %}
+                    <div class="chart">
+                        <h2>Chart
+                            <select id="timeframe">
+                                {% for timeframe in timeframes %}<option{% if timeframe == '1m' %} selected{% endif %}>{{ timeframe }}</option>{% endfor %}
+                            </select>
+                        </h2>
+                        <canvas id="chart" width="900" height="300"></canvas>
                     </div>
+                    <h2>Logs</h2>
+                    <div class="logs" id="logContainer"></div>
                 </div>
                 <script>
-                    // Auto-scroll to the bottom of the logs div
+                    // Live bot state: a full snapshot on connect, then only changed fields
+                    var state = {};
+
+                    function formatNumber(value) {
+                        var number = parseFloat(value);
+                        return isNaN(number) ? "N/A" : number.toFixed(2);
+                    }
+
+                    function renderState() {
+                        document.getElementById("status").textContent = state.status || "Unknown";
+                        document.getElementById("latest_price").textContent = formatNumber(state.latest_price);
+                        document.getElementById("account_balance").textContent = formatNumber(state.account_balance);
+                        // Account snapshot published by the bot; the web app never calls Alpaca
+                        var account = state.account ? JSON.parse(state.account) : {};
+                        document.getElementById("buying_power").textContent = formatNumber(account.buying_power);
+                        document.getElementById("account_status").textContent = account.status || "N/A";
+                        var position = state.position ? JSON.parse(state.position) : null;
+                        document.getElementById("position_info").style.display = position ? "" : "none";
+                        document.getElementById("no_position").style.display = position ? "none" : "";
+                        if (position) {
+                            document.getElementById("position_qty").textContent = position.qty;
+                            document.getElementById("position_entry_price").textContent = formatNumber(position.entry_price);
+                            document.getElementById("pnl").textContent = formatNumber(state.pnl);
+                        }
+                        var thresholdInput = document.getElementById("entry_threshold");
+                        if (state.entry_threshold !== undefined && document.activeElement !== thresholdInput) {
+                            thresholdInput.value = parseFloat(state.entry_threshold);
+                        }
+                    }
+
+                    var source = new EventSource("{{ url_for('stream') }}");
+                    source.onmessage = function (event) {
+                        var update = JSON.parse(event.data);
+                        if (update.reset) {
+                            state = {};
+                        }
+                        Object.assign(state, update.set || {});
+                        (update.deleted || []).forEach(function (field) {
+                            delete state[field];
+                        });
+                        renderState();
+                    };
+
+                    // Submit forms in the background and show the reply as a flash message
+                    var flash = document.getElementById("flash");
+                    document.querySelectorAll("form.command-form").forEach(function (form) {
+                        form.addEventListener("submit", function (event) {
+                            event.preventDefault();
+                            fetch(form.action, {method: "POST", body: new FormData(form), headers: {"Accept": "application/json"}})
+                                .then(function (response) { return response.json(); })
+                                .then(function (data) {
+                                    flash.textContent = data.message;
+                                    flash.style.display = "block";
+                                })
+                                .catch(function () {});
+                        });
+                    });
+
+                    // Fetch only records newer than the last stream ID and keep the newest few
                     var logContainer = document.getElementById("logContainer");
-                    logContainer.scrollTop = logContainer.scrollHeight;
+                    var logColors = {ERROR: "red", CRITICAL: "red", WARNING: "orange", INFO: "green"};
+                    var logLimit = {{ log_limit }};
+                    var lastLogId = "";
+
+                    function fetchLogs() {
+                        fetch("{{ url_for('logs') }}?after=" + encodeURIComponent(lastLogId))
+                            .then(function (response) { return response.json(); })
+                            .then(function (data) {
+                                data.records.forEach(function (record) {
+                                    var line = document.createElement("div");
+                                    line.style.color = logColors[record.level] || "";
+                                    line.textContent = record.message;
+                                    logContainer.appendChild(line);
+                                });
+                                while (logContainer.childNodes.length > logLimit) {
+                                    logContainer.removeChild(logContainer.firstChild);
+                                }
+                                if (data.last_id) {
+                                    lastLogId = data.last_id;
+                                }
+                                if (data.records.length) {
+                                    // Auto-scroll to the bottom of the logs div
+                                    logContainer.scrollTop = logContainer.scrollHeight;
+                                }
+                            })
+                            .catch(function () {});
+                    }
+                    fetchLogs();
+                    setInterval(fetchLogs, 2000);
+
+                    // Candlestick chart of closed bars, oldest first: [start, open, high, low, close, ticks]
+                    var chart = document.getElementById("chart");
+                    var timeframeSelect = document.getElementById("timeframe");
+
+                    function drawBars(bars) {
+                        var context = chart.getContext("2d");
+                        context.clearRect(0, 0, chart.width, chart.height);
+                        if (!bars.length) {
+                            return;
+                        }
+                        var high = Math.max.apply(null, bars.map(function (bar) { return bar[2]; }));
+                        var low = Math.min.apply(null, bars.map(function (bar) { return bar[3]; }));
+                        var range = (high - low) || 1;
+                        var step = chart.width / bars.length;
+                        function y(price) {
+                            return chart.height - 10 - (price - low) / range * (chart.height - 20);
+                        }
+                        bars.forEach(function (bar, i) {
+                            var x = i * step + step / 2;
+                            context.strokeStyle = context.fillStyle = bar[4] >= bar[1] ? "#28a745" : "#dc3545";
+                            context.beginPath();
+                            context.moveTo(x, y(bar[2]));
+                            context.lineTo(x, y(bar[3]));
+                            context.stroke();
+                            var top = y(Math.max(bar[1], bar[4]));
+                            context.fillRect(x - step * 0.35, top, Math.max(step * 0.7, 1), Math.max(y(Math.min(bar[1], bar[4])) - top, 1));
+                        });
+                    }
+
+                    function fetchBars() {
+                        fetch("{{ url_for('bars') }}?timeframe=" + encodeURIComponent(timeframeSelect.value))
+                            .then(function (response) { return response.json(); })
+                            .then(function (data) { drawBars(data.bars); })
+                            .catch(function () {});
+                    }
+                    timeframeSelect.addEventListener("change", fetchBars);
+                    fetchBars();
+                    setInterval(fetchBars, 5000);
                 </script>
             </body>
             </html>
-        ''', log_messages=log_messages, config=config, state=state)
+'''
+
+# Parsed and compiled once; rendering it is a plain function call
+index_template = app.jinja_env.from_string(INDEX_TEMPLATE)
+
+@app.route('/')
+@auth.login_required
+def index():
+    html = index_template.render(
+        log_limit=LOG_FETCH_LIMIT, default_threshold=DEFAULT_ENTRY_THRESHOLD, timeframes=list(DEFAULT_HISTORY),
+    )
+    # The page never changes while the app runs; revalidating costs a 304
+    response = Response(html, mimetype='text/html')
+    response.add_etag()
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def state_etag():
+    """
+    ETag of the state /api/state would return: the bot_state version plus
+    the entry threshold, read in one round trip.
+    """
+    version, entry_threshold = redis_client.pipeline().get(STATE_VERSION_KEY).hget('bot_config', 'ENTRY_THRESHOLD').execute()
+    return f"{int(version or 0)}-{(entry_threshold or b'').decode('utf-8')}"
+
+def read_state_fields():
+    """
+    Returns the bot_state hash plus the configured entry threshold, as
+    strings, and their ETag, all from one consistent round trip.
+    """
+    version, state, entry_threshold = (
+        redis_client.pipeline().get(STATE_VERSION_KEY).hgetall('bot_state').hget('bot_config', 'ENTRY_THRESHOLD').execute()
+    )
+    fields = {key.decode('utf-8'): value.decode('utf-8') for key, value in state.items()}
+    fields['entry_threshold'] = entry_threshold.decode('utf-8') if entry_threshold is not None else str(DEFAULT_ENTRY_THRESHOLD)
+    return fields, f"{int(version or 0)}-{(entry_threshold or b'').decode('utf-8')}"
+
+@app.route('/api/state')
+@auth.login_required
+def api_state():
+    """
+    The bot_state fields as JSON. Answers 304 when the caller's ETag is
+    current, without reading the hash.
+    """
+    if redis_client is None:
+        return jsonify({'error': "Redis connection failed."}), 503
+
+    etag = state_etag() if request.if_none_match else None
+    if etag is not None and request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+    else:
+        fields, etag = read_state_fields()
+        response = jsonify(fields)
+        response.set_etag(etag)
+    # Account and position data behind auth: only the browser may keep it
+    response.cache_control.private = True
+    response.cache_control.max_age = API_STATE_MAX_AGE
+    response.vary.add('Authorization')
+    return response
+
+@app.route('/stream')
+@auth.login_required
+def stream():
+    """
+    Server-Sent Events feed of bot_state: one snapshot, then the changed
+    fields the bot publishes on bot_state_updates.
+    """
+    if redis_client is None:
+        return "Redis connection failed. Please try again later.", 500
+
+    def snapshot():
+        return f"data: {json.dumps({'reset': True, 'set': read_state_fields()[0], 'deleted': []})}\n\n"
+
+    def events():
+        # Registered before the snapshot so no update falls in between
+        updates = state_broadcaster.subscribe()
+        try:
+            yield snapshot()
+            while True:
+                try:
+                    data = updates.get(timeout=SSE_HEARTBEAT_INTERVAL)
+                except queue.Empty:
+                    # Comment line keeps the router from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                yield snapshot() if data is RESYNC else f"data: {data}\n\n"
+        finally:
+            state_broadcaster.unsubscribe(updates)
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/logs')
+@auth.login_required
+def logs():
+    """
+    Returns the newest bot log records, or only those after the given stream ID.
+    """
+    if redis_client is None:
+        return jsonify({'records': [], 'last_id': None}), 503
+
+    after = request.args.get('after')
+    try:
+        if after:
+            # Exclusive range: only records newer than the last one the page has
+            entries = redis_client.xrange(LOG_STREAM_KEY, min='(' + after, max='+', count=LOG_FETCH_LIMIT)
+        else:
+            entries = redis_client.xrevrange(LOG_STREAM_KEY, count=LOG_FETCH_LIMIT)[::-1]
     except Exception as e:
-        app.logger.error(f"An error occurred: {e}")
-        traceback_str = ''.join(traceback.format_exception(None, e, e.__traceback__))
-        app.logger.error(traceback_str)
-        return "An internal error occurred.", 500
+        app.logger.error(f"Error retrieving bot logs: {e}")
+        return jsonify({'records': [], 'last_id': after}), 500
+
+    records = []
+    for entry_id, fields in entries:
+        records.append({
+            'id': entry_id.decode('utf-8'),
+            'ts': float(fields.get(b'ts', 0)),
+            'level': fields.get(b'level', b'').decode('utf-8'),
+            'message': fields.get(b'message', b'').decode('utf-8'),
+        })
+    return jsonify({'records': records, 'last_id': records[-1]['id'] if records else after})
+
+@app.route('/bars')
+@auth.login_required
+def bars():
+    """
+    Returns the newest closed bars for a symbol and timeframe, oldest first.
+    """
+    if redis_client is None:
+        return jsonify({'bars': []}), 503
+
+    symbol = request.args.get('symbol', CHART_SYMBOL).strip().upper()
+    timeframe = request.args.get('timeframe', '1m')
+    if timeframe not in DEFAULT_HISTORY:
+        return jsonify({'bars': [], 'error': f"Unknown timeframe {timeframe}"}), 400
+    try:
+        limit = min(int(request.args.get('limit', 120)), BARS_FETCH_LIMIT)
+    except ValueError:
+        return jsonify({'bars': [], 'error': "Invalid limit"}), 400
+
+    try:
+        # The bot pushes newest first
+        entries = redis_client.lrange(bars_key(symbol, timeframe), 0, limit - 1)
+    except Exception as e:
+        app.logger.error(f"Error retrieving bars: {e}")
+        return jsonify({'bars': []}), 500
+    return jsonify({'symbol': symbol, 'timeframe': timeframe, 'bars': [json.loads(entry) for entry in reversed(entries)]})
+
+@app.route('/metrics')
+@auth.login_required
+def prometheus_metrics():
+    """
+    Bot metrics in the Prometheus text format, one source label per worker.
+    """
+    if redis_client is None:
+        return "Redis connection failed.", 503
+
+    snapshots = {}
+    now = time.time()
+    for source, value in redis_client.hgetall(METRICS_KEY).items():
+        snapshot = json.loads(value)
+        # How old the worker's last snapshot is; a stopped worker's keeps growing
+        snapshot['gauge'].append({
+            'name': 'metrics_age_seconds', 'help': 'Seconds since the worker published its metrics',
+            'labels': {}, 'value': round(now - snapshot.get('updated_at', now), 3),
+        })
+        snapshots[source.decode('utf-8')] = snapshot
+    return Response(render_prometheus(snapshots), mimetype='text/plain; version=0.0.4')
+
+def form_reply(message, status=200):
+    """
+    Answers a form post: JSON for the dashboard's background requests,
+    otherwise a redirect back to the dashboard.
+    """
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'message': message}), status
+    return redirect(url_for('index'))
 
 @app.route('/update_threshold', methods=['POST'])
 @auth.login_required
 def update_threshold():
     if redis_client is None:
-        flash("Redis connection failed. Cannot update threshold.")
-        return redirect(url_for('index'))
+        return form_reply("Redis connection failed. Cannot update threshold.", 503)
 
     new_threshold = request.form.get('entry_threshold')
-    if new_threshold:
-        try:
-            new_threshold = float(new_threshold)
-            # Update the config in Redis
-            redis_client.hset('bot_config', 'ENTRY_THRESHOLD', new_threshold)
-            flash(f"Entry threshold successfully updated to ${new_threshold:.2f}.")
-        except ValueError:
-            flash("Invalid entry threshold value.")
-    else:
-        flash("No entry threshold value provided.")
-    return redirect(url_for('index'))
+    if not new_threshold:
+        return form_reply("No entry threshold value provided.", 400)
+    try:
+        new_threshold = float(new_threshold)
+    except ValueError:
+        return form_reply("Invalid entry threshold value.", 400)
+
+    # Without a symbol this sets the primary symbol's threshold
+    symbol = request.form.get('symbol', '').strip().upper()
+    field = f'ENTRY_THRESHOLD:{symbol}' if symbol else 'ENTRY_THRESHOLD'
+    state_field = f'entry_threshold:{symbol}' if symbol else 'entry_threshold'
+
+    # Update the config in Redis and tell open dashboards
+    redis_client.hset('bot_config', field, new_threshold)
+    redis_client.publish(STATE_CHANNEL, json.dumps({'set': {state_field: str(new_threshold)}, 'deleted': []}))
+    return form_reply(f"Entry threshold{' for ' + symbol if symbol else ''} successfully updated to ${new_threshold:.2f}.")
 
 @app.route('/execute_trade', methods=['POST'])
 @auth.login_required
 def execute_trade():
     if redis_client is None:
-        flash("Redis connection failed. Cannot execute trade.")
-        return redirect(url_for('index'))
+        return form_reply("Redis connection failed. Cannot execute trade.", 503)
 
-    # Publish command to Redis
-    redis_client.publish('bot_commands', 'execute_trade')
-    flash("Trade execution triggered.")
-    return redirect(url_for('index'))
+    # Publish command to Redis; the bot acknowledges it on bot_command_acks
+    symbol = request.form.get('symbol', '').strip().upper()
+    command = make_command('execute_trade', symbol=symbol) if symbol else make_command('execute_trade')
+    redis_client.publish('bot_commands', json.dumps(command))
+    return form_reply(f"Trade execution triggered (command {command['id']}).")
 
 @app.errorhandler(Exception)
 def handle_exception(e):
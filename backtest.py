@@ -0,0 +1,288 @@
+# backtest.py
+
+import argparse
+import time
+
+import numpy as np
+
+import strategy
+from strategy import PROFIT_TARGET, STOP_LOSS, DEFAULT_ENTRY_THRESHOLD
+
+# Exit reason codes stored in the trades array
+OPEN, TARGET, STOP = 0, 1, 2
+REASONS = {OPEN: 'Open', TARGET: strategy.PROFIT_TARGET_REASON, STOP: strategy.STOP_LOSS_REASON}
+
+TRADE_DTYPE = np.dtype([
+    ('entry_index', np.int64),
+    ('exit_index', np.int64),      # -1 while the position is still open
+    ('entry_price', np.float64),
+    ('exit_price', np.float64),
+    ('qty', np.float64),
+    ('pnl', np.float64),
+    ('reason', np.int8),
+])
+
+# First window scanned for an exit; doubles until an exit is found
+EXIT_SEARCH_WINDOW = 256
+
+
+def load_prices(path, column='close'):
+    """
+    Loads a price array from .npy, .npz (the column key) or a CSV file with
+    a header row.
+    """
+    if path.endswith('.npy'):
+        return np.load(path).astype(np.float64)
+    if path.endswith('.npz'):
+        with np.load(path) as data:
+            return data[column].astype(np.float64)
+    data = np.genfromtxt(path, delimiter=',', names=True)
+    return np.asarray(data[column], dtype=np.float64)
+
+
+def download_bars(symbol, start, end, path):
+    """
+    Downloads 1-minute bars from Alpaca and stores timestamps and closes as .npz.
+    """
+    from datetime import datetime
+    from alpaca.data.historical import CryptoHistoricalDataClient
+    from alpaca.data.requests import CryptoBarsRequest
+    from alpaca.data.timeframe import TimeFrame
+
+    request = CryptoBarsRequest(
+        symbol_or_symbols=symbol,
+        timeframe=TimeFrame.Minute,
+        start=datetime.fromisoformat(start),
+        end=datetime.fromisoformat(end),
+    )
+    bars = CryptoHistoricalDataClient().get_crypto_bars(request).data.get(symbol, [])
+    timestamps = np.array([bar.timestamp.timestamp() for bar in bars], dtype=np.float64)
+    closes = np.array([bar.close for bar in bars], dtype=np.float64)
+    np.savez(path, timestamp=timestamps, close=closes)
+    return len(closes)
+
+
+def _first_exit(prices, start, entry_price, profit_target, stop_loss):
+    """
+    Finds the first tick at or after start where the position would be
+    closed. Scans growing windows so the cost follows the trade's length.
+    """
+    window = EXIT_SEARCH_WINDOW
+    n = len(prices)
+    while start < n:
+        chunk = prices[start:start + window]
+        # Same arithmetic as strategy.profit_percentage, element-wise
+        profit = ((chunk - entry_price) / entry_price) * 100
+        target = profit >= profit_target
+        hit = target | (profit <= stop_loss)
+        if hit.any():
+            offset = int(hit.argmax())
+            return start + offset, TARGET if target[offset] else STOP
+        start += window
+        window *= 2
+    return -1, OPEN
+
+
+def find_trades(prices, entry_threshold=DEFAULT_ENTRY_THRESHOLD, profit_target=PROFIT_TARGET, stop_loss=STOP_LOSS):
+    """
+    Returns (entry_index, exit_index, reason) arrays for the bot's rules
+    replayed over prices. The loop runs once per trade, not once per tick.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    candidates = np.flatnonzero(prices <= entry_threshold)
+    entries, exits, reasons = [], [], []
+    start = 0
+    while True:
+        k = np.searchsorted(candidates, start)
+        if k == len(candidates):
+            break
+        entry = int(candidates[k])
+        # The entry tick opens the position; exits are checked from the next tick
+        exit_, reason = _first_exit(prices, entry + 1, prices[entry], profit_target, stop_loss)
+        entries.append(entry)
+        exits.append(exit_)
+        reasons.append(reason)
+        if exit_ < 0:
+            break
+        # The exit tick closes the position; entries are checked from the next tick
+        start = exit_ + 1
+    return (np.array(entries, dtype=np.int64), np.array(exits, dtype=np.int64),
+            np.array(reasons, dtype=np.int8))
+
+
+def _summarize(trades, equity, initial_cash):
+    running_max = np.maximum.accumulate(equity)
+    drawdown = running_max - equity
+    closed = trades[trades['exit_index'] >= 0]
+    return {
+        'trades': trades,
+        'equity': equity,
+        'num_trades': len(trades),
+        'wins': int((closed['pnl'] > 0).sum()),
+        'losses': int((closed['pnl'] <= 0).sum()),
+        'pnl': float(equity[-1] - initial_cash) if len(equity) else 0.0,
+        'return_pct': float((equity[-1] / initial_cash - 1) * 100) if len(equity) else 0.0,
+        'max_drawdown': float(drawdown.max()) if len(equity) else 0.0,
+        'max_drawdown_pct': float((drawdown / running_max).max() * 100) if len(equity) else 0.0,
+    }
+
+
+def run_backtest(prices, entry_threshold=DEFAULT_ENTRY_THRESHOLD, profit_target=PROFIT_TARGET,
+                 stop_loss=STOP_LOSS, initial_cash=10000.0):
+    """
+    Vectorized replay of the threshold / profit-target / stop-loss strategy.
+    Each entry buys with a third of the cash, as the bot does with buying
+    power, and fills at the tick's price.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    n = len(prices)
+    entries, exits, reasons = find_trades(prices, entry_threshold, profit_target, stop_loss)
+
+    trades = np.zeros(len(entries), dtype=TRADE_DTYPE)
+    trades['entry_index'] = entries
+    trades['exit_index'] = exits
+    trades['reason'] = reasons
+    trades['entry_price'] = prices[entries]
+    closed = exits >= 0
+    trades['exit_price'] = np.where(closed, prices[np.where(closed, exits, 0)], np.nan)
+
+    # Cash before each trade compounds by the third of it that was invested
+    growth = np.where(closed, 1 + (trades['exit_price'] / trades['entry_price'] - 1) / strategy.BUYING_POWER_DIVISOR, 1.0)
+    cash_before = initial_cash * np.concatenate(([1.0], np.cumprod(growth)[:-1]))
+    trades['qty'] = (cash_before / strategy.BUYING_POWER_DIVISOR) / trades['entry_price']
+    trades['pnl'] = np.where(closed, (trades['exit_price'] - trades['entry_price']) * trades['qty'], 0.0)
+    cash_after = cash_before + trades['pnl']
+
+    # Mark-to-market equity per tick
+    ticks = np.arange(n)
+    trade_of_tick = np.searchsorted(entries, ticks, side='right') - 1
+    has_trade = trade_of_tick >= 0
+    t = np.where(has_trade, trade_of_tick, 0)
+    if len(trades):
+        open_exit = np.where(exits >= 0, exits, n)
+        in_position = has_trade & (ticks < open_exit[t])
+        held = cash_before[t] - trades['qty'][t] * trades['entry_price'][t] + trades['qty'][t] * prices
+        equity = np.where(in_position, held, np.where(has_trade, cash_after[t], initial_cash))
+    else:
+        equity = np.full(n, initial_cash)
+    return _summarize(trades, equity, initial_cash)
+
+
+def reference_replay(prices, entry_threshold=DEFAULT_ENTRY_THRESHOLD, profit_target=PROFIT_TARGET,
+                     stop_loss=STOP_LOSS, initial_cash=10000.0):
+    """
+    Per-tick replay of the on_quote decisions, used to check run_backtest.
+    """
+    cash = initial_cash
+    position = None
+    rows = []
+    equity = np.empty(len(prices))
+    for i, price in enumerate(prices):
+        price = float(price)
+        if position is None:
+            if strategy.should_enter(price, entry_threshold):
+                qty = strategy.order_quantity(cash, price)
+                position = [i, price, qty]
+                cash -= qty * price
+        else:
+            entry_index, entry_price, qty = position
+            reason = strategy.exit_reason(strategy.profit_percentage(price, entry_price), profit_target, stop_loss)
+            if reason:
+                cash += qty * price
+                code = TARGET if reason == strategy.PROFIT_TARGET_REASON else STOP
+                rows.append((entry_index, i, entry_price, price, qty, (price - entry_price) * qty, code))
+                position = None
+        equity[i] = cash + (position[2] * price if position else 0.0)
+    if position:
+        entry_index, entry_price, qty = position
+        rows.append((entry_index, -1, entry_price, np.nan, qty, 0.0, OPEN))
+    trades = np.array(rows, dtype=TRADE_DTYPE)
+    return _summarize(trades, equity, initial_cash)
+
+
+def results_match(result, reference, rtol=1e-9):
+    """
+    Returns True when two backtest results agree: identical trade ticks and
+    reasons, and P&L and equity equal up to floating-point rounding.
+    """
+    a, b = result['trades'], reference['trades']
+    if len(a) != len(b):
+        return False
+    for field in ('entry_index', 'exit_index', 'reason'):
+        if not np.array_equal(a[field], b[field]):
+            return False
+    return (np.allclose(a['pnl'], b['pnl'], rtol=rtol)
+            and np.allclose(result['equity'], reference['equity'], rtol=rtol))
+
+
+def synthetic_prices(n, start_price=65000.0, volatility=0.0008, seed=1):
+    """
+    Random-walk prices, roughly 1-minute BTC bars.
+    """
+    rng = np.random.default_rng(seed)
+    return start_price * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+
+
+def print_summary(result):
+    print(f"Trades: {result['num_trades']} ({result['wins']} wins, {result['losses']} losses)")
+    print(f"P&L: ${result['pnl']:.2f} ({result['return_pct']:.2f}%)")
+    print(f"Max drawdown: ${result['max_drawdown']:.2f} ({result['max_drawdown_pct']:.2f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest the threshold / profit-target / stop-loss strategy')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Backtest over stored prices')
+    source = run_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--prices', help='.npy, .npz or CSV price file')
+    source.add_argument('--synthetic', type=int, help='Use N random-walk prices instead')
+    run_parser.add_argument('--column', default='close')
+    run_parser.add_argument('--entry-threshold', type=float, default=DEFAULT_ENTRY_THRESHOLD)
+    run_parser.add_argument('--profit-target', type=float, default=PROFIT_TARGET)
+    run_parser.add_argument('--stop-loss', type=float, default=STOP_LOSS)
+    run_parser.add_argument('--cash', type=float, default=10000.0)
+    run_parser.add_argument('--verify', action='store_true', help='Check against the per-tick reference replay')
+    run_parser.add_argument('--trades', action='store_true', help='List every trade')
+
+    fetch_parser = subparsers.add_parser('fetch', help='Download 1-minute bars from Alpaca')
+    fetch_parser.add_argument('--symbol', default='BTC/USD')
+    fetch_parser.add_argument('--start', required=True, help='ISO date, e.g. 2024-01-01')
+    fetch_parser.add_argument('--end', required=True)
+    fetch_parser.add_argument('--out', required=True, help='Output .npz file')
+
+    args = parser.parse_args()
+
+    if args.command == 'fetch':
+        count = download_bars(args.symbol, args.start, args.end, args.out)
+        print(f"Saved {count} bars to {args.out}")
+        return
+
+    prices = synthetic_prices(args.synthetic) if args.synthetic else load_prices(args.prices, args.column)
+    params = dict(entry_threshold=args.entry_threshold, profit_target=args.profit_target,
+                  stop_loss=args.stop_loss, initial_cash=args.cash)
+
+    started = time.perf_counter()
+    result = run_backtest(prices, **params)
+    elapsed = time.perf_counter() - started
+    print(f"Backtested {len(prices)} prices in {elapsed * 1000:.1f} ms")
+    print_summary(result)
+
+    if args.trades:
+        for trade in result['trades']:
+            print(f"  {trade['entry_index']:>8} -> {trade['exit_index']:>8}  "
+                  f"{trade['entry_price']:.2f} -> {trade['exit_price']:.2f}  "
+                  f"P&L ${trade['pnl']:.2f}  {REASONS[int(trade['reason'])]}")
+
+    if args.verify:
+        started = time.perf_counter()
+        reference = reference_replay(prices, **params)
+        elapsed = time.perf_counter() - started
+        matched = results_match(result, reference)
+        print(f"Reference replay in {elapsed * 1000:.1f} ms: {'match' if matched else 'MISMATCH'}")
+        if not matched:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
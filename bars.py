@@ -0,0 +1,183 @@
+# bars.py
+
+import json
+import time
+
+# Bars kept in Redis per symbol and timeframe: an hour of 1s bars, a day
+# of 1m bars, a week of 5m bars and 90 days of 1h bars
+DEFAULT_HISTORY = {'1s': 3600, '1m': 1440, '5m': 2016, '1h': 2160}
+
+UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_timeframe(name):
+    """
+    Returns the length in seconds of a timeframe such as '5m'.
+    """
+    try:
+        return int(name[:-1]) * UNITS[name[-1]]
+    except (KeyError, ValueError):
+        raise ValueError(f"Invalid timeframe {name!r}; use e.g. 1s, 1m, 5m, 1h") from None
+
+
+def bars_key(symbol, timeframe):
+    return f'bars:{symbol}:{timeframe}'
+
+
+def quote_seconds(timestamp):
+    """
+    Seconds since the epoch for a quote timestamp: a datetime from the
+    live stream, nanoseconds from a tick file, or None for now.
+    """
+    if timestamp is None:
+        return time.time()
+    if isinstance(timestamp, (int, float)):
+        return timestamp / 1e9
+    return timestamp.timestamp()
+
+
+class Bar:
+    """
+    One OHLC bar. ticks is the number of quotes it covers (quotes carry no
+    traded volume).
+    """
+    __slots__ = ('start', 'open', 'high', 'low', 'close', 'ticks')
+
+    def __init__(self, start, open, high, low, close, ticks):
+        self.start = start
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.ticks = ticks
+
+    def as_list(self):
+        return [self.start, self.open, self.high, self.low, self.close, self.ticks]
+
+    def to_json(self):
+        return json.dumps(self.as_list())
+
+
+class BarBuilder:
+    """
+    Builds bars for several timeframes in one pass over the quotes.
+
+    Only the finest timeframe is touched per quote. When one of its bars
+    closes it is folded into the next timeframe, whose closed bars are
+    folded into the one after, and so on, so the per-quote cost does not
+    depend on how many timeframes there are. Closed bars collect in
+    `closed` as (timeframe, Bar) until drained.
+    """
+
+    def __init__(self, timeframes=('1s', '1m', '5m', '1h')):
+        self.timeframes = tuple(timeframes)
+        self.sizes = [parse_timeframe(name) for name in self.timeframes]
+        for finer, coarser in zip(self.sizes, self.sizes[1:]):
+            if coarser <= finer or coarser % finer:
+                raise ValueError(f"Timeframes must each be a multiple of the previous one: {self.timeframes}")
+        self.current = [None] * len(self.sizes)
+        self.closed = []
+        self.last_seconds = None
+
+    def update(self, seconds, price):
+        """
+        Adds one quote at seconds (since the epoch). Quotes older than the
+        current finest bar are folded into it.
+        """
+        self.last_seconds = seconds
+        size = self.sizes[0]
+        start = int(seconds) - int(seconds) % size
+        bar = self.current[0]
+        if bar is None:
+            self.current[0] = Bar(start, price, price, price, price, 1)
+            return
+        if start > bar.start:
+            self._close(0)
+            self.current[0] = Bar(start, price, price, price, price, 1)
+            return
+        if price > bar.high:
+            bar.high = price
+        elif price < bar.low:
+            bar.low = price
+        bar.close = price
+        bar.ticks += 1
+
+    def _close(self, level):
+        bar = self.current[level]
+        self.current[level] = None
+        self.closed.append((self.timeframes[level], bar))
+        if level + 1 < len(self.sizes):
+            self._fold(level + 1, bar)
+
+    def _fold(self, level, finer):
+        size = self.sizes[level]
+        start = finer.start - finer.start % size
+        bar = self.current[level]
+        if bar is not None and start > bar.start:
+            self._close(level)
+            bar = None
+        if bar is None:
+            self.current[level] = Bar(start, finer.open, finer.high, finer.low, finer.close, finer.ticks)
+            return
+        if finer.high > bar.high:
+            bar.high = finer.high
+        if finer.low < bar.low:
+            bar.low = finer.low
+        bar.close = finer.close
+        bar.ticks += finer.ticks
+
+    def close_until(self, seconds):
+        """
+        Closes bars whose period ended by seconds, finest first, so a
+        quiet market still emits them.
+        """
+        for level, size in enumerate(self.sizes):
+            bar = self.current[level]
+            if bar is not None and bar.start + size <= seconds:
+                self._close(level)
+
+    def partial(self, timeframe):
+        """
+        The open bar for timeframe, including the finer bars not yet
+        folded into it, or None.
+        """
+        level = self.timeframes.index(timeframe)
+        size = self.sizes[level]
+        bars = [bar for bar in self.current[:level + 1] if bar is not None]
+        if not bars:
+            return None
+        # A coarser open bar from an earlier period is about to close
+        period = bars[0].start - bars[0].start % size
+        merged = None
+        for bar in reversed(bars):
+            if bar.start - bar.start % size != period:
+                continue
+            if merged is None:
+                merged = Bar(period, bar.open, bar.high, bar.low, bar.close, bar.ticks)
+            else:
+                merged.high = max(merged.high, bar.high)
+                merged.low = min(merged.low, bar.low)
+                merged.close = bar.close
+                merged.ticks += bar.ticks
+        return merged
+
+    def drain(self):
+        """
+        Returns and forgets the bars closed since the last drain.
+        """
+        closed, self.closed = self.closed, []
+        return closed
+
+
+def queue_bars(pipe, symbol, closed, history=DEFAULT_HISTORY):
+    """
+    Queues closed bars on a Redis pipeline: each timeframe is a list,
+    newest first, trimmed to its history length.
+    """
+    trimmed = set()
+    for timeframe, bar in closed:
+        key = bars_key(symbol, timeframe)
+        pipe.lpush(key, bar.to_json())
+        trimmed.add((key, timeframe))
+    for key, timeframe in trimmed:
+        pipe.ltrim(key, 0, history.get(timeframe, 1000) - 1)
@@ -0,0 +1,716 @@
+# bench.py
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import math
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from array import array
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+# bot.py reads its Alpaca keys at import time
+os.environ.setdefault('API_KEY', 'bench')
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+import bot
+import indicators
+import metrics
+from error_handling import TokenBucket
+from local_redis import LocalRedis
+from sim_exchange import LocalTradingStream, SimulatedTradingClient
+from symbols import plain_symbol
+
+
+def synthetic_quotes(count=None, start_price=65000.0, volatility=0.0005, seed=1, swing=0.0, period=20000):
+    """
+    Generates a random-walk stream of quote objects shaped like Alpaca's.
+    With swing, prices instead follow a sine wave of that relative
+    amplitude and period (in quotes) plus noise, so a threshold at
+    start_price is crossed over and over. With count=None the stream is
+    endless.
+    """
+    rng = random.Random(seed)
+    price = start_price
+    produced = 0
+    while count is None or produced < count:
+        produced += 1
+        if swing:
+            price = start_price * (1 + swing * math.sin(2 * math.pi * produced / period)) * (1 + rng.gauss(0, volatility))
+        else:
+            price *= 1 + rng.gauss(0, volatility)
+        yield SimpleNamespace(symbol=bot.SYMBOL, bid_price=price, ask_price=price * 1.0001,
+                              bid_size=1.0, ask_size=1.0, timestamp=None)
+
+
+def percentile(sorted_values, q):
+    """
+    Nearest-rank percentile of an already sorted sequence.
+    """
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))]
+
+
+def latency_summary(ns_values):
+    """
+    Count, mean and p50/p99/p999/max in microseconds of per-tick timings.
+    """
+    values = sorted(ns_values)
+    return {
+        'count': len(values),
+        'mean_us': round(sum(values) / len(values) / 1000, 2) if values else 0.0,
+        'p50_us': round(percentile(values, 0.5) / 1000, 2),
+        'p99_us': round(percentile(values, 0.99) / 1000, 2),
+        'p999_us': round(percentile(values, 0.999) / 1000, 2),
+        'max_us': round(values[-1] / 1000, 2) if values else 0.0,
+    }
+
+
+async def _measure_loop_lag(interval, lags):
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - expected)
+
+
+async def _baseline_round_trips(redis_client, quote):
+    """
+    The Redis calls the original on_quote made on every tick while in a
+    position, each one a synchronous round trip.
+    """
+    await redis_client.hset('bot_state', 'latest_price', quote.bid_price)
+    await redis_client.hget('bot_config', 'ENTRY_THRESHOLD')
+    await redis_client.hset('bot_state', 'status', 'In Position')
+    await redis_client.hset('bot_state', 'pnl', 0.0)
+    await redis_client.hset('bot_state', 'position', json.dumps({'entry_price': quote.bid_price, 'qty': 1.0}))
+
+
+async def _drive_ticks(redis_client, duration, per_tick=None):
+    bot.set_redis_client(redis_client)
+    bot.bot_running = True
+    bot.load_symbols([bot.SYMBOL])
+    config_lock = asyncio.Lock()
+    lags = []
+    ticks = 0
+    background = [
+        asyncio.create_task(bot.flush_state()),
+        asyncio.create_task(bot.refresh_config()),
+        asyncio.create_task(_measure_loop_lag(0.01, lags)),
+    ]
+    started = time.perf_counter()
+    deadline = started + duration
+    for quote in synthetic_quotes():
+        if per_tick is not None:
+            await per_tick(redis_client, quote)
+        await bot.on_quote(quote, bot.config, config_lock)
+        ticks += 1
+        # A stream reader yields to the loop between messages
+        await asyncio.sleep(0)
+        if ticks % 100 == 0 and time.perf_counter() >= deadline:
+            break
+    elapsed = time.perf_counter() - started
+    bot.bot_running = False
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    return {
+        'ticks': ticks,
+        'seconds': elapsed,
+        'ticks_per_sec': ticks / elapsed,
+        'redis_round_trips': redis_client.round_trips,
+        'max_loop_lag_ms': max(lags, default=0.0) * 1000,
+    }
+
+
+def bench_redis(args):
+    """
+    Ticks/sec through on_quote while Redis has artificial latency.
+    'baseline' adds the original per-tick round trips on a client that
+    blocks the loop, i.e. the bot before state writes were coalesced and
+    bot_config cached; 'sync' and 'asyncio' run today's on_quote, whose
+    only Redis traffic is the background flush, on a blocking and an
+    awaiting client.
+    """
+    latency = args.latency_ms / 1000
+    results = {}
+    for mode, blocking, per_tick in (
+        ('baseline', True, _baseline_round_trips),
+        ('sync', True, None),
+        ('asyncio', False, None),
+    ):
+        fake = LocalRedis(latency=latency, blocking=blocking)
+        results[mode] = asyncio.run(_drive_ticks(fake, args.seconds, per_tick))
+    return {'latency_ms': args.latency_ms, 'results': results}
+
+
+async def _start_simulated_bot(args, lags, **exchange):
+    """
+    Points the bot at LocalRedis and a SimulatedTradingClient, as replay
+    does, and starts its background tasks. Returns (client, local redis,
+    trading stream, tasks).
+    """
+    local_redis = LocalRedis(latency=args.redis_latency_ms / 1000)
+    bot.set_redis_client(local_redis)
+    bot.log_stream_handler.redis_client = None
+    await local_redis.hset('bot_config', 'ENTRY_THRESHOLD', args.start_price)
+    await bot.config_cache.refresh()
+
+    trading_stream = LocalTradingStream() if bot.TRADE_UPDATES else None
+    client = bot.client = SimulatedTradingClient(cash=args.cash, trade_stream=trading_stream, **exchange)
+    # The simulator has no request budget
+    bot.alpaca.bucket = TokenBucket(rate=1e9, capacity=1e9)
+    bot.account_cache.invalidate()
+    bot.bot_running = True
+    bot.load_symbols([bot.SYMBOL])
+    background = [
+        asyncio.create_task(bot.flush_state()),
+        asyncio.create_task(_measure_loop_lag(0.01, lags)),
+    ]
+    if trading_stream is not None:
+        await bot.reconcile_account()
+        background.append(asyncio.create_task(bot.run_trade_updates(trading_stream)))
+    return client, local_redis, trading_stream, background
+
+
+async def _stop_simulated_bot(trading_stream, background):
+    if trading_stream is not None:
+        await trading_stream.drain()
+    bot.bot_running = False
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+
+
+async def _drive_decisions(args):
+    """
+    Runs synthetic quotes through on_quote, with orders going to a
+    SimulatedTradingClient whose calls take --order-latency-ms.
+    """
+    lags = []
+    client, local_redis, trading_stream, background = await _start_simulated_bot(
+        args, lags, latency=args.order_latency_ms / 1000
+    )
+    config_lock = asyncio.Lock()
+    quotes = synthetic_quotes(start_price=args.start_price, swing=args.swing, period=args.period)
+    on_quote = bot.on_quote
+    config = bot.config
+    clock = time.perf_counter_ns
+
+    async def tick(quote):
+        client.set_quote(quote.symbol, quote.bid_price, quote.ask_price)
+        started = clock()
+        await on_quote(quote, config, config_lock)
+        return clock() - started
+
+    for quote in itertools.islice(quotes, args.warmup):
+        await tick(quote)
+        await asyncio.sleep(0)
+
+    # Timed run: every tick, split by whether it started an order
+    decision_ns = array('q')
+    order_ns = array('q')
+    counts = bot.order_manager.counts
+    orders = counts['pending']
+    blocks = sys.getallocatedblocks()
+    started = time.perf_counter()
+    for quote in itertools.islice(quotes, args.ticks):
+        elapsed = await tick(quote)
+        if counts['pending'] != orders:
+            orders = counts['pending']
+            order_ns.append(elapsed)
+        else:
+            decision_ns.append(elapsed)
+        # A stream reader yields to the loop between messages
+        await asyncio.sleep(0)
+    seconds = time.perf_counter() - started
+    blocks = sys.getallocatedblocks() - blocks
+
+    # Allocation run: bytes allocated while handling each tick and still
+    # held after it, traced separately because tracing slows every tick
+    tracemalloc.start()
+    allocated = retained = 0
+    for quote in itertools.islice(quotes, args.alloc_ticks):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        await tick(quote)
+        current, peak = tracemalloc.get_traced_memory()
+        allocated += peak - before
+        retained += current - before
+        await asyncio.sleep(0)
+    tracemalloc.stop()
+    await _stop_simulated_bot(trading_stream, background)
+
+    ticks = len(decision_ns) + len(order_ns)
+    return {
+        'ticks': ticks,
+        'seconds': round(seconds, 3),
+        # Closed loop: the next quote is evaluated as soon as the last one is done
+        'max_ticks_per_sec': round(ticks / seconds),
+        'latency': {
+            'all': latency_summary(decision_ns + order_ns),
+            'decision': latency_summary(decision_ns),
+            'order': latency_summary(order_ns),
+        },
+        'signal_to_submit_ms': bot.signal_to_submit.summary(),
+        'signal_to_order_ack_ms': bot.signal_to_order_ack.summary(),
+        'orders': client.order_count,
+        'allocations': {
+            'ticks': args.alloc_ticks,
+            'bytes_allocated_per_tick': round(allocated / args.alloc_ticks, 1) if args.alloc_ticks else 0.0,
+            'bytes_retained_per_tick': round(retained / args.alloc_ticks, 1) if args.alloc_ticks else 0.0,
+            'blocks_retained_per_tick': round(blocks / ticks, 3),
+        },
+        'redis_round_trips': local_redis.round_trips,
+        'max_loop_lag_ms': round(max(lags, default=0.0) * 1000, 2),
+    }
+
+
+def bench_latency(args):
+    """
+    Tick-to-decision latency of on_quote, including the order path on
+    ticks that trade, the most ticks per second it sustains and the memory
+    it allocates per tick.
+    """
+    return {
+        'order_latency_ms': args.order_latency_ms,
+        'redis_latency_ms': args.redis_latency_ms,
+        'swing': args.swing,
+        'results': asyncio.run(_drive_decisions(args)),
+    }
+
+
+async def _time_on_quote(ticks):
+    """
+    Mean ns per on_quote call on quotes that never trade.
+    """
+    bot.set_redis_client(LocalRedis())
+    bot.log_stream_handler.redis_client = None
+    bot.bot_running = True
+    bot.load_symbols([bot.SYMBOL])
+    bot.config['ENTRY_THRESHOLD'] = 0
+    config_lock = asyncio.Lock()
+    quotes = list(synthetic_quotes(ticks))
+    started = time.perf_counter_ns()
+    for quote in quotes:
+        await bot.on_quote(quote, bot.config, config_lock)
+    elapsed = time.perf_counter_ns() - started
+    bot.bot_running = False
+    return elapsed / ticks
+
+
+def bench_metrics(args):
+    """
+    Per-tick cost of the metrics the quote path records (the statements
+    evaluate_quotes runs around on_quote), compared with on_quote itself
+    and with --budget-ns. Publish-time costs are reported for reference.
+    """
+    clock = time.perf_counter_ns
+    histogram = bot.on_quote_duration
+    count = args.iterations
+
+    started = clock()
+    for _ in range(count):
+        pass
+    empty = clock() - started
+
+    started = clock()
+    for _ in range(count):
+        tick_started = clock()
+        histogram.observe((clock() - tick_started) / 1000)
+    per_tick = max(clock() - started - empty, 0) / count
+
+    on_quote_ns = asyncio.run(_time_on_quote(args.ticks))
+
+    started = clock()
+    snapshot = bot.bot_metrics.snapshot()
+    snapshot_us = (clock() - started) / 1000
+    payload = json.dumps(snapshot)
+    started = clock()
+    text = metrics.render_prometheus({'worker.1': json.loads(payload)})
+    render_us = (clock() - started) / 1000
+    return {
+        'iterations': count,
+        'ns_per_tick': round(per_tick, 1),
+        'budget_ns': args.budget_ns,
+        'within_budget': per_tick <= args.budget_ns,
+        'on_quote_ns': round(on_quote_ns, 1),
+        'overhead_percent': round(per_tick / on_quote_ns * 100, 2),
+        'snapshot_us': round(snapshot_us, 1),
+        'snapshot_bytes': len(payload),
+        'render_us': round(render_us, 1),
+        'exposition_lines': text.count('\n'),
+    }
+
+
+async def _drive_simulation(args):
+    """
+    Runs synthetic quotes through on_quote as fast as possible against a
+    simulator with slippage and fees, as a load test and end-to-end check.
+    """
+    lags = []
+    client, local_redis, trading_stream, background = await _start_simulated_bot(
+        args, lags, slippage_bps=args.slippage_bps, fee_bps=args.fee_bps, order_ack=args.order_ack
+    )
+    # Orders complete before the next quote, as in replay
+    bot.BACKGROUND_ORDERS = False
+    config_lock = asyncio.Lock()
+    on_quote = bot.on_quote
+    config = bot.config
+    started = time.perf_counter()
+    ticks = 0
+    for quote in synthetic_quotes(args.ticks, start_price=args.start_price, swing=args.swing, period=args.period):
+        client.set_quote(quote.symbol, quote.bid_price, quote.ask_price)
+        await on_quote(quote, config, config_lock)
+        ticks += 1
+        if ticks % 1000 == 0:
+            # Let the state flusher and trade updates run
+            await asyncio.sleep(0)
+    seconds = time.perf_counter() - started
+    await _stop_simulated_bot(trading_stream, background)
+
+    bid_price, _ = client.quotes[plain_symbol(bot.SYMBOL)]
+    equity = client.cash + sum(qty for qty, _ in client.positions.values()) * bid_price
+    return {
+        'ticks': ticks,
+        'seconds': round(seconds, 2),
+        'ticks_per_sec': round(ticks / seconds),
+        'orders': client.order_count,
+        'orders_per_sec': round(client.order_count / seconds, 1),
+        'cash': round(client.cash, 2),
+        'fees_paid': round(client.fees_paid, 2),
+        'equity': round(equity, 2),
+        'drift': bot.position_book.diff(client.get_all_positions(), client.cash) if trading_stream else None,
+        'max_loop_lag_ms': round(max(lags, default=0.0) * 1000, 2),
+    }
+
+
+def bench_sim(args):
+    """
+    Ticks and orders per second through on_quote and the simulated
+    exchange, and where the account ends up.
+    """
+    return {
+        'slippage_bps': args.slippage_bps,
+        'fee_bps': args.fee_bps,
+        'swing': args.swing,
+        'period': args.period,
+        'results': asyncio.run(_drive_simulation(args)),
+    }
+
+
+def _quote(price):
+    return SimpleNamespace(symbol=bot.SYMBOL, bid_price=price, ask_price=price * 1.0001,
+                           bid_size=1.0, ask_size=1.0, timestamp=None)
+
+
+async def _settle_orders(trading_stream):
+    """
+    Waits until no order is in flight and every trade update is applied.
+    """
+    while bot.order_tasks or bot.order_manager.orders:
+        await asyncio.sleep(0.001)
+    if trading_stream is not None:
+        await trading_stream.drain()
+
+
+async def _trigger_burst(args, price, tick_ns):
+    """
+    Fires --ticks-per-burst quotes at price, --commands execute_trade
+    commands and --calls direct enter_position calls at once, then keeps
+    feeding quotes until the order they raced for is done. Returns the
+    quotes evaluated while it was in flight.
+    """
+    sym = bot.symbols[bot.SYMBOL]
+    config_lock = asyncio.Lock()
+    bot.client.set_quote(bot.SYMBOL, price, price * 1.0001)
+    # Commands act on the newest price the bot has seen, as they would live
+    sym.latest_price = price
+
+    async def tick():
+        started = time.perf_counter_ns()
+        await bot.on_quote(_quote(price), bot.config, config_lock)
+        tick_ns.append(time.perf_counter_ns() - started)
+
+    triggers = [tick() for _ in range(args.ticks_per_burst)]
+    if not sym.qty:
+        triggers += [bot.handle_execute_trade({'args': {'symbol': bot.SYMBOL}}) for _ in range(args.commands)]
+        triggers += [bot.enter_position(sym) for _ in range(args.calls)]
+    random.shuffle(triggers)
+    await asyncio.gather(*triggers)
+    during_flight = 0
+    while bot.order_manager.orders:
+        await tick()
+        during_flight += 1
+        await asyncio.sleep(0)
+    return during_flight
+
+
+async def _drive_order_stress(args):
+    """
+    Races quotes, web app commands and direct calls to place the same
+    order, round after round, against a simulator whose calls take
+    --order-latency-ms; every round must place exactly one buy and one sell.
+    """
+    lags = []
+    args.start_price = args.price
+    client, local_redis, trading_stream, background = await _start_simulated_bot(
+        args, lags, latency=args.order_latency_ms / 1000, order_ack=args.order_ack
+    )
+    bot.BACKGROUND_ORDERS = True
+    bot.positions_loaded = True
+    sym = bot.symbols[bot.SYMBOL]
+    random.seed(args.seed)
+    tick_ns = array('q')
+    during_flight = 0
+    failures = []
+    started = time.perf_counter()
+    for round_number in range(args.rounds):
+        orders = client.order_count
+        # Below the entry threshold, then far above the profit target
+        during_flight += await _trigger_burst(args, args.price * 0.99, tick_ns)
+        await _settle_orders(trading_stream)
+        if client.order_count - orders != 1 or not sym.qty:
+            failures.append(f"round {round_number}: {client.order_count - orders} buys, qty {sym.qty}")
+        during_flight += await _trigger_burst(args, args.price * 1.2, tick_ns)
+        await _settle_orders(trading_stream)
+        if client.order_count - orders != 2 or sym.qty:
+            failures.append(f"round {round_number}: {client.order_count - orders} orders, qty {sym.qty}")
+    seconds = time.perf_counter() - started
+
+    # Sending an order again with a client order id already used is refused
+    refused = client.duplicates_refused
+    last = client.orders[-1]
+    resent = await bot.place_order(bot.SYMBOL, 0.001, last.side, args.price, last.client_order_id)
+    if resent is not None or client.duplicates_refused != refused + 1:
+        failures.append("an order with a reused client order id was accepted")
+    await _stop_simulated_bot(trading_stream, background)
+
+    stats = bot.order_manager.stats()
+    return {
+        'rounds': args.rounds,
+        'seconds': round(seconds, 2),
+        'orders': client.order_count,
+        'orders_expected': 2 * args.rounds,
+        'blocked_in_flight': stats['blocked'],
+        'orders_by_state': {state: stats[state] for state in ('filled', 'rejected', 'canceled')},
+        'quotes_during_flight': during_flight,
+        'tick_latency': latency_summary(tick_ns),
+        'drift': bot.position_book.diff(client.get_all_positions(), client.cash) if trading_stream else None,
+        'max_loop_lag_ms': round(max(lags, default=0.0) * 1000, 2),
+        'failures': failures,
+        'passed': not failures,
+    }
+
+
+def bench_orders(args):
+    """
+    Stress test of the order state machine: concurrent triggers for the
+    same symbol must place one order, and quotes keep being evaluated
+    while it is in flight.
+    """
+    return {
+        'order_latency_ms': args.order_latency_ms,
+        'ticks_per_burst': args.ticks_per_burst,
+        'commands': args.commands,
+        'calls': args.calls,
+        'results': asyncio.run(_drive_order_stress(args)),
+    }
+
+
+def _time_updates(indicator, columns):
+    """
+    Returns (ns per update, bytes still allocated afterwards) for feeding
+    indicator every row of columns.
+    """
+    update = indicator.update
+    rows = list(zip(*columns))
+    # Warm up past the window so only steady-state updates are measured
+    for row in rows[:len(rows) // 10]:
+        update(*row)
+    rows = rows[len(rows) // 10:]
+    started = time.perf_counter_ns()
+    for row in rows:
+        update(*row)
+    elapsed = time.perf_counter_ns() - started
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for row in rows[:10000]:
+        update(*row)
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return elapsed / len(rows), retained
+
+
+def bench_indicators(args):
+    """
+    ns per update for each streaming indicator, the memory each one keeps
+    after 10,000 more updates, and the largest relative difference from
+    the batch NumPy version over the same series.
+    """
+    import numpy as np
+    prices = np.array([quote.bid_price for quote in synthetic_quotes(args.updates)])
+    rng = np.random.default_rng(1)
+    volumes = rng.uniform(0.1, 2.0, len(prices))
+    highs = prices * (1 + rng.uniform(0, 1e-3, len(prices)))
+    lows = prices * (1 - rng.uniform(0, 1e-3, len(prices)))
+    window = args.window
+    cases = {
+        'sma': (lambda: indicators.SMA(window), (prices,), lambda: indicators.sma(prices, window)),
+        'ema': (lambda: indicators.EMA(span=window), (prices,), lambda: indicators.ema(prices, span=window)),
+        'rolling_min': (lambda: indicators.RollingMin(window), (prices,), lambda: indicators.rolling_min(prices, window)),
+        'rolling_max': (lambda: indicators.RollingMax(window), (prices,), lambda: indicators.rolling_max(prices, window)),
+        'rolling_std': (lambda: indicators.RollingStd(window), (prices,), lambda: indicators.rolling_std(prices, window)),
+        'vwap': (lambda: indicators.VWAP(window), (prices, volumes), lambda: indicators.vwap(prices, volumes, window)),
+        'atr': (lambda: indicators.ATR(window), (highs, lows, prices), lambda: indicators.atr(highs, lows, prices, window)),
+    }
+    results = {}
+    for name, (make, columns, batch) in cases.items():
+        columns = [column.tolist() for column in columns]
+        ns, retained = _time_updates(make(), columns)
+        indicator = make()
+        streamed = np.array([indicator.update(*row) for row in zip(*columns)])
+        started = time.perf_counter()
+        expected = batch()
+        batch_ns = (time.perf_counter() - started) * 1e9 / len(prices)
+        same_nan = bool(np.array_equal(np.isnan(streamed), np.isnan(expected)))
+        results[name] = {
+            'ns_per_update': round(ns, 1),
+            'batch_ns_per_value': round(batch_ns, 1),
+            'bytes_retained': retained,
+            'max_relative_diff': float(np.nanmax(np.abs(streamed - expected) / np.abs(expected))) if same_nan else None,
+        }
+    indicator_set = indicators.IndicatorSet(window)
+    ns, retained = _time_updates(indicator_set, [prices.tolist(), volumes.tolist()])
+    results['indicator_set'] = {'ns_per_update': round(ns, 1), 'bytes_retained': retained}
+    return {'updates': args.updates, 'window': window, 'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Trading bot benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    redis_parser = subparsers.add_parser('redis', help='on_quote throughput under Redis latency')
+    redis_parser.add_argument('--seconds', type=float, default=3.0)
+    redis_parser.add_argument('--latency-ms', type=float, default=5.0)
+    redis_parser.set_defaults(func=bench_redis)
+
+    indicators_parser = subparsers.add_parser('indicators', help='ns per update of the streaming indicators')
+    indicators_parser.add_argument('--updates', type=int, default=200000)
+    indicators_parser.add_argument('--window', type=int, default=100)
+    indicators_parser.set_defaults(func=bench_indicators)
+
+    latency_parser = subparsers.add_parser('latency', help='on_quote tick-to-decision latency and throughput')
+    latency_parser.add_argument('--ticks', type=int, default=200000)
+    latency_parser.add_argument('--warmup', type=int, default=10000)
+    latency_parser.add_argument('--alloc-ticks', type=int, default=20000)
+    latency_parser.add_argument('--order-latency-ms', type=float, default=50.0,
+                                help='Duration of each fake TradingClient call')
+    latency_parser.add_argument('--redis-latency-ms', type=float, default=0.0)
+    latency_parser.add_argument('--start-price', type=float, default=65000.0,
+                                help='Centre of the synthetic prices, also used as the entry threshold')
+    latency_parser.add_argument('--swing', type=float, default=0.04,
+                                help='Relative amplitude of the price wave; 0 for a random walk')
+    latency_parser.add_argument('--period', type=int, default=20000, help='Quotes per price wave')
+    latency_parser.add_argument('--cash', type=float, default=100000.0)
+    latency_parser.set_defaults(func=bench_latency)
+
+    sim_parser = subparsers.add_parser('sim', help='on_quote and the simulated exchange at full speed')
+    sim_parser.add_argument('--ticks', type=int, default=2000000)
+    sim_parser.add_argument('--slippage-bps', type=float, default=2.0)
+    sim_parser.add_argument('--fee-bps', type=float, default=25.0)
+    sim_parser.add_argument('--start-price', type=float, default=65000.0,
+                            help='Centre of the synthetic prices, also used as the entry threshold')
+    sim_parser.add_argument('--swing', type=float, default=0.08,
+                            help='Relative amplitude of the price wave; 0 for a random walk')
+    sim_parser.add_argument('--period', type=int, default=2000, help='Quotes per price wave')
+    sim_parser.add_argument('--cash', type=float, default=100000.0)
+    sim_parser.add_argument('--redis-latency-ms', type=float, default=0.0)
+    sim_parser.add_argument('--order-ack', choices=('filled', 'accepted'), default='filled',
+                            help="'accepted' answers orders before they fill, as Alpaca does")
+    sim_parser.set_defaults(func=bench_sim)
+
+    orders_parser = subparsers.add_parser('orders', help='concurrent triggers against the order state machine')
+    orders_parser.add_argument('--rounds', type=int, default=50)
+    orders_parser.add_argument('--ticks-per-burst', type=int, default=20, help='Triggering quotes fired at once')
+    orders_parser.add_argument('--commands', type=int, default=5, help='execute_trade commands fired with them')
+    orders_parser.add_argument('--calls', type=int, default=5, help='Direct enter_position calls fired with them')
+    orders_parser.add_argument('--order-latency-ms', type=float, default=20.0,
+                               help='Duration of each fake TradingClient call')
+    orders_parser.add_argument('--price', type=float, default=65000.0, help='Entry threshold')
+    orders_parser.add_argument('--cash', type=float, default=100000.0)
+    orders_parser.add_argument('--redis-latency-ms', type=float, default=0.0)
+    orders_parser.add_argument('--seed', type=int, default=1)
+    orders_parser.add_argument('--order-ack', choices=('filled', 'accepted'), default='filled',
+                               help="'accepted' answers orders before they fill, as Alpaca does")
+    orders_parser.set_defaults(func=bench_orders)
+
+    metrics_parser = subparsers.add_parser('metrics', help='per-tick overhead of the bot metrics')
+    metrics_parser.add_argument('--iterations', type=int, default=1000000)
+    metrics_parser.add_argument('--ticks', type=int, default=100000, help='on_quote calls timed for comparison')
+    metrics_parser.add_argument('--budget-ns', type=float, default=1000.0,
+                                help='Fail (exit status 1) if the per-tick cost is above this')
+    metrics_parser.set_defaults(func=bench_metrics)
+
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--baseline', help='Compare with results saved by an earlier --json run')
+    args = parser.parse_args()
+
+    # Keep per-tick logging out of the measurement
+    bot.logger.setLevel(logging.WARNING)
+
+    report = {
+        'benchmark': args.benchmark,
+        'started_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        **args.func(args),
+    }
+    print(json.dumps(report, indent=2))
+    if args.baseline:
+        with open(args.baseline) as file:
+            print_comparison(report, json.load(file))
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(report, file, indent=2)
+    if report.get('within_budget') is False or report.get('results', {}).get('passed') is False:
+        sys.exit(1)
+
+
+def _numbers(report, prefix=''):
+    """
+    Flattens the numeric values of a report to {'a.b.c': value}.
+    """
+    numbers = {}
+    for key, value in report.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            numbers.update(_numbers(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            numbers[name] = value
+    return numbers
+
+
+def print_comparison(report, baseline):
+    """
+    Prints every number that is in both reports with its relative change.
+    """
+    current = _numbers(report)
+    for name, before in _numbers(baseline).items():
+        if name not in current:
+            continue
+        after = current[name]
+        change = f'{(after - before) / before:+.1%}' if before else 'n/a'
+        print(f'{name:<50} {before:>14,.2f} {after:>14,.2f} {change:>8}')
+
+
+if __name__ == '__main__':
+    main()
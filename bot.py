@@ -1,287 +1,1094 @@
 # bot.py
 
+import argparse
 import asyncio
 import logging
 import os
 import signal
-from functools import partial
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+# Taken before the heavy imports so the startup timings include them
+process_started = time.perf_counter()
 
 from alpaca.trading.client import TradingClient
 from alpaca.trading.requests import MarketOrderRequest
 from alpaca.trading.enums import OrderSide, TimeInForce
 from alpaca.trading.models import Order
+from alpaca.trading.stream import TradingStream
 from alpaca.data.live import CryptoDataStream
 
 import redis
+import redis.asyncio as aioredis
 import json
 import ssl
 
+from redis_state import StatePublisher, ConfigCache, redis_tls_kwargs
+from command_bus import CommandBus, SKIP
+from quote_pipeline import LatestQuoteQueue
+from hot_logging import configure_logging, LogSampler, RedisStreamHandler, TRADE
+from tick_recorder import TickRecorder
+from order_journal import OrderJournal
+from account_cache import AccountCache, SNAPSHOT_FIELD
+from startup_snapshot import SnapshotStore, build_snapshot
+from trade_updates import PositionBook, FILL_EVENTS, CLOSED_EVENTS
+from order_manager import OrderManager, PENDING, ACCEPTED, FILLED, REJECTED, CANCELED
+from symbols import SymbolState, parse_symbols, plain_symbol, shard_symbols, shard_from_dyno
+from metrics import Registry, TICK_BUCKETS_US
+from indicators import IndicatorSet
+from bars import BarBuilder, queue_bars, quote_seconds
+from error_handling import ResilientCaller, TokenBucket, alpaca_bucket, is_connection_error
+import strategy
+from strategy import PROFIT_TARGET, STOP_LOSS, DEFAULT_ENTRY_THRESHOLD
+
 # Access environment variables for API keys
 API_KEY = os.environ.get('API_KEY')
 SECRET_KEY = os.environ.get('SECRET_KEY')
 
-# Initialize the trading client
-client = TradingClient(API_KEY, SECRET_KEY, paper=True)
+# The trading client is built on first use, from a worker thread
+client = None
+client_lock = threading.Lock()
 
-# Configure logging
-logger = logging.getLogger('bot')
-logger.setLevel(logging.INFO)
+def trading_client():
+    """
+    Returns the TradingClient, building it the first time.
+    """
+    global client
+    if client is None:
+        with client_lock:
+            if client is None:
+                client = TradingClient(API_KEY, SECRET_KEY, paper=True)
+                mark_startup('trading_client_built')
+    return client
+
+def call_client(method, *args):
+    return getattr(trading_client(), method)(*args)
+
+# EXCHANGE=sim trades live quotes against the in-process simulator in
+# sim_exchange.py instead of Alpaca (configured by the SIM_* variables);
+# with TRADE_UPDATES its fills arrive on a local trade-update stream
+EXCHANGE = os.environ.get('EXCHANGE', 'alpaca')
+if EXCHANGE not in ('alpaca', 'sim'):
+    raise ValueError(f"EXCHANGE must be 'alpaca' or 'sim', not {EXCHANGE!r}")
+simulated_exchange = None
+if EXCHANGE == 'sim':
+    from sim_exchange import SimulatedTradingClient, LocalTradingStream
+    client = simulated_exchange = SimulatedTradingClient.from_env()
+
+# Every trading API call shares the process-wide request budget, a circuit
+# breaker per endpoint class and retries with jittered backoff
+alpaca = ResilientCaller(alpaca_bucket)
+
+# Counters and histograms published to Redis every METRICS_PUBLISH_INTERVAL
+# seconds; app.py serves them at /metrics (see metrics.py)
+bot_metrics = Registry()
+METRICS_PUBLISH_INTERVAL = float(os.environ.get('METRICS_PUBLISH_INTERVAL', 10))
+METRICS_KEY = 'bot_metrics'
+
+# Seconds from process start to each startup step, logged with the first
+# evaluated quote
+startup_marks = {}
+
+def mark_startup(step):
+    if step not in startup_marks:
+        startup_marks[step] = time.perf_counter() - process_started
+
+bot_metrics.gauge('startup_first_tick_seconds', 'Process start to the first evaluated quote',
+                  read=lambda: startup_marks.get('first_tick', 0.0))
+
+# Alpaca REST calls by TradingClient method, for the periodic report
+rest_calls = Counter()
+rest_calls_since = time.monotonic()
+# Duration of each REST call, retries included, by method
+rest_latency = {}
+
+async def rest(method, *args):
+    """
+    Calls a TradingClient method in a worker thread through the resilience
+    layer, counting it in rest_calls. Raises RateLimitedError or
+    CircuitOpenError instead of waiting when Alpaca is overloaded.
+    """
+    rest_calls[method] += 1
+    histogram = rest_latency.get(method)
+    if histogram is None:
+        histogram = rest_latency[method] = bot_metrics.histogram(
+            'rest_call_ms', help='Alpaca REST call duration in the worker thread, retries included',
+            labels={'method': method},
+        )
+    started = time.perf_counter()
+    try:
+        return await alpaca.call(method, call_client, method, *args)
+    finally:
+        histogram.observe((time.perf_counter() - started) * 1000)
+
+# Redis connection
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379')
 
-# Create a console handler
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-formatter = logging.Formatter('%(asctime)s %(levelname)s: %(message)s')
-console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
+# Log records are also appended to a capped Redis Stream for the dashboard.
+# The listener thread writes them, so this uses its own synchronous client.
+log_stream_handler = RedisStreamHandler(
+    redis.Redis.from_url(REDIS_URL, socket_timeout=2, socket_connect_timeout=2, **redis_tls_kwargs(REDIS_URL)),
+    maxlen=int(os.environ.get('LOG_STREAM_MAXLEN', 1000)),
+)
 
-# Global variables
-latest_price = None
-position = None
+# Configure logging: records are formatted and written by a listener thread
+logger = logging.getLogger('bot')
+log_queue_handler, log_listener = configure_logging(
+    logger,
+    queue_size=int(os.environ.get('LOG_QUEUE_SIZE', 10000)),
+    extra_handlers=[log_stream_handler],
+)
+
+# Per-tick messages are written at most once per LOG_SAMPLE_INTERVAL seconds
+hot_log = LogSampler(logger, interval=float(os.environ.get('LOG_SAMPLE_INTERVAL', 10)))
 
 # Set your trading parameters
-SYMBOL = 'BTC/USD'         # Use 'BTC/USD' for the data stream
-PROFIT_TARGET = 5          # Profit target in percentage
-STOP_LOSS = -2             # Stop loss in percentage
+# Comma-separated pairs, in the data stream's 'BTC/USD' form. The first is
+# the primary symbol shown on the dashboard; the others read their entry
+# threshold from bot_config 'ENTRY_THRESHOLD:<symbol>'.
+SYMBOLS = parse_symbols(os.environ.get('SYMBOLS', 'BTC/USD'))
+SYMBOL = SYMBOLS[0]
+# With SHARD_COUNT > 1, each worker trades every SHARD_COUNT-th symbol,
+# starting at SHARD_INDEX (taken from Heroku's DYNO name, worker.1 = 0)
+SHARD_COUNT = int(os.environ.get('SHARD_COUNT', 1))
+SHARD_INDEX = int(os.environ.get('SHARD_INDEX', shard_from_dyno(os.environ.get('DYNO'))))
+# PROFIT_TARGET and STOP_LOSS defaults live in strategy.py, shared with the
+# backtester; bot_config can override them (see optimize.py apply)
 
 # Bot control flag
 bot_running = False
 
 # Shared configuration dictionary
 config = {
-    'ENTRY_THRESHOLD': 60000  # Default value
+    'ENTRY_THRESHOLD': DEFAULT_ENTRY_THRESHOLD  # Default value
 }
 
+# Per-symbol state for the symbols this worker trades, by data stream
+# symbol and by trading API symbol
+symbols = {}
+symbols_by_key = {}
+
+# Window (in quotes) of the streaming indicators kept per symbol and
+# published to bot_state; 0 leaves them off
+INDICATOR_WINDOW = int(os.environ.get('INDICATOR_WINDOW', 0))
+
+# OHLC bar timeframes built from quotes and stored in capped Redis lists
+# for the dashboard chart (see bars.py); empty turns bars off
+BAR_TIMEFRAMES = [name for name in os.environ.get('BAR_TIMEFRAMES', '1s,1m,5m,1h').split(',') if name]
+# Seconds past a bar's end before it is closed without a newer quote
+BAR_CLOSE_DELAY = float(os.environ.get('BAR_CLOSE_DELAY', 2))
+
+def load_symbols(names, primary=SYMBOL):
+    """
+    Replaces the traded symbols with fresh, flat state.
+    """
+    global symbols, symbols_by_key
+    symbols = {name: SymbolState(name, primary=name == primary) for name in names}
+    for sym in symbols.values():
+        if INDICATOR_WINDOW:
+            sym.indicators = IndicatorSet(INDICATOR_WINDOW)
+        if BAR_TIMEFRAMES:
+            sym.bars = BarBuilder(BAR_TIMEFRAMES)
+    symbols_by_key = {sym.key: sym for sym in symbols.values()}
+
+load_symbols(shard_symbols(SYMBOLS, SHARD_INDEX, SHARD_COUNT))
+
+# Newest quote per symbol, waiting to be evaluated
+quote_queue = LatestQuoteQueue()
+
+# Account snapshot used to size entries; refreshed in the background and
+# after fills, so entering a position is a single REST call
+ACCOUNT_MAX_AGE = float(os.environ.get('ACCOUNT_MAX_AGE', 90))
+account_cache = AccountCache(lambda: rest('get_account'), max_age=ACCOUNT_MAX_AGE)
+
+# The snapshot is published in bot_state for the web app and helper
+# scripts (see account_cache.SharedAccountInfo), and re-published this
+# often so readers can tell it is current
+ACCOUNT_PUBLISH_INTERVAL = float(os.environ.get('ACCOUNT_PUBLISH_INTERVAL', 60))
+
+def publish_account(cache):
+    snapshot = cache.snapshot()
+    if snapshot is None:
+        return
+    snapshot['updated_at'] = time.time()
+    state.set('account_balance', snapshot['cash'])
+    state.set(SNAPSHOT_FIELD, json.dumps(snapshot))
+
+account_cache.listeners.append(publish_account)
+
+# Positions and cash are kept current from the trade-update stream; REST is
+# only read at startup and every RECONCILE_INTERVAL seconds as a safety net.
+# TRADE_UPDATES=0 falls back to polling the account every 60 seconds.
+TRADE_UPDATES = os.environ.get('TRADE_UPDATES', '1') != '0'
+if simulated_exchange is not None and TRADE_UPDATES:
+    # Nothing would drain the stream without TRADE_UPDATES
+    simulated_exchange.trade_stream = LocalTradingStream()
+RECONCILE_INTERVAL = float(os.environ.get('RECONCILE_INTERVAL', 900))
+position_book = PositionBook()
+reconciliations = 0
+# False from startup until positions come from the snapshot or REST; no
+# entries are made before then
+positions_loaded = True
+
+# Orders in flight, at most one per symbol (see order_manager.py). Client
+# order ids start with the worker and start time so they are unique
+# across shards and restarts.
+order_manager = OrderManager(
+    prefix=f'w{SHARD_INDEX + 1}-{int(time.time() * 1000)}', fills_from_stream=TRADE_UPDATES
+)
+# Seconds an order may stay in flight before it is no longer waited for
+ORDER_TIMEOUT = float(os.environ.get('ORDER_TIMEOUT', 60))
+# Orders from on_quote run as tasks, so quotes keep being evaluated while
+# they are in flight; BACKGROUND_ORDERS=0 (and replay) waits for each one
+BACKGROUND_ORDERS = os.environ.get('BACKGROUND_ORDERS', '1') != '0'
+order_tasks = set()
+
+# Positions, thresholds and balances saved for a fast restart (see
+# startup_snapshot.py); restored before the quote stream starts, with REST
+# reconciliation following in the background
+snapshot_store = SnapshotStore(
+    None, f'worker.{SHARD_INDEX + 1}',
+    interval=float(os.environ.get('SNAPSHOT_INTERVAL', 5)),
+    max_age=float(os.environ.get('SNAPSHOT_MAX_AGE', 3600)),
+)
+
+# Time from a buy signal until submit_order starts, and until it returns
+signal_to_submit = bot_metrics.histogram('signal_to_submit_ms', help='Buy signal to submit_order start')
+signal_to_order_ack = bot_metrics.histogram('signal_to_order_ack_ms', help='Buy signal to submit_order return')
+
+# Per-tick cost is two clock reads and one histogram observation in
+# evaluate_quotes; the rest is read from existing statistics at publish time
+on_quote_duration = bot_metrics.histogram(
+    'on_quote_us', TICK_BUCKETS_US, help='Time to evaluate one quote (orders run in the background)'
+)
+loop_lag = bot_metrics.histogram('event_loop_lag_ms', help='Event loop lateness of a periodic timer')
+LOOP_LAG_INTERVAL = 0.1
+bot_metrics.counter('quotes_received_total', 'Quotes received from the stream', read=lambda: quote_queue.ticks_received)
+bot_metrics.counter('quotes_conflated_total', 'Quotes replaced by a newer one before evaluation',
+                    read=lambda: quote_queue.ticks_conflated)
+bot_metrics.gauge('quote_lag_max_ms', 'Longest wait between receiving and evaluating a quote',
+                  read=lambda: quote_queue.max_lag * 1000)
+bot_metrics.counter('redis_round_trips_total', 'Redis round trips by client', labels={'client': 'state'},
+                    read=lambda: state.round_trips)
+bot_metrics.counter('redis_round_trips_total', 'Redis round trips by client', labels={'client': 'config'},
+                    read=lambda: config_cache.round_trips)
+bot_metrics.counter('fills_applied_total', 'Fills applied from the trade-update stream',
+                    read=lambda: position_book.fills_applied)
+bot_metrics.counter('reconciliations_total', 'REST reconciliations of positions and cash', read=lambda: reconciliations)
+bot_metrics.counter('alpaca_retries_total', 'Alpaca requests retried', read=lambda: alpaca.retries)
+bot_metrics.counter('alpaca_shed_total', 'Alpaca requests refused by the rate limiter', read=lambda: alpaca.bucket.shed)
+for order_state in (ACCEPTED, FILLED, REJECTED, CANCELED):
+    bot_metrics.counter('orders_total', 'Orders that reached each state', labels={'state': order_state},
+                        read=lambda order_state=order_state: order_manager.counts[order_state])
+bot_metrics.counter('orders_blocked_total', 'Orders not placed because one was in flight for the symbol',
+                    read=lambda: order_manager.blocked)
+bot_metrics.gauge('orders_in_flight', 'Orders pending or accepted', read=lambda: len(order_manager.orders))
+bot_metrics.gauge('open_positions', 'Symbols with an open position',
+                  read=lambda: sum(1 for sym in symbols.values() if sym.qty))
+
+# Appends every received quote to a tick file when set (see record/replay)
+tick_recorder = None
+TICK_RECORD_FILE = os.environ.get('TICK_RECORD_FILE')
+
+# Orders and fills are appended to a binary journal (see order_journal.py);
+# an empty ORDER_JOURNAL_DIR disables it
+order_journal = None
+ORDER_JOURNAL_DIR = os.environ.get('ORDER_JOURNAL_DIR', 'journal')
+
+def journal(kind, symbol, side, qty, price, order_id=''):
+    if order_journal is not None:
+        order_journal.append(kind, symbol, side, qty, price, order_id)
+
 # To handle graceful shutdowns
 stop_event = asyncio.Event()
 
-# Redis connection
-REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379')
+# Minimum seconds between bot_state flushes, and between bot_config re-reads
+STATE_FLUSH_INTERVAL = float(os.environ.get('STATE_FLUSH_INTERVAL', 0.25))
+CONFIG_REFRESH_INTERVAL = float(os.environ.get('CONFIG_REFRESH_INTERVAL', 1.0))
 
-try:
-    if REDIS_URL.startswith('rediss://'):
-        # SSL/TLS connection to Heroku Redis
-        redis_client = redis.Redis.from_url(
-            REDIS_URL,
-            ssl_cert_reqs=None  # Disables SSL certificate verification
-        )
-    else:
-        # Non-SSL connection (local development)
-        redis_client = redis.Redis.from_url(REDIS_URL)
+# Upper bound on connections shared by all bot tasks
+REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', 8))
+
+def create_redis_client(url=REDIS_URL, max_connections=REDIS_MAX_CONNECTIONS):
+    """
+    Builds an asyncio Redis client backed by one bounded connection pool.
+    Tasks wait for a free connection instead of opening new ones.
+    """
+    pool = aioredis.BlockingConnectionPool.from_url(
+        url, max_connections=max_connections, **redis_tls_kwargs(url)
+    )
+    return aioredis.Redis(connection_pool=pool)
+
+# The pool connects lazily; connect_redis() checks it once the loop is running
+redis_client = create_redis_client()
+
+# Coalesced bot_state writes and cached bot_config reads
+state = StatePublisher(redis_client, flush_interval=STATE_FLUSH_INTERVAL)
+config_cache = ConfigCache(redis_client)
+
+# Commands published by the web app on bot_commands
+command_bus = CommandBus(redis_client)
+
+def set_redis_client(new_client):
+    """
+    Points every Redis user in the bot at new_client (None disables Redis).
+    """
+    global redis_client
+    redis_client = new_client
+    state.redis_client = new_client
+    config_cache.redis_client = new_client
+    command_bus.redis_client = new_client
+    snapshot_store.redis_client = new_client
+
+async def connect_redis():
+    """
+    Tests the Redis connection and disables Redis access if it fails.
+    """
+    if redis_client is None:
+        return
+    try:
+        await redis_client.ping()
+        logger.info("Connected to Redis successfully.")
+    except Exception as e:
+        logger.error(f"Redis connection error: {e}")
+        set_redis_client(None)  # Set redis_client to None to prevent further errors
 
-    # Test the Redis connection
-    redis_client.ping()
-    logger.info("Connected to Redis successfully.")
-except Exception as e:
-    logger.error(f"Redis connection error: {e}")
-    redis_client = None  # Set redis_client to None to prevent further errors
+async def find_order(client_order_id):
+    """
+    Looks an order up by its client order id; None when it does not exist.
+    """
+    try:
+        return await rest('get_order_by_client_id', client_order_id)
+    except Exception as e:
+        logger.error(f"Error looking up order {client_order_id}: {e}")
+        return None
 
-async def place_order(symbol, qty, side):
+async def place_order(symbol, qty, side, price=None, client_order_id=None):
     """
     Places a market order and logs the order details.
     """
-    global latest_price
     try:
         order_details = MarketOrderRequest(
-            symbol=symbol.replace('/', ''),  # Remove '/' for trading API
+            symbol=plain_symbol(symbol),
             qty=qty,
             side=side,
-            time_in_force=TimeInForce.GTC
+            time_in_force=TimeInForce.GTC,
+            client_order_id=client_order_id,
         )
-        # Run the blocking submit_order in a separate thread
-        order: Order = await asyncio.to_thread(client.submit_order, order_details)
-        price = latest_price
+        try:
+            # submit_order runs in a worker thread
+            order: Order = await rest('submit_order', order_details)
+        except Exception as e:
+            # The order may have been placed before the connection dropped
+            if client_order_id is None or not is_connection_error(e):
+                raise
+            order = await find_order(client_order_id)
+            if order is None:
+                raise
+            logger.warning(f"submit_order failed ({e}) but order {client_order_id} was placed.")
+        journal('order', symbol, side, qty, price, order.id)
         side_str = "Buy" if side == OrderSide.BUY else "Sell"
-        logger.info(f"{side_str} order placed: {qty:.6f} {symbol} at ${price:.2f}")
+        logger.info(f"{side_str} order placed: {qty:.6f} {symbol} at ${price or 0:.2f}", extra=TRADE)
         return order
     except Exception as e:
+        journal('reject', symbol, side, qty, price)
         logger.error(f"Error placing {side.name.lower()} order: {e}")
         return None
 
-def calculate_current_pnl():
+def calculate_current_pnl(sym):
     """
     Calculates the current profit and loss.
     """
-    global position, latest_price
-    if position and latest_price:
-        entry_price = position['entry_price']
-        qty = position['qty']
-        pnl = (latest_price - entry_price) * qty
-        return pnl
-    return 0.0
+    return sym.pnl()
+
+def entry_threshold_for(sym, config):
+    """
+    Returns the symbol's entry threshold from the cached bot_config, or None
+    when a non-primary symbol has none configured.
+    """
+    threshold = config_cache.get_float(sym.threshold_field, None)
+    if threshold is None and sym.primary:
+        threshold = config_cache.get_float('ENTRY_THRESHOLD', config.get('ENTRY_THRESHOLD', DEFAULT_ENTRY_THRESHOLD))
+    return threshold
 
 async def on_quote(data, config, config_lock):
     """
     Callback function to handle price updates from the WebSocket.
     """
-    global latest_price, position, bot_running, redis_client
+    global bot_running
     if not bot_running:
-        logger.info("Bot is stopped. Exiting on_quote.")
+        hot_log.log('stopped', "Bot is stopped. Exiting on_quote.")
         return
 
-    latest_price = float(data.bid_price)
-    logger.info(f"Received price update: {SYMBOL} at ${latest_price:.2f}")
+    sym = symbols.get(data.symbol)
+    if sym is None:
+        return
+    latest_price = sym.latest_price = float(data.bid_price)
+    hot_log.log(('price', sym.symbol), "Received price update: %s at $%.2f", sym.symbol, latest_price)
 
-    # Update Redis with latest price
-    if redis_client:
-        redis_client.hset('bot_state', 'latest_price', latest_price)
+    # Queue the latest price for the next state flush
+    state.set(sym.price_field, latest_price)
 
     try:
-        # Read the ENTRY_THRESHOLD from Redis
-        if redis_client:
-            entry_threshold = redis_client.hget('bot_config', 'ENTRY_THRESHOLD')
-            if entry_threshold is not None:
-                entry_threshold = float(entry_threshold)
-            else:
-                entry_threshold = config.get('ENTRY_THRESHOLD', 60000)  # Default if not set
-        else:
-            entry_threshold = config.get('ENTRY_THRESHOLD', 60000)
-
-        if position is None:
-            if redis_client:
-                redis_client.hset('bot_state', 'status', 'Waiting to Enter Trade')
-            logger.info("No current position.")
-            if latest_price <= entry_threshold:
-                logger.info(f"Price ${latest_price:.2f} <= entry threshold ${entry_threshold:.2f}. Evaluating buy opportunity.")
-                await enter_position()
+        if not sym.qty:
+            state.set(sym.status_field, 'Waiting to Enter Trade')
+            entry_threshold = entry_threshold_for(sym, config)
+            if not positions_loaded:
+                hot_log.log(('positions_unknown', sym.symbol), "Positions not loaded yet. Not entering %s.", sym.symbol)
+            elif entry_threshold is None:
+                hot_log.log(('no_threshold', sym.symbol), "No entry threshold configured for %s. Set %s in bot_config.",
+                            sym.symbol, sym.threshold_field)
+            elif strategy.should_enter(latest_price, entry_threshold):
+                if sym.symbol in order_manager.by_symbol:
+                    hot_log.log(('order_in_flight', sym.symbol), "Order for %s in flight. Waiting for it.", sym.symbol)
+                else:
+                    logger.info(f"{sym.symbol} price ${latest_price:.2f} <= entry threshold ${entry_threshold:.2f}. Evaluating buy opportunity.", extra=TRADE)
+                    await run_order(enter_position(sym, signal_at=time.perf_counter()))
             else:
-                logger.info("Price above entry threshold. Waiting.")
+                hot_log.log(('waiting', sym.symbol), "No %s position. Price $%.2f above entry threshold $%.2f. Waiting.",
+                            sym.symbol, latest_price, entry_threshold)
         else:
-            if redis_client:
-                redis_client.hset('bot_state', 'status', 'In Position')
-            entry_price = position['entry_price']
-            profit_percentage = ((latest_price - entry_price) / entry_price) * 100
-            logger.info(f"Current profit: {profit_percentage:.2f}%")
-
-            # Update PnL in Redis
-            pnl = calculate_current_pnl()
-            if redis_client:
-                redis_client.hset('bot_state', 'pnl', pnl)
-
-            # Update position in Redis
-            if redis_client:
-                redis_client.hset('bot_state', 'position', json.dumps(position))
-
-            if profit_percentage >= PROFIT_TARGET:
-                logger.info(f"Profit target reached ({profit_percentage:.2f}%). Placing sell order.")
-                await exit_position(reason='Profit target reached')
-            elif profit_percentage <= STOP_LOSS:
-                logger.info(f"Stop-loss triggered ({profit_percentage:.2f}%). Placing sell order.")
-                await exit_position(reason='Stop-loss triggered')
+            state.set(sym.status_field, 'In Position')
+            profit_percentage = strategy.profit_percentage(latest_price, sym.entry_price)
+
+            # Update PnL and position in the state shadow
+            state.set(sym.pnl_field, calculate_current_pnl(sym))
+            state.set(sym.position_field, sym.position_json())
+
+            reason = strategy.exit_reason(
+                profit_percentage,
+                config_cache.get_float('PROFIT_TARGET', PROFIT_TARGET),
+                config_cache.get_float('STOP_LOSS', STOP_LOSS),
+            )
+            if reason and sym.symbol in order_manager.by_symbol:
+                hot_log.log(('order_in_flight', sym.symbol), "Order for %s in flight. Waiting for it.", sym.symbol)
+            elif reason:
+                logger.info(f"{sym.symbol}: {reason} ({profit_percentage:.2f}%). Placing sell order.", extra=TRADE)
+                await run_order(exit_position(sym, reason=reason))
             else:
-                logger.info("No action taken. Holding position.")
+                hot_log.log(('holding', sym.symbol), "%s profit: %.2f%%. No action taken. Holding position.",
+                            sym.symbol, profit_percentage)
     except Exception as e:
         logger.error(f"Error in trading logic: {e}")
 
-async def enter_position():
-    global position, latest_price, redis_client
+async def run_order(coroutine):
+    """
+    Runs an order coroutine from on_quote: as a task with
+    BACKGROUND_ORDERS, otherwise to completion.
+    """
+    if not BACKGROUND_ORDERS:
+        await coroutine
+        return
+    task = asyncio.create_task(coroutine)
+    # The loop only keeps weak references to tasks
+    order_tasks.add(task)
+    task.add_done_callback(order_tasks.discard)
+
+def reserve_order(sym, side):
+    """
+    Claims sym for a new order; None (logged) when one is already in flight.
+    """
+    ticket = order_manager.reserve(sym.symbol, side)
+    if ticket is None:
+        pending = order_manager.in_flight(sym.symbol)
+        logger.info(f"Order {pending.client_order_id} for {sym.symbol} is {pending.state}. Not placing another.")
+    return ticket
+
+async def enter_position(sym, signal_at=None):
+    if signal_at is None:
+        signal_at = time.perf_counter()
+    # Claimed before the first await, so concurrent callers see it
+    ticket = reserve_order(sym, OrderSide.BUY)
+    if ticket is None:
+        return
     try:
-        account = await asyncio.to_thread(client.get_account)
-        buying_power = float(account.buying_power) / 3
-        qty = buying_power / latest_price
-        logger.info(f"Calculated order quantity: {qty:.6f}")
-        order = await place_order(SYMBOL, qty, OrderSide.BUY)
-        if order:
-            position = {
-                'entry_price': latest_price,
-                'qty': qty
-            }
-            logger.info(f"Entered position: Bought {qty:.6f} {SYMBOL} at ${latest_price:.2f}")
-            # Update position in Redis
-            if redis_client:
-                redis_client.hset('bot_state', 'position', json.dumps(position))
+        if sym.qty:
+            logger.info("Already in position. Not entering again.")
+            return
+        latest_price = sym.latest_price
+        if latest_price is None:
+            logger.info(f"No {sym.symbol} quote yet. Not entering.")
+            return
+        # Only fetches the account when the cached snapshot is stale
+        budget = await account_cache.get_entry_budget()
+        # Same arithmetic as strategy.order_quantity
+        qty = budget / latest_price
+        logger.info(f"Calculated order quantity: {qty:.6f}", extra=TRADE)
+        signal_to_submit.observe((time.perf_counter() - signal_at) * 1000)
+        order = await place_order(sym.symbol, qty, OrderSide.BUY, latest_price, ticket.client_order_id)
+        signal_to_order_ack.observe((time.perf_counter() - signal_at) * 1000)
+        if order and not ticket.in_flight:
+            # The trade-update stream settled the order first
+            logger.info(f"Order {ticket.client_order_id} already {ticket.state}. Position left to the book.")
+        elif order:
+            order_manager.acknowledged(ticket, order)
+            if not TRADE_UPDATES:
+                # The fill changed buying power
+                account_cache.refresh_soon()
+            # The trade-update stream may already have applied the fill
+            if not sym.qty:
+                # An accepted but unfilled order reports filled_qty '0'
+                sym.open(float(order.filled_avg_price or 0) or latest_price, float(order.filled_qty or 0) or qty)
+                snapshot_store.dirty = True
+            logger.info(f"Entered position: Bought {qty:.6f} {sym.symbol} at ${latest_price:.2f}", extra=TRADE)
+            # Publish the new position right away
+            state.set(sym.position_field, sym.position_json())
+            await state.flush()
         else:
             logger.error("Failed to enter position.")
     except Exception as e:
         logger.error(f"Error entering position: {e}")
+    finally:
+        if ticket.state == PENDING:
+            order_manager.failed(ticket, 'not placed')
 
-async def exit_position(reason=''):
-    global position, latest_price, redis_client
-    if position is None:
+async def exit_position(sym, reason=''):
+    if not sym.qty:
         logger.info("No position to exit.")
         return
+    ticket = reserve_order(sym, OrderSide.SELL)
+    if ticket is None:
+        return
     try:
-        qty = position['qty']
-        order = await place_order(SYMBOL, qty, OrderSide.SELL)
-        if order:
-            logger.info(f"Exited position: Sold {qty:.6f} {SYMBOL} at ${latest_price:.2f}. Reason: {reason}")
-            position = None
-            # Remove position from Redis
-            if redis_client:
-                redis_client.hdel('bot_state', 'position')
-                redis_client.hset('bot_state', 'status', 'Waiting to Enter Trade')
+        qty = sym.qty
+        order = await place_order(sym.symbol, qty, OrderSide.SELL, sym.latest_price, ticket.client_order_id)
+        if order and not ticket.in_flight:
+            # The trade-update stream settled the order first
+            logger.info(f"Order {ticket.client_order_id} already {ticket.state}. Position left to the book.")
+        elif order:
+            order_manager.acknowledged(ticket, order)
+            logger.info(f"Exited position: Sold {qty:.6f} {sym.symbol} at ${sym.latest_price:.2f}. Reason: {reason}", extra=TRADE)
+            sym.close()
+            snapshot_store.dirty = True
+            if not TRADE_UPDATES:
+                # The fill changed buying power
+                account_cache.refresh_soon()
+            # Remove position from Redis right away
+            state.delete(sym.position_field)
+            state.set(sym.status_field, 'Waiting to Enter Trade')
+            await state.flush()
         else:
             logger.error("Failed to exit position.")
     except Exception as e:
         logger.error(f"Error exiting position: {e}")
+    finally:
+        if ticket.state == PENDING:
+            order_manager.failed(ticket, 'not placed')
+
+def track_quote(data):
+    """
+    Feeds a quote to its symbol's indicators and bars. Called for every
+    received quote, including those replaced before evaluation, so bar
+    highs and lows and the VWAP volume are not lost under load.
+    """
+    sym = symbols.get(data.symbol)
+    if sym is None:
+        return
+    bid_price = float(data.bid_price)
+    if sym.indicators is not None:
+        sym.indicators.update(bid_price, float(data.bid_size))
+    if sym.bars is not None:
+        sym.bars.update(quote_seconds(data.timestamp), bid_price)
+
+async def ingest_quote(data):
+    """
+    Stream callback: hands the quote to the strategy without waiting on it.
+    """
+    track_quote(data)
+    # Tick files hold one symbol: the primary
+    if tick_recorder is not None and data.symbol == tick_recorder.symbol:
+        tick_recorder.record(data)
+    # The simulator fills at the newest quote, evaluated or not
+    if simulated_exchange is not None:
+        simulated_exchange.set_quote(data.symbol, data.bid_price, data.ask_price)
+    quote_queue.put(data.symbol, data)
+
+async def evaluate_quotes(config, config_lock):
+    """
+    Runs the trading logic on the newest pending quote. Orders run in the
+    background (see run_order), and quotes that arrive while one is being
+    evaluated replace each other instead of queueing up.
+    """
+    global bot_running
+    while bot_running:
+        symbol, data, received_at = await quote_queue.get()
+        quote_queue.record_evaluation(received_at)
+        started = time.perf_counter_ns()
+        await on_quote(data, config, config_lock)
+        on_quote_duration.observe((time.perf_counter_ns() - started) / 1000)
+        if quote_queue.ticks_evaluated == 1:
+            report_startup()
 
 async def start_price_stream(config, config_lock):
     global bot_running
     bot_running = True  # Ensure bot_running is set to True
     crypto_stream = CryptoDataStream(API_KEY, SECRET_KEY)
-    callback = partial(on_quote, config=config, config_lock=config_lock)
 
-    # Subscribe to quotes
-    crypto_stream.subscribe_quotes(callback, SYMBOL)
+    # One subscription for every symbol; evaluate_quotes picks them up from the queue
+    crypto_stream.subscribe_quotes(ingest_quote, *symbols)
+    logger.info(f"Trading {', '.join(symbols)} (shard {SHARD_INDEX + 1} of {SHARD_COUNT}).")
+    mark_startup('stream_connecting')
 
     # Start the data stream
     await crypto_stream._run_forever()
 
-async def update_position_state():
+async def flush_ticks():
     """
-    Initializes the position state based on current holdings.
+    Writes buffered ticks to the tick file once a second.
+    """
+    global bot_running
+    while bot_running:
+        await asyncio.sleep(1)
+        tick_recorder.flush()
+
+async def record(path):
+    """
+    Records every quote to a tick file without trading, until stopped.
+    """
+    global bot_running, tick_recorder
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_bot)
+
+    tick_recorder = TickRecorder(path, SYMBOL)
+    bot_running = True
+    crypto_stream = CryptoDataStream(API_KEY, SECRET_KEY)
+
+    async def record_quote(data):
+        tick_recorder.record(data)
+
+    crypto_stream.subscribe_quotes(record_quote, SYMBOL)
+    logger.info(f"Recording {SYMBOL} quotes to {path}.")
+    tasks = [asyncio.create_task(crypto_stream._run_forever()), asyncio.create_task(flush_ticks())]
+    await stop_event.wait()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    tick_recorder.close()
+    logger.info(f"Recorded {tick_recorder.recorded} quotes to {path}.")
+
+async def replay(path, speed=None, entry_threshold=None, cash=100000.0):
+    """
+    Feeds a tick file through on_quote against in-process stand-ins for
+    Redis and Alpaca. speed is a multiple of recorded time; None replays as
+    fast as possible. Quotes are evaluated one by one, so runs are repeatable.
+    """
+    global client, bot_running, BACKGROUND_ORDERS
+    from local_redis import LocalRedis
+    from sim_exchange import SimulatedTradingClient, LocalTradingStream
+    from tick_recorder import iter_ticks, read_header
+
+    local_redis = LocalRedis()
+    set_redis_client(local_redis)
+    log_stream_handler.redis_client = None
+    if entry_threshold is not None:
+        await local_redis.hset('bot_config', 'ENTRY_THRESHOLD', entry_threshold)
+    await config_cache.refresh()
+
+    trading_stream = LocalTradingStream() if TRADE_UPDATES else None
+    client = SimulatedTradingClient.from_env(cash=cash, trade_stream=trading_stream)
+    # The simulator has no request budget
+    alpaca.bucket = TokenBucket(rate=1e9, capacity=1e9)
+    account_cache.invalidate()
+    # Each order completes before the next quote, as in a recorded run
+    BACKGROUND_ORDERS = False
+    bot_running = True
+    symbol, count = read_header(path)
+    load_symbols([symbol], primary=symbol)
+    config_lock = asyncio.Lock()
+    background = [asyncio.create_task(flush_state())]
+    if trading_stream is not None:
+        await reconcile_account()
+        background.append(asyncio.create_task(run_trade_updates(trading_stream)))
+
+    logger.info(f"Replaying {count} {symbol} quotes from {path} at {'max speed' if speed is None else f'{speed}x'}.")
+    ticks = 0
+    first_timestamp = None
+    started = time.perf_counter()
+    for tick in iter_ticks(path):
+        client.set_quote(tick.symbol, tick.bid_price, tick.ask_price)
+        if speed is not None:
+            if first_timestamp is None:
+                first_timestamp = tick.timestamp
+            delay = started + (tick.timestamp - first_timestamp) / 1e9 / speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        track_quote(tick)
+        await on_quote(tick, config, config_lock)
+        ticks += 1
+        if ticks % 1000 == 0:
+            # Let the state flusher run
+            await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+
+    if trading_stream is not None:
+        await trading_stream.drain()
+        differences = position_book.diff(client.get_all_positions(), client.cash)
+        logger.info(f"Trade updates applied: {position_book.fills_applied}, drift from the simulator: {differences or 'none'}.")
+    bot_running = False
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    await state.flush()
+    logger.info(
+        f"Replayed {ticks} quotes in {elapsed:.2f} s ({ticks / elapsed if elapsed else 0:,.0f} ticks/s, "
+        f"{ticks / elapsed * 60 if elapsed else 0:,.0f} per minute). Orders: {client.order_count}, "
+        f"cash: ${client.cash:.2f}, fees: ${client.fees_paid:.2f}, position: {symbols[symbol].position}."
+    )
+    return client
+
+def sync_position_from_book(symbol_states=None):
+    """
+    Copies positions (for every traded symbol unless symbol_states is
+    given) and the cash balance from position_book into the state shadow.
+    """
+    snapshot_store.dirty = True
+    for sym in symbols.values() if symbol_states is None else symbol_states:
+        held = position_book.position(sym.key)
+        if held is None:
+            if sym.qty:
+                sym.close()
+                state.delete(sym.position_field)
+        else:
+            sym.open(held[1], held[0])
+            state.set(sym.position_field, sym.position_json())
+    if position_book.cash is not None:
+        state.set('account_balance', position_book.cash)
+
+async def on_trade_update(update):
+    """
+    TradingStream callback: applies fills, partial fills and cancels to the
+    in-memory position and balance. A canceled, rejected or expired order
+    resets its symbol to the book, undoing the position change made when
+    the order was acknowledged.
     """
-    global position, redis_client
     try:
-        positions = await asyncio.to_thread(client.get_all_positions)
-        for pos in positions:
-            if pos.symbol == SYMBOL.replace('/', ''):
-                position = {
-                    'entry_price': float(pos.avg_entry_price),
-                    'qty': float(pos.qty)
-                }
-                logger.info(f"Existing position detected: {position}")
-                # Update position in Redis
-                if redis_client:
-                    redis_client.hset('bot_state', 'position', json.dumps(position))
-                break
+        applied = position_book.apply(update)
+        order_manager.apply(update)
+        event = getattr(update.event, 'value', update.event)
+        order = update.order
+        if event in FILL_EVENTS:
+            journal('fill', order.symbol, order.side, update.qty or order.filled_qty,
+                    update.price or order.filled_avg_price, order.id)
+        elif event in CLOSED_EVENTS:
+            journal('reject' if event == 'rejected' else 'cancel', order.symbol, order.side,
+                    order.qty, order.filled_avg_price, order.id)
+        logger.info(f"Trade update: {event} {update.order.side} {update.order.symbol} "
+                    f"filled {update.order.filled_qty}/{update.order.qty}", extra=TRADE)
+        if applied is None:
+            sym = symbols_by_key.get(plain_symbol(order.symbol))
+            if event in CLOSED_EVENTS and sym is not None:
+                # enter_position and exit_position change the position on
+                # the ack; undo what the order did not fill
+                sync_position_from_book([sym])
+                await state.flush()
+            return
+        symbol, cash_delta = applied
+        account_cache.apply_fill(cash_delta)
+        # Fills for symbols traded by other shards only move the balance
+        sym = symbols_by_key.get(symbol)
+        sync_position_from_book([sym] if sym is not None else [])
+        await state.flush()
     except Exception as e:
-        logger.error(f"Error updating position state: {e}")
+        logger.error(f"Error applying trade update: {e}")
+
+async def run_trade_updates(trading_stream):
+    """
+    Subscribes to trade updates and runs the stream until cancelled.
+    """
+    trading_stream.subscribe_trade_updates(on_trade_update)
+    await trading_stream._run_forever()
+
+async def reconcile_account():
+    """
+    Reads the account and positions over REST, logs any drift from
+    position_book and replaces the book with the REST view.
+    """
+    global reconciliations
+    account, positions = await asyncio.gather(account_cache.refresh(), rest('get_all_positions'))
+    if position_book.cash is not None:
+        differences = position_book.diff(positions, account.cash)
+        if differences:
+            logger.warning(f"Reconciliation found drift: {'; '.join(differences)}")
+    position_book.load(positions, account.cash)
+    reconciliations += 1
+    sync_position_from_book()
+
+async def update_position_state():
+    """
+    Initializes the position state based on current holdings, retrying
+    until REST answers. Runs alongside the quote stream at startup.
+    """
+    global positions_loaded, bot_running
+    while bot_running:
+        try:
+            await reconcile_account()
+            break
+        except Exception as e:
+            logger.error(f"Error updating position state: {e}")
+            await asyncio.sleep(5)
+    else:
+        return
+    positions_loaded = True
+    mark_startup('positions_reconciled')
+    for sym in symbols.values():
+        if sym.qty:
+            logger.info(f"Existing {sym.symbol} position detected: {sym.position}")
+    # Update position in Redis
+    await state.flush()
+
+def current_snapshot():
+    thresholds = {sym.symbol: entry_threshold_for(sym, config) for sym in symbols.values()}
+    return build_snapshot(symbols.values(), thresholds, account_cache.snapshot())
+
+async def restore_snapshot():
+    """
+    Loads positions, thresholds and balances saved before the restart, so
+    the first quote can be traded on before REST has answered.
+    """
+    global positions_loaded
+    snapshot = await snapshot_store.load()
+    if snapshot is None:
+        return False
+    saved = snapshot['symbols']
+    positions = []
+    thresholds = {}
+    for sym in symbols.values():
+        entry = saved.get(sym.symbol)
+        if entry is None:
+            continue
+        if entry['qty']:
+            sym.open(entry['entry_price'], entry['qty'])
+            state.set(sym.position_field, sym.position_json())
+            positions.append(SimpleNamespace(symbol=sym.key, qty=entry['qty'], avg_entry_price=entry['entry_price']))
+        if entry['threshold'] is not None:
+            thresholds[sym.threshold_field] = entry['threshold']
+    config_cache.seed(thresholds)
+    if snapshot['account'] is not None:
+        account_cache.restore(snapshot['account'])
+        # Reconciliation logs any drift between the snapshot and REST
+        position_book.load(positions, snapshot['account']['cash'])
+    positions_loaded = True
+    mark_startup('snapshot_restored')
+    logger.info(
+        f"Restored startup snapshot saved {snapshot['age']:.1f} s ago: "
+        f"{len(positions)} open positions, {len(thresholds)} thresholds."
+    )
+    return True
+
+async def save_snapshot():
+    await snapshot_store.save(current_snapshot())
+
+def report_startup():
+    """
+    Logs how long after process start each startup step finished.
+    """
+    mark_startup('first_tick')
+    steps = ', '.join(f"{step.replace('_', ' ')} {seconds:.2f} s" for step, seconds in startup_marks.items())
+    logger.info(f"First quote evaluated {startup_marks['first_tick']:.2f} s after start ({steps}).")
+
+async def reconcile_periodically():
+    """
+    Safety net for missed trade updates: reconciles every RECONCILE_INTERVAL.
+    """
+    global bot_running
+    while bot_running:
+        await asyncio.sleep(RECONCILE_INTERVAL)
+        try:
+            await reconcile_account()
+        except Exception as e:
+            logger.error(f"Error reconciling account: {e}")
 
 async def update_account_balance():
-    global bot_running, redis_client
+    global bot_running
     while bot_running:
         try:
-            account = await asyncio.to_thread(client.get_account)
-            cash = float(account.cash)
-            # Update Redis
-            if redis_client:
-                redis_client.hset('bot_state', 'account_balance', cash)
+            # Also keeps the entry-sizing snapshot fresh; publish_account
+            # queues the balance for the next state flush
+            await account_cache.refresh()
             await asyncio.sleep(60)  # Update every 60 seconds
         except Exception as e:
             logger.error(f"Error updating account balance: {e}")
             await asyncio.sleep(60)
 
+def publish_indicators():
+    """
+    Queues each symbol's indicator values for the next state flush.
+    """
+    for sym in symbols.values():
+        if sym.indicators is not None:
+            # NaN (not enough quotes yet) is not valid JSON
+            values = {name: (None if value != value else value) for name, value in sym.indicators.values().items()}
+            state.set(sym.indicators_field, json.dumps(values))
+
+async def publish_bars():
+    """
+    Writes the bars closed since the last call, in one round trip.
+    """
+    if redis_client is None:
+        return
+    pipe = None
+    for sym in symbols.values():
+        if sym.bars is not None and sym.bars.closed:
+            if pipe is None:
+                pipe = redis_client.pipeline(transaction=False)
+            queue_bars(pipe, sym.symbol, sym.bars.drain())
+    if pipe is not None:
+        try:
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Error writing bars to Redis: {e}")
+
+async def close_idle_bars():
+    """
+    Closes bars once their period is over even if no newer quote came.
+    """
+    global bot_running
+    while bot_running:
+        await asyncio.sleep(1)
+        now = time.time() - BAR_CLOSE_DELAY
+        for sym in symbols.values():
+            if sym.bars is not None:
+                sym.bars.close_until(now)
+
+async def measure_loop_lag():
+    """
+    Records how late a LOOP_LAG_INTERVAL timer fires: time the loop spent
+    busy with something else.
+    """
+    global bot_running
+    loop = asyncio.get_running_loop()
+    while bot_running:
+        expected = loop.time() + LOOP_LAG_INTERVAL
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        loop_lag.observe(max(loop.time() - expected, 0.0) * 1000)
+
+async def publish_metrics():
+    """
+    Writes the metrics snapshot to this shard's field of bot_metrics.
+    """
+    if redis_client is None:
+        return
+    snapshot = bot_metrics.snapshot()
+    snapshot['updated_at'] = time.time()
+    try:
+        await redis_client.hset(METRICS_KEY, f'worker.{SHARD_INDEX + 1}', json.dumps(snapshot))
+    except Exception as e:
+        logger.error(f"Error publishing metrics to Redis: {e}")
+
+async def flush_state():
+    """
+    Flushes coalesced bot_state changes at most once per STATE_FLUSH_INTERVAL.
+    """
+    global bot_running
+    last_report = last_publish = last_metrics = asyncio.get_running_loop().time()
+    while bot_running:
+        await asyncio.sleep(STATE_FLUSH_INTERVAL)
+        await state.maybe_flush()
+        now = asyncio.get_running_loop().time()
+        if order_manager.orders:
+            order_manager.expire(ORDER_TIMEOUT)
+        if now - last_publish >= ACCOUNT_PUBLISH_INTERVAL:
+            last_publish = now
+            publish_account(account_cache)
+        if INDICATOR_WINDOW:
+            publish_indicators()
+        if BAR_TIMEFRAMES:
+            await publish_bars()
+        if now - last_metrics >= METRICS_PUBLISH_INTERVAL:
+            last_metrics = now
+            await publish_metrics()
+        if positions_loaded and snapshot_store.due():
+            await save_snapshot()
+        if now - last_report >= 300:
+            last_report = now
+            stats = state.stats()
+            logger.info(
+                f"State publisher: {stats['requested']} updates, {stats['round_trips']} round trips, "
+                f"{stats['round_trips_saved'] + config_cache.round_trips_saved} round trips saved."
+            )
+            stats = quote_queue.stats()
+            logger.info(
+                f"Quotes: {stats['ticks_received']} received, {stats['ticks_conflated']} conflated, "
+                f"evaluation lag {stats['mean_lag_ms']:.2f} ms mean / {stats['max_lag_ms']:.2f} ms max."
+            )
+            logger.info(
+                f"Trade updates: {position_book.fills_applied} fills applied, "
+                f"{reconciliations} reconciliations, {account_cache.fetches} account fetches."
+            )
+            stats = order_manager.stats()
+            logger.info(
+                f"Orders: {stats[FILLED]} filled, {stats[REJECTED]} rejected, {stats[CANCELED]} canceled, "
+                f"{stats['in_flight']} in flight, {stats['blocked']} blocked while one was in flight."
+            )
+            stats = alpaca.stats()
+            logger.info(
+                f"Alpaca requests: {stats['retries']} retries, {stats['shed']} shed by the rate limiter, "
+                f"circuits {stats['breakers'] or 'unused'}."
+            )
+            hours = (time.monotonic() - rest_calls_since) / 3600
+            logger.info("REST calls per hour: " + ', '.join(
+                f"{method} {count / hours:.1f}" for method, count in sorted(rest_calls.items())
+            ))
+            for histogram in (signal_to_submit, signal_to_order_ack):
+                stats = histogram.summary()
+                if stats['count']:
+                    logger.info(
+                        f"{histogram.name}: {stats['count']} orders, mean {stats['mean']:.1f} ms, "
+                        f"p50 <= {stats['p50']} ms, p99 <= {stats['p99']} ms."
+                    )
+    await state.flush()
+    # Heroku restarts send SIGTERM; the next start picks this up
+    if positions_loaded:
+        await save_snapshot()
+
+async def refresh_config():
+    """
+    Re-reads bot_config every CONFIG_REFRESH_INTERVAL so on_quote never waits on Redis.
+    """
+    global bot_running
+    while bot_running:
+        await config_cache.refresh()
+        await asyncio.sleep(CONFIG_REFRESH_INTERVAL)
+
+@command_bus.handler('execute_trade')
+async def handle_execute_trade(command):
+    sym = symbols.get(command['args'].get('symbol') or SYMBOL)
+    if sym is None:
+        # Traded by another shard, which acknowledges it
+        return SKIP
+    logger.info(f"Received execute_trade command for {sym.symbol} from web app.")
+    # Execute the trade immediately
+    if sym.qty:
+        logger.info("Already in position. Ignoring execute_trade command.")
+        return 'ignored: already in position'
+    if not positions_loaded:
+        logger.info("Positions not loaded yet. Ignoring execute_trade command.")
+        return 'ignored: positions not loaded yet'
+    if order_manager.in_flight(sym.symbol):
+        logger.info("Order already in flight. Ignoring execute_trade command.")
+        return 'ignored: order in flight'
+    await enter_position(sym, signal_at=time.perf_counter())
+    return 'submitted' if sym.qty else 'failed'
+
 async def listen_for_commands():
-    global bot_running, redis_client
+    """
+    Runs the command bus until the bot is stopped.
+    """
+    global redis_client
     if redis_client is None:
         logger.error("Redis client is not available. Command listener will not start.")
         return
-    pubsub = redis_client.pubsub()
-    pubsub.subscribe('bot_commands')
-    while bot_running:
-        message = pubsub.get_message()
-        if message and message['type'] == 'message':
-            command = message['data'].decode('utf-8')
-            if command == 'execute_trade':
-                logger.info("Received execute_trade command from web app.")
-                # Implement logic to execute trade immediately
-                if position is None:
-                    await enter_position()
-                else:
-                    logger.info("Already in position. Ignoring execute_trade command.")
-        await asyncio.sleep(0.1)
+    bus_task = asyncio.create_task(command_bus.run())
+    await stop_event.wait()
+    bus_task.cancel()
+    await asyncio.gather(bus_task, return_exceptions=True)
 
 async def main(config, config_lock):
+    global tick_recorder, order_journal, positions_loaded, bot_running
+    mark_startup('imported')
     logger.info("Trading bot is running.")
 
     # Handle shutdown signals
@@ -289,31 +1096,98 @@ async def main(config, config_lock):
     for sig in (signal.SIGINT, signal.SIGTERM):
         loop.add_signal_handler(sig, stop_bot)
 
-    # Initialize position state
-    await update_position_state()
+    # Build the trading client in a worker thread while Redis is checked
+    # and the snapshot restored; REST calls wait for it if they come first
+    positions_loaded = False
+    bot_running = True
+    client_task = asyncio.create_task(asyncio.to_thread(trading_client))
 
-    # Start the price stream, account updater, and command listener
+    # Check Redis before anything tries to use it
+    await connect_redis()
+    mark_startup('redis_connected')
+    await restore_snapshot()
+
+    # Optionally record every quote while trading
+    if TICK_RECORD_FILE:
+        tick_recorder = TickRecorder(TICK_RECORD_FILE, SYMBOL)
+
+    if ORDER_JOURNAL_DIR:
+        order_journal = OrderJournal(ORDER_JOURNAL_DIR)
+
+    # Start the price stream right away; positions are reconciled over REST
+    # alongside it, and no entries are made until they are known
     tasks = [
         start_price_stream(config, config_lock),
-        update_account_balance(),
+        evaluate_quotes(config, config_lock),
+        update_position_state(),
+        client_task,
+        flush_state(),
+        refresh_config(),
+        measure_loop_lag(),
     ]
 
+    if TRADE_UPDATES:
+        # Fills keep the account snapshot current between reconciliations
+        account_cache.max_age = max(account_cache.max_age, RECONCILE_INTERVAL * 2)
+        trading_stream = simulated_exchange.trade_stream if simulated_exchange else TradingStream(API_KEY, SECRET_KEY, paper=True)
+        tasks += [run_trade_updates(trading_stream), reconcile_periodically()]
+    else:
+        tasks.append(update_account_balance())
+
     if redis_client:
         tasks.append(listen_for_commands())
     else:
         logger.error("Redis client is not available. Skipping command listener.")
 
+    if tick_recorder is not None:
+        tasks.append(flush_ticks())
+
+    if order_journal is not None:
+        tasks.append(order_journal.run())
+
+    if BAR_TIMEFRAMES:
+        tasks.append(close_idle_bars())
+
     await asyncio.gather(*tasks)
 
 def stop_bot():
     global bot_running
     bot_running = False
+    stop_event.set()
+    if tick_recorder is not None:
+        tick_recorder.flush()
+    if order_journal is not None:
+        order_journal.flush()
     logger.info("Bot has been stopped.")
 
+def parse_speed(text):
+    """
+    Parses a replay speed: 'max', or a multiplier such as '10x'.
+    """
+    if text == 'max':
+        return None
+    return float(text.rstrip('x'))
+
 if __name__ == "__main__":
-    import sys
+    parser = argparse.ArgumentParser(description='Trading bot')
+    subparsers = parser.add_subparsers(dest='mode')
+    subparsers.add_parser('run', help='Trade live (set TICK_RECORD_FILE to also record quotes)')
+    record_parser = subparsers.add_parser('record', help='Record quotes to a tick file without trading')
+    record_parser.add_argument('file', nargs='?', default='ticks.bin')
+    replay_parser = subparsers.add_parser('replay', help='Replay a tick file through on_quote offline')
+    replay_parser.add_argument('file')
+    replay_parser.add_argument('--speed', type=parse_speed, default=None, help="'max' (default) or a multiplier like 10x")
+    replay_parser.add_argument('--entry-threshold', type=float, default=None)
+    replay_parser.add_argument('--cash', type=float, default=100000.0)
+    args = parser.parse_args()
 
     config_lock = asyncio.Lock()
 
-    if len(sys.argv) > 1 and sys.argv[1] == 'run':
-        asyncio.run(main(config, config_lock))
\ No newline at end of file
+    if args.mode == 'run':
+        asyncio.run(main(config, config_lock))
+    elif args.mode == 'record':
+        asyncio.run(record(args.file))
+    elif args.mode == 'replay':
+        asyncio.run(replay(args.file, args.speed, args.entry_threshold, args.cash))
+    else:
+        parser.print_help()
\ No newline at end of file
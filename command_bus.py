@@ -0,0 +1,139 @@
+# command_bus.py
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+
+logger = logging.getLogger('bot')
+
+# Returned by a handler when the command is meant for another worker (for
+# example one trading a different shard of symbols); no ack is sent
+SKIP = object()
+
+
+def make_command(name, **args):
+    """
+    Builds a command message; the web app publishes it JSON-encoded.
+    """
+    return {
+        'command': name,
+        'id': uuid.uuid4().hex,
+        'sent_at': time.time(),
+        'args': args,
+    }
+
+
+def parse_command(data):
+    """
+    Parses a published command. Plain strings such as b'execute_trade' are
+    accepted for compatibility with older web app releases.
+    """
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    try:
+        command = json.loads(data)
+    except ValueError:
+        command = None
+    if not isinstance(command, dict):
+        command = {'command': data}
+    command.setdefault('id', None)
+    command.setdefault('sent_at', None)
+    command.setdefault('args', {})
+    return command
+
+
+class CommandBus:
+    """
+    Blocks on the bot_commands channel and dispatches each command to the
+    handler registered for it, then acknowledges it with its latency.
+    """
+
+    def __init__(self, redis_client, channel='bot_commands', ack_key='bot_command_acks', max_acks=100):
+        self.redis_client = redis_client
+        self.channel = channel
+        self.ack_key = ack_key
+        self.max_acks = max_acks
+        self.handlers = {}
+
+    def handler(self, name):
+        """
+        Decorator registering an async handler for the named command.
+        """
+        def register(function):
+            self.handlers[name] = function
+            return function
+        return register
+
+    async def dispatch(self, data):
+        """
+        Runs the handler for one published command and acknowledges it.
+        """
+        received_at = time.time()
+        command = parse_command(data)
+        name = command['command']
+        handler = self.handlers.get(name)
+        if handler is None:
+            logger.warning(f"Unknown command received: {name}")
+            status, result = 'unknown', None
+        else:
+            try:
+                status, result = 'ok', await handler(command)
+                if result is SKIP:
+                    return None
+            except Exception as e:
+                logger.error(f"Error handling command {name}: {e}")
+                status, result = 'error', str(e)
+        handled_at = time.time()
+
+        ack = {
+            'id': command['id'],
+            'command': name,
+            'status': status,
+            'result': result,
+            'handled_at': handled_at,
+            'dispatch_ms': (handled_at - received_at) * 1000,
+            # Click-to-order latency; spans the web and worker dyno clocks
+            'latency_ms': (handled_at - command['sent_at']) * 1000 if command['sent_at'] else None,
+        }
+        await self.acknowledge(ack)
+        return ack
+
+    async def acknowledge(self, ack):
+        if ack['latency_ms'] is not None:
+            logger.info(f"Command {ack['command']} {ack['status']} in {ack['latency_ms']:.1f} ms (click to order).")
+        if self.redis_client is None:
+            return
+        payload = json.dumps(ack)
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.lpush(self.ack_key, payload)
+            pipe.ltrim(self.ack_key, 0, self.max_acks - 1)
+            pipe.publish(self.ack_key, payload)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Error acknowledging command {ack['command']}: {e}")
+
+    async def run(self):
+        """
+        Subscribes and dispatches until cancelled, resubscribing after
+        connection errors. Waits on the socket, so it costs nothing when idle.
+        """
+        while True:
+            pubsub = self.redis_client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message['type'] == 'message':
+                        await self.dispatch(message['data'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Command listener error: {e}. Resubscribing in 1 second.")
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
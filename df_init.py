@@ -1,20 +1,36 @@
 import os
 import pandas as pd
+import redis
 from alpaca.trading.client import TradingClient
 import config as cg
+from account_cache import SharedAccountInfo
+from redis_state import redis_tls_kwargs
 
-def get_account_info():
-    # Initialize the trading client with API keys from the config
-    client = TradingClient(cg.api_key, cg.secret_key, paper=True)
+# Built on first use and shared by every call in the process
+_account_info = None
+_trading_client = None
 
-    # Retrieve account information as a dictionary
-    account = dict(client.get_account())
+def _fetch_account():
+    global _trading_client
+    if _trading_client is None:
+        _trading_client = TradingClient(cg.api_key, cg.secret_key, paper=True)
+    return _trading_client.get_account()
 
-    # Convert the account information to a DataFrame
-    df = pd.DataFrame(account, index=[0])
+def account_info():
+    """
+    Returns the process-wide SharedAccountInfo: the snapshot the bot
+    publishes to Redis, falling back to one cached Alpaca call.
+    """
+    global _account_info
+    if _account_info is None:
+        redis_url = os.environ.get('REDIS_URL')
+        redis_client = redis.Redis.from_url(redis_url, **redis_tls_kwargs(redis_url)) if redis_url else None
+        _account_info = SharedAccountInfo(redis_client, fetch=_fetch_account)
+    return _account_info
 
-    # Select relevant columns
-    df = df[['buying_power', 'status', 'cash']]
+def get_account_info():
+    # Snapshot of the relevant account fields
+    snapshot = account_info().get()
 
-    # Return the DataFrame
-    return df
\ No newline at end of file
+    # Return the DataFrame with the same columns as before
+    return pd.DataFrame([snapshot], index=[0])[['buying_power', 'status', 'cash']]
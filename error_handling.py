@@ -1,18 +1,50 @@
+import asyncio
 import logging
+import os
+import random
 import time
-from alpaca.common.exceptions import APIError, APIConnectionError, RateLimitError
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+import requests
+from alpaca.common.exceptions import APIError
+
+logger = logging.getLogger('bot')
+
+# Alpaca allows 200 trading API requests per minute per account
+ALPACA_RATE_LIMIT = float(os.environ.get('ALPACA_RATE_LIMIT', 200))
+ALPACA_BURST = float(os.environ.get('ALPACA_BURST', 20))
+
+
+def is_rate_limit(error):
+    return isinstance(error, APIError) and error.status_code == 429
+
+
+def is_connection_error(error):
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout, ConnectionError, TimeoutError))
+
+
+def is_retryable(error):
+    """
+    Rate limits, server errors and connection failures are worth retrying;
+    other API errors (rejected orders, bad requests) are not.
+    """
+    if is_rate_limit(error) or is_connection_error(error):
+        return True
+    return isinstance(error, APIError) and (error.status_code or 0) >= 500
+
 
 class ErrorHandler:
+    """
+    Blocking helpers for scripts. Code running on the bot's event loop
+    should use ResilientCaller instead, which never sleeps the loop.
+    """
+
     @staticmethod
     def handle_api_error(error):
         """Handle API-related errors."""
-        if isinstance(error, RateLimitError):
+        if is_rate_limit(error):
             logging.error("Rate limit exceeded. Waiting 60 seconds before retrying...")
             time.sleep(60)  # Wait for 60 seconds before retrying
-        elif isinstance(error, APIConnectionError):
+        elif is_connection_error(error):
             logging.error("Connection error occurred. Retrying in 10 seconds...")
             time.sleep(10)  # Wait for 10 seconds before retrying
         elif isinstance(error, APIError):
@@ -43,7 +75,245 @@ class ErrorHandler:
         """Safely execute a function with error handling."""
         try:
             return function(*args, **kwargs)
-        except APIError as api_error:
+        except (APIError, requests.exceptions.RequestException) as api_error:
             ErrorHandler.handle_api_error(api_error)
         except Exception as general_error:
             ErrorHandler.handle_general_error(general_error)
+
+
+class RateLimitedError(Exception):
+    """
+    Raised instead of waiting when the request budget will not allow a
+    call within its max_wait.
+    """
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised without calling the endpoint while its circuit breaker is open.
+    """
+
+
+class TokenBucket:
+    """
+    Request budget shared by every caller in the process: rate tokens per
+    second, holding at most capacity. penalize() empties it for a while
+    after the server reports a rate limit.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._clock = clock
+        self._updated = clock()
+        self.shed = 0
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self):
+        """
+        Seconds until a token is available.
+        """
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def try_acquire(self):
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    async def acquire(self, max_wait=None):
+        """
+        Takes a token, waiting for one if that takes at most max_wait
+        seconds (forever when None). Otherwise raises RateLimitedError
+        at once, so callers shed load instead of queueing up.
+        """
+        while not self.try_acquire():
+            delay = self.wait_time()
+            if max_wait is not None and delay > max_wait:
+                self.shed += 1
+                raise RateLimitedError(f"Request budget exhausted for {delay:.1f} s")
+            if max_wait is not None:
+                max_wait -= delay
+            await asyncio.sleep(delay)
+
+    def penalize(self, seconds):
+        """
+        Makes the bucket report empty for about seconds.
+        """
+        self._refill()
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+class CircuitBreaker:
+    """
+    Stops calling an endpoint class after failure_threshold consecutive
+    failures. After reset_timeout one trial call is let through: success
+    closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if self._clock() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def before_call(self):
+        state = self.state
+        if state == 'open' or (state == 'half-open' and self._trial_running):
+            raise CircuitOpenError(f"Circuit for {self.name} is open")
+        if state == 'half-open':
+            self._trial_running = True
+
+    def release_trial(self):
+        """
+        Lets another trial through after one ended without an outcome,
+        e.g. shed by the rate limiter or cancelled.
+        """
+        self._trial_running = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_running = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"Opening circuit for {self.name} after {self.failures} failures.")
+            self.opened_at = self._clock()
+
+
+class CallPolicy:
+    """
+    Retry settings for one endpoint class. max_wait bounds how long a call
+    may wait for the request budget; retry_on decides which errors are
+    retried.
+    """
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=10.0, max_wait=5.0, retry_on=is_retryable):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_wait = max_wait
+        self.retry_on = retry_on
+
+
+def backoff_delay(attempt, base_delay, max_delay, rng=random):
+    """
+    Exponential backoff with full jitter: a random delay up to
+    base_delay * 2**attempt, capped at max_delay.
+    """
+    return rng.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+# A market order may have been executed when the connection dropped, so
+# orders are only retried when the server refused them for the rate limit
+ENDPOINT_POLICIES = {
+    'orders': CallPolicy(max_attempts=3, max_wait=2.0, retry_on=is_rate_limit),
+    'account': CallPolicy(),
+}
+
+ENDPOINT_CLASSES = {
+    'submit_order': 'orders',
+    'cancel_order_by_id': 'orders',
+    'get_account': 'account',
+    'get_all_positions': 'account',
+}
+
+
+class ResilientCaller:
+    """
+    Runs blocking client methods in worker threads behind a shared token
+    bucket, a circuit breaker per endpoint class and retries with jittered
+    exponential backoff. Waiting is done with asyncio.sleep, so the event
+    loop keeps processing ticks.
+    """
+
+    def __init__(self, bucket, policies=ENDPOINT_POLICIES, endpoint_classes=ENDPOINT_CLASSES,
+                 failure_threshold=5, reset_timeout=30.0, rng=random):
+        self.bucket = bucket
+        self.policies = policies
+        self.endpoint_classes = endpoint_classes
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.rng = rng
+        self.breakers = {}
+        self.retries = 0
+
+    def breaker(self, endpoint_class):
+        if endpoint_class not in self.breakers:
+            self.breakers[endpoint_class] = CircuitBreaker(endpoint_class, self.failure_threshold, self.reset_timeout)
+        return self.breakers[endpoint_class]
+
+    async def call(self, name, function, *args):
+        """
+        Calls function(*args) in a worker thread; name picks the endpoint class.
+        """
+        endpoint_class = self.endpoint_classes.get(name, 'other')
+        policy = self.policies.get(endpoint_class) or CallPolicy()
+        breaker = self.breaker(endpoint_class)
+        attempt = 0
+        while True:
+            breaker.before_call()
+            try:
+                await self.bucket.acquire(policy.max_wait)
+                result = await asyncio.to_thread(function, *args)
+            except Exception as error:
+                if isinstance(error, RateLimitedError):
+                    # Shed before reaching the endpoint: says nothing about it
+                    breaker.release_trial()
+                    raise
+                if is_rate_limit(error):
+                    # Everyone backs off, not just this caller
+                    self.bucket.penalize(backoff_delay(attempt, 1.0, policy.max_delay, self.rng) + 1.0)
+                elif not is_retryable(error):
+                    # The endpoint answered; the request itself was refused
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                attempt += 1
+                if attempt >= policy.max_attempts or not policy.retry_on(error):
+                    raise
+                self.retries += 1
+                delay = backoff_delay(attempt, policy.base_delay, policy.max_delay, self.rng)
+                logger.warning(f"{name} failed ({error}); retry {attempt} in {delay:.2f} s.")
+                await asyncio.sleep(delay)
+            except BaseException:
+                # Cancelled while waiting for a token or the call
+                breaker.release_trial()
+                raise
+            else:
+                breaker.record_success()
+                return result
+
+    def stats(self):
+        return {
+            'tokens': self.bucket.tokens,
+            'shed': self.bucket.shed,
+            'retries': self.retries,
+            'breakers': {name: breaker.state for name, breaker in self.breakers.items()},
+        }
+
+
+# Shared by everything in the process that calls the Alpaca trading API
+alpaca_bucket = TokenBucket(ALPACA_RATE_LIMIT / 60, ALPACA_BURST)
@@ -0,0 +1,121 @@
+# hot_logging.py
+
+import atexit
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+# Pass as extra= on trade events so they are never dropped or sampled
+TRADE = {'trade': True}
+
+LOG_FORMAT = '%(asctime)s %(levelname)s: %(message)s'
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Hands records to a bounded queue without formatting them.
+
+    When the queue is full, routine records are dropped and counted. Warnings,
+    errors and trade events wait for room instead, so they are never lost.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Formatting happens on the listener thread, not the event loop
+        return record
+
+    def enqueue(self, record):
+        if record.levelno >= logging.WARNING or getattr(record, 'trade', False):
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogSampler:
+    """
+    Logs a recurring message at most once per interval per key, adding the
+    number of occurrences suppressed since it was last written.
+    """
+
+    def __init__(self, logger, interval=10.0, level=logging.INFO):
+        self.logger = logger
+        self.interval = interval
+        self.level = level
+        self._last = {}
+        self._suppressed = {}
+
+    def log(self, key, msg, *args):
+        if not self.logger.isEnabledFor(self.level):
+            return
+        now = time.monotonic()
+        last = self._last.get(key)
+        if last is not None and now - last < self.interval:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return
+        self._last[key] = now
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            self.logger.log(self.level, msg + " (%d similar suppressed)", *args, suppressed)
+        else:
+            self.logger.log(self.level, msg, *args)
+
+
+class RedisStreamHandler(logging.Handler):
+    """
+    Appends records to a capped Redis Stream (XADD MAXLEN ~) that the
+    dashboard reads incrementally. Meant to run on the listener thread, so
+    it takes a synchronous client.
+    """
+
+    def __init__(self, redis_client, key='bot_logs', maxlen=1000, retry_after=30.0):
+        super().__init__()
+        self.setFormatter(logging.Formatter(LOG_FORMAT))
+        self.redis_client = redis_client
+        self.key = key
+        self.maxlen = maxlen
+        self.retry_after = retry_after
+        self._disabled_until = 0.0
+
+    def emit(self, record):
+        if self.redis_client is None or time.monotonic() < self._disabled_until:
+            return
+        try:
+            self.redis_client.xadd(
+                self.key,
+                {'ts': record.created, 'level': record.levelname, 'message': self.format(record)},
+                maxlen=self.maxlen,
+                approximate=True,
+            )
+        except Exception:
+            # Back off instead of failing on every record while Redis is down
+            self._disabled_until = time.monotonic() + self.retry_after
+
+
+def configure_logging(logger, level=logging.INFO, queue_size=10000, extra_handlers=()):
+    """
+    Routes logger through a bounded queue to a listener thread that does the
+    formatting and I/O for the console and any extra handlers. Returns the
+    (queue handler, listener) pair.
+    """
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(level)
+    console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handlers = [console_handler, *extra_handlers]
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = BoundedQueueHandler(log_queue)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+    logger.setLevel(level)
+    logger.addHandler(queue_handler)
+    listener.start()
+    # Drain whatever is still queued when the process exits
+    atexit.register(listener.stop)
+    return queue_handler, listener
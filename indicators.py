@@ -0,0 +1,375 @@
+# indicators.py
+
+import math
+from array import array
+
+NAN = float('nan')
+
+
+class SMA:
+    """
+    Simple moving average over the last window values. The running sum
+    is recomputed from the ring each time it wraps, so rounding error
+    cannot build up over a long stream.
+    """
+    __slots__ = ('window', 'value', '_ring', '_pos', '_count', '_total')
+
+    def __init__(self, window):
+        self.window = window
+        self.value = NAN
+        self._ring = array('d', bytes(8 * window))
+        self._pos = 0
+        self._count = 0
+        self._total = 0.0
+
+    def update(self, x):
+        pos = self._pos
+        self._total += x - self._ring[pos]
+        self._ring[pos] = x
+        pos += 1
+        if pos == self.window:
+            pos = 0
+            self._total = math.fsum(self._ring)
+        self._pos = pos
+        if self._count < self.window:
+            self._count += 1
+            if self._count < self.window:
+                return NAN
+        self.value = self._total / self.window
+        return self.value
+
+
+class EMA:
+    """
+    Exponential moving average with alpha = 2 / (span + 1), seeded with
+    the first value.
+    """
+    __slots__ = ('alpha', 'value')
+
+    def __init__(self, span=None, alpha=None):
+        self.alpha = alpha if alpha is not None else 2.0 / (span + 1)
+        self.value = NAN
+
+    def update(self, x):
+        value = self.value
+        if value != value:  # NaN until the first update
+            self.value = x
+        else:
+            self.value = value + self.alpha * (x - value)
+        return self.value
+
+
+class _MonotonicRing:
+    """
+    Monotonic deque of (index, value) kept in two preallocated rings.
+    Values are kept increasing (keep_greater=False, for minimums) or
+    decreasing (for maximums), so the extreme is always at the head.
+    """
+    __slots__ = ('window', 'keep_greater', '_values', '_indexes', '_head', '_size')
+
+    def __init__(self, window, keep_greater):
+        self.window = window
+        self.keep_greater = keep_greater
+        self._values = array('d', bytes(8 * window))
+        self._indexes = array('q', bytes(8 * window))
+        self._head = 0
+        self._size = 0
+
+    def push(self, index, x):
+        window = self.window
+        values = self._values
+        # Expire the head once it falls out of the window
+        if self._size and self._indexes[self._head] <= index - window:
+            self._head = (self._head + 1) % window
+            self._size -= 1
+        # Drop tail entries the new value dominates
+        size = self._size
+        tail = (self._head + size - 1) % window
+        if self.keep_greater:
+            while size and values[tail] <= x:
+                size -= 1
+                tail = (tail - 1) % window
+        else:
+            while size and values[tail] >= x:
+                size -= 1
+                tail = (tail - 1) % window
+        tail = (self._head + size) % window
+        values[tail] = x
+        self._indexes[tail] = index
+        self._size = size + 1
+        return values[self._head]
+
+
+class RollingMin:
+    """
+    Minimum of the last window values in amortized constant time.
+    """
+    __slots__ = ('window', 'value', '_ring', '_index')
+    keep_greater = False
+
+    def __init__(self, window):
+        self.window = window
+        self.value = NAN
+        self._ring = _MonotonicRing(window, self.keep_greater)
+        self._index = 0
+
+    def update(self, x):
+        extreme = self._ring.push(self._index, x)
+        self._index += 1
+        self.value = extreme if self._index >= self.window else NAN
+        return self.value
+
+
+class RollingMax(RollingMin):
+    """
+    Maximum of the last window values in amortized constant time.
+    """
+    __slots__ = ()
+    keep_greater = True
+
+
+class RollingStd:
+    """
+    Sample standard deviation (ddof=1) of the last window values, using
+    Welford's update with the oldest value removed as each new one enters.
+    The mean and sum of squares are recomputed from the ring when it wraps.
+    """
+    __slots__ = ('window', 'value', '_ring', '_pos', '_count', '_mean', '_m2')
+
+    def __init__(self, window):
+        if window < 2:
+            raise ValueError("RollingStd needs a window of at least 2")
+        self.window = window
+        self.value = NAN
+        self._ring = array('d', bytes(8 * window))
+        self._pos = 0
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, x):
+        pos = self._pos
+        if self._count < self.window:
+            self._count += 1
+            delta = x - self._mean
+            self._mean += delta / self._count
+            self._m2 += delta * (x - self._mean)
+        else:
+            old = self._ring[pos]
+            mean = self._mean
+            new_mean = mean + (x - old) / self.window
+            self._m2 += (x - old) * (x - new_mean + old - mean)
+            self._mean = new_mean
+        self._ring[pos] = x
+        pos += 1
+        if pos == self.window:
+            pos = 0
+            mean = self._mean = math.fsum(self._ring) / self.window
+            self._m2 = math.fsum((value - mean) ** 2 for value in self._ring)
+        self._pos = pos
+        if self._count < self.window:
+            return NAN
+        # Rounding can leave a tiny negative sum of squares for flat prices
+        self.value = math.sqrt(max(self._m2, 0.0) / (self.window - 1))
+        return self.value
+
+
+class VWAP:
+    """
+    Volume-weighted average price over the last window updates, or since
+    the start when window is None.
+    """
+    __slots__ = ('window', 'value', '_pv_ring', '_volume_ring', '_pos', '_pv', '_v')
+
+    def __init__(self, window=None):
+        self.window = window
+        self.value = NAN
+        size = window or 0
+        self._pv_ring = array('d', bytes(8 * size))
+        self._volume_ring = array('d', bytes(8 * size))
+        self._pos = 0
+        self._pv = 0.0
+        self._v = 0.0
+
+    def update(self, price, volume):
+        pv = price * volume
+        if self.window:
+            pos = self._pos
+            self._pv += pv - self._pv_ring[pos]
+            self._v += volume - self._volume_ring[pos]
+            self._pv_ring[pos] = pv
+            self._volume_ring[pos] = volume
+            pos += 1
+            if pos == self.window:
+                pos = 0
+                # Recompute on wrap, as SMA does
+                self._pv = math.fsum(self._pv_ring)
+                self._v = math.fsum(self._volume_ring)
+            self._pos = pos
+        else:
+            self._pv += pv
+            self._v += volume
+        self.value = self._pv / self._v if self._v else NAN
+        return self.value
+
+
+class ATR:
+    """
+    Average true range with Wilder's smoothing: the mean of the first
+    period true ranges, then atr += (tr - atr) / period. The first bar's
+    true range is its high - low.
+    """
+    __slots__ = ('period', 'value', '_prev_close', '_count', '_seed')
+
+    def __init__(self, period=14):
+        self.period = period
+        self.value = NAN
+        self._prev_close = NAN
+        self._count = 0
+        self._seed = 0.0
+
+    def update(self, high, low, close):
+        prev_close = self._prev_close
+        true_range = high - low
+        if prev_close == prev_close:
+            true_range = max(true_range, abs(high - prev_close), abs(low - prev_close))
+        self._prev_close = close
+        if self._count < self.period:
+            self._count += 1
+            self._seed += true_range
+            if self._count == self.period:
+                self.value = self._seed / self.period
+            return self.value
+        self.value += (true_range - self.value) / self.period
+        return self.value
+
+
+class IndicatorSet:
+    """
+    The indicators the quote path keeps for one symbol, fed the bid price
+    and bid size of every received quote.
+    """
+    __slots__ = ('sma', 'ema', 'low', 'high', 'std', 'vwap')
+
+    def __init__(self, window):
+        self.sma = SMA(window)
+        self.ema = EMA(span=window)
+        self.low = RollingMin(window)
+        self.high = RollingMax(window)
+        self.std = RollingStd(max(window, 2))
+        self.vwap = VWAP(window)
+
+    def update(self, price, size):
+        self.sma.update(price)
+        self.ema.update(price)
+        self.low.update(price)
+        self.high.update(price)
+        self.std.update(price)
+        self.vwap.update(price, size)
+
+    def values(self):
+        return {
+            'sma': self.sma.value,
+            'ema': self.ema.value,
+            'min': self.low.value,
+            'max': self.high.value,
+            'std': self.std.value,
+            'vwap': self.vwap.value,
+        }
+
+
+# Batch versions for backtesting: the same values as feeding the streaming
+# classes one by one (up to floating-point rounding), NaN where the
+# streaming version has no value yet.
+
+def _windows(x, window):
+    import numpy as np
+    return np.lib.stride_tricks.sliding_window_view(np.asarray(x, dtype=np.float64), window)
+
+
+def _pad(values, window):
+    import numpy as np
+    return np.concatenate([np.full(window - 1, np.nan), values])
+
+
+def sma(x, window):
+    return _pad(_windows(x, window).mean(axis=1), window)
+
+
+def rolling_min(x, window):
+    return _pad(_windows(x, window).min(axis=1), window)
+
+
+def rolling_max(x, window):
+    return _pad(_windows(x, window).max(axis=1), window)
+
+
+def rolling_std(x, window):
+    return _pad(_windows(x, window).std(axis=1, ddof=1), window)
+
+
+def vwap(prices, volumes, window=None):
+    import numpy as np
+    pv = np.asarray(prices, dtype=np.float64) * np.asarray(volumes, dtype=np.float64)
+    volumes = np.asarray(volumes, dtype=np.float64)
+    if window is None:
+        return np.cumsum(pv) / np.cumsum(volumes)
+    # Partial windows at the start, as the streaming version
+    head = np.cumsum(pv[:window - 1]) / np.cumsum(volumes[:window - 1])
+    full = _windows(pv, window).sum(axis=1) / _windows(volumes, window).sum(axis=1)
+    return np.concatenate([head, full])
+
+
+def _recursive_average(x, alpha, initial):
+    """
+    y[i] = y[i-1] + alpha * (x[i] - y[i-1]) starting from initial, solved
+    in closed form over blocks short enough for the powers of (1 - alpha)
+    to stay well conditioned.
+    """
+    import numpy as np
+    x = np.asarray(x, dtype=np.float64)
+    out = np.empty_like(x)
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        out[:] = x
+        return out
+    # decay ** -block stays below 1e4
+    block = max(1, min(1024, int(4 * math.log(10) / -math.log(decay))))
+    powers = decay ** np.arange(1, block + 1)
+    y = initial
+    for start in range(0, len(x), block):
+        chunk = x[start:start + block]
+        k = len(chunk)
+        scaled = np.cumsum(alpha * chunk / powers[:k])
+        out[start:start + k] = powers[:k] * (y + scaled)
+        y = out[start + k - 1]
+    return out
+
+
+def ema(x, span=None, alpha=None):
+    import numpy as np
+    alpha = alpha if alpha is not None else 2.0 / (span + 1)
+    x = np.asarray(x, dtype=np.float64)
+    if not len(x):
+        return x.copy()
+    out = np.empty_like(x)
+    out[0] = x[0]
+    out[1:] = _recursive_average(x[1:], alpha, x[0])
+    return out
+
+
+def atr(high, low, close, period=14):
+    import numpy as np
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    true_range = high - low
+    prev_close = close[:-1]
+    true_range[1:] = np.maximum.reduce([true_range[1:], np.abs(high[1:] - prev_close), np.abs(low[1:] - prev_close)])
+    out = np.full(len(true_range), np.nan)
+    if len(true_range) < period:
+        return out
+    seed = true_range[:period].sum() / period
+    out[period - 1] = seed
+    out[period:] = _recursive_average(true_range[period:], 1.0 / period, seed)
+    return out
@@ -0,0 +1,230 @@
+# local_redis.py
+
+import asyncio
+import time
+
+
+def _encode(value):
+    """
+    Encodes a value the way redis-py does before sending it.
+    """
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    if isinstance(value, float):
+        return repr(value).encode('utf-8')
+    return str(value).encode('utf-8')
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the redis.asyncio client used by the bot.
+
+    latency is added to every round trip. With blocking=True the delay blocks
+    the event loop, the way a synchronous client called from a coroutine does.
+    """
+
+    def __init__(self, latency=0.0, blocking=False):
+        self.latency = latency
+        self.blocking = blocking
+        self.hashes = {}
+        self.lists = {}
+        self.strings = {}
+        self.round_trips = 0
+        self._subscribers = {}
+
+    async def _round_trip(self):
+        self.round_trips += 1
+        if self.latency:
+            if self.blocking:
+                time.sleep(self.latency)
+            else:
+                await asyncio.sleep(self.latency)
+
+    def _hset(self, key, field=None, value=None, mapping=None):
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+        hash_ = self.hashes.setdefault(key, {})
+        added = 0
+        for f, v in items.items():
+            f = _encode(f)
+            added += f not in hash_
+            hash_[f] = _encode(v)
+        return added
+
+    def _hget(self, key, field):
+        return self.hashes.get(key, {}).get(_encode(field))
+
+    def _hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def _hdel(self, key, *fields):
+        hash_ = self.hashes.get(key, {})
+        return sum(hash_.pop(_encode(f), None) is not None for f in fields)
+
+    def _lpush(self, key, *values):
+        list_ = self.lists.setdefault(key, [])
+        for value in values:
+            list_.insert(0, _encode(value))
+        return len(list_)
+
+    def _ltrim(self, key, start, end):
+        list_ = self.lists.get(key, [])
+        end = len(list_) if end == -1 else end + 1
+        self.lists[key] = list_[start:end]
+        return True
+
+    def _lrange(self, key, start, end):
+        list_ = self.lists.get(key, [])
+        end = len(list_) if end == -1 else end + 1
+        return list_[start:end]
+
+    def _incr(self, key):
+        value = int(self.strings.get(key, b'0')) + 1
+        self.strings[key] = _encode(value)
+        return value
+
+    def _get(self, key):
+        return self.strings.get(key)
+
+    def _publish(self, channel, message):
+        subscribers = self._subscribers.get(_encode(channel), ())
+        for pubsub in subscribers:
+            pubsub._deliver(_encode(channel), _encode(message))
+        return len(subscribers)
+
+    async def ping(self):
+        await self._round_trip()
+        return True
+
+    async def hset(self, key, field=None, value=None, mapping=None):
+        await self._round_trip()
+        return self._hset(key, field, value, mapping)
+
+    async def hget(self, key, field):
+        await self._round_trip()
+        return self._hget(key, field)
+
+    async def hgetall(self, key):
+        await self._round_trip()
+        return self._hgetall(key)
+
+    async def hdel(self, key, *fields):
+        await self._round_trip()
+        return self._hdel(key, *fields)
+
+    async def lpush(self, key, *values):
+        await self._round_trip()
+        return self._lpush(key, *values)
+
+    async def ltrim(self, key, start, end):
+        await self._round_trip()
+        return self._ltrim(key, start, end)
+
+    async def lrange(self, key, start, end):
+        await self._round_trip()
+        return self._lrange(key, start, end)
+
+    async def incr(self, key):
+        await self._round_trip()
+        return self._incr(key)
+
+    async def get(self, key):
+        await self._round_trip()
+        return self._get(key)
+
+    async def publish(self, channel, message):
+        await self._round_trip()
+        return self._publish(channel, message)
+
+    def pipeline(self, transaction=True):
+        return LocalPipeline(self)
+
+    def pubsub(self):
+        return LocalPubSub(self)
+
+    async def aclose(self):
+        pass
+
+
+class LocalPipeline:
+    """
+    Buffers commands and applies them in one round trip on execute().
+    """
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self._commands = []
+
+    def _queue(name):
+        def command(self, *args, **kwargs):
+            self._commands.append((name, args, kwargs))
+            return self
+        return command
+
+    hset = _queue('_hset')
+    hget = _queue('_hget')
+    hgetall = _queue('_hgetall')
+    hdel = _queue('_hdel')
+    lpush = _queue('_lpush')
+    ltrim = _queue('_ltrim')
+    lrange = _queue('_lrange')
+    incr = _queue('_incr')
+    get = _queue('_get')
+    publish = _queue('_publish')
+
+    async def execute(self):
+        commands, self._commands = self._commands, []
+        await self.redis_client._round_trip()
+        return [getattr(self.redis_client, name)(*args, **kwargs) for name, args, kwargs in commands]
+
+
+class LocalPubSub:
+    """
+    Pub/sub subscription that receives messages published on LocalRedis.
+    """
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.channels = set()
+        self._messages = asyncio.Queue()
+
+    def _deliver(self, channel, data):
+        self._messages.put_nowait({'type': 'message', 'pattern': None, 'channel': channel, 'data': data})
+
+    async def subscribe(self, *channels):
+        for channel in channels:
+            channel = _encode(channel)
+            self.channels.add(channel)
+            self.redis_client._subscribers.setdefault(channel, set()).add(self)
+            self._messages.put_nowait({'type': 'subscribe', 'pattern': None, 'channel': channel, 'data': len(self.channels)})
+
+    async def unsubscribe(self, *channels):
+        for channel in channels or tuple(self.channels):
+            channel = _encode(channel)
+            self.channels.discard(channel)
+            self.redis_client._subscribers.get(channel, set()).discard(self)
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        while True:
+            try:
+                if timeout is None:
+                    message = await self._messages.get()
+                elif self._messages.empty() and timeout > 0:
+                    message = await asyncio.wait_for(self._messages.get(), timeout)
+                else:
+                    message = self._messages.get_nowait()
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                return None
+            if ignore_subscribe_messages and message['type'] != 'message':
+                continue
+            return message
+
+    async def listen(self):
+        while self.channels:
+            yield await self._messages.get()
+
+    async def aclose(self):
+        await self.unsubscribe()
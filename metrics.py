@@ -0,0 +1,179 @@
+# metrics.py
+
+from bisect import bisect_left
+
+# Upper bounds in milliseconds for latency histograms
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Upper bounds in microseconds for per-tick timings
+TICK_BUCKETS_US = (2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 50000, 100000, 500000)
+
+# Prefix of every exported Prometheus metric name
+PROMETHEUS_PREFIX = 'tradingbot_'
+
+
+class Counter:
+    """
+    Monotonic counter. Either incremented in place, or, with read, taken
+    from an existing statistic when a snapshot is made so the counted code
+    pays nothing extra.
+    """
+    __slots__ = ('name', 'help', 'labels', 'value', 'read')
+    kind = 'counter'
+
+    def __init__(self, name, help='', labels=None, read=None):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self.value = 0
+        self.read = read
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def to_dict(self):
+        value = self.read() if self.read is not None else self.value
+        return {'name': self.name, 'help': self.help, 'labels': self.labels, 'value': value}
+
+
+class Gauge(Counter):
+    """
+    A value that can go up and down, usually read when a snapshot is made.
+    """
+    __slots__ = ()
+    kind = 'gauge'
+
+    def set(self, value):
+        self.value = value
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. observe() only increments preallocated counters.
+    A value falls in the first bucket whose upper bound is >= the value; the
+    last bucket catches everything above the largest bound. Bounds are kept
+    as floats because bisecting mixed int and float comparisons is slower.
+    """
+    __slots__ = ('name', 'help', 'labels', 'bounds', 'counts', 'sum')
+    kind = 'histogram'
+
+    def __init__(self, name, buckets=LATENCY_BUCKETS_MS, help='', labels=None):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self.bounds = tuple(float(bound) for bound in buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def quantile(self, q):
+        """
+        Returns the upper bound of the bucket holding the q-th quantile
+        (inf when it falls past the largest bound).
+        """
+        total = self.count
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.bounds[i] if i < len(self.bounds) else float('inf')
+        return float('inf')
+
+    def summary(self):
+        count = self.count
+        return {
+            'count': count,
+            'mean': self.sum / count if count else 0.0,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+        }
+
+    def to_dict(self):
+        return {
+            'name': self.name, 'help': self.help, 'labels': self.labels,
+            'bounds': self.bounds, 'counts': self.counts, 'sum': self.sum, 'count': self.count,
+        }
+
+
+class Registry:
+    """
+    The metrics one process exports. snapshot() is JSON-serialisable and
+    render_prometheus() turns snapshots back into the text format.
+    """
+
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help='', labels=None, read=None):
+        return self.add(Counter(name, help, labels, read))
+
+    def gauge(self, name, help='', labels=None, read=None):
+        return self.add(Gauge(name, help, labels, read))
+
+    def histogram(self, name, buckets=LATENCY_BUCKETS_MS, help='', labels=None):
+        return self.add(Histogram(name, buckets, help, labels))
+
+    def snapshot(self):
+        metrics = {'counter': [], 'gauge': [], 'histogram': []}
+        for metric in self.metrics:
+            metrics[metric.kind].append(metric.to_dict())
+        return metrics
+
+
+def _label_text(labels, extra=None):
+    labels = {**labels, **(extra or {})}
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(snapshots, prefix=PROMETHEUS_PREFIX):
+    """
+    Renders {source: snapshot} in the Prometheus text exposition format,
+    adding a 'source' label, e.g. the bot shard, to every sample.
+    """
+    families = {}
+    for source, snapshot in snapshots.items():
+        for kind in ('counter', 'gauge', 'histogram'):
+            for metric in snapshot.get(kind, ()):
+                family = families.setdefault(prefix + metric['name'], (kind, metric['help'], []))
+                family[2].append((source, metric))
+
+    lines = []
+    for name, (kind, help, samples) in families.items():
+        if help:
+            lines.append(f'# HELP {name} {help}')
+        lines.append(f'# TYPE {name} {kind}')
+        for source, metric in samples:
+            labels = {**metric['labels'], 'source': source}
+            if kind != 'histogram':
+                lines.append(f"{name}{_label_text(labels)} {_number(metric['value'])}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(metric['bounds']) + [float('inf')], metric['counts']):
+                cumulative += count
+                lines.append(f"{name}_bucket{_label_text(labels, {'le': _number(bound)})} {cumulative}")
+            lines.append(f"{name}_sum{_label_text(labels)} {_number(metric['sum'])}")
+            lines.append(f"{name}_count{_label_text(labels)} {metric['count']}")
+    return '\n'.join(lines) + '\n'
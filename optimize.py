@@ -0,0 +1,237 @@
+# optimize.py
+
+import argparse
+import csv
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from backtest import load_prices, run_backtest, synthetic_prices
+from redis_state import redis_tls_kwargs
+
+PARAMS = ('entry_threshold', 'profit_target', 'stop_loss')
+COLUMNS = PARAMS + ('trades', 'return_pct', 'max_drawdown_pct', 'score')
+
+# Price array attached from shared memory in each worker process
+_prices = None
+_shm = None
+
+
+def _attach_prices(name, length):
+    global _prices, _shm
+    _shm = shared_memory.SharedMemory(name=name)
+    _prices = np.ndarray((length,), dtype=np.float64, buffer=_shm.buf)
+
+
+def score(result, metric):
+    if metric == 'return_over_drawdown':
+        return result['return_pct'] / max(result['max_drawdown_pct'], 1e-9)
+    return result[metric]
+
+
+def _evaluate(batch, length, metric):
+    """
+    Backtests a batch of parameter sets on the first length prices.
+    """
+    prices = _prices[:length]
+    rows = []
+    for entry_threshold, profit_target, stop_loss in batch:
+        result = run_backtest(prices, entry_threshold, profit_target, stop_loss)
+        rows.append({
+            'entry_threshold': entry_threshold,
+            'profit_target': profit_target,
+            'stop_loss': stop_loss,
+            'trades': result['num_trades'],
+            'return_pct': result['return_pct'],
+            'max_drawdown_pct': result['max_drawdown_pct'],
+            'score': score(result, metric),
+        })
+    return rows
+
+
+class Sweep:
+    """
+    Evaluates parameter sets across a process pool. The price array is copied
+    once into shared memory; tasks carry only parameters.
+    """
+
+    def __init__(self, prices, workers=None, metric='return_pct'):
+        prices = np.ascontiguousarray(prices, dtype=np.float64)
+        self.length = len(prices)
+        self.metric = metric
+        self.workers = workers or os.cpu_count()
+        self._shm = shared_memory.SharedMemory(create=True, size=max(prices.nbytes, 1))
+        np.ndarray(prices.shape, dtype=np.float64, buffer=self._shm.buf)[:] = prices
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_attach_prices, initargs=(self._shm.name, self.length)
+        )
+
+    def evaluate(self, candidates, length=None):
+        """
+        Returns result rows for candidates, ranked best first.
+        """
+        length = length or self.length
+        # A few batches per worker keeps them busy without per-task overhead
+        batch_size = max(1, math.ceil(len(candidates) / (self.workers * 4)))
+        batches = [candidates[i:i + batch_size] for i in range(0, len(candidates), batch_size)]
+        rows = []
+        for batch_rows in self._pool.map(_evaluate, batches, [length] * len(batches), [self.metric] * len(batches)):
+            rows.extend(batch_rows)
+        rows.sort(key=lambda row: row['score'], reverse=True)
+        return rows
+
+    def close(self):
+        self._pool.shutdown()
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def parse_range(text):
+    """
+    Parses 'start:stop:step' (stop inclusive) or a single value.
+    """
+    parts = [float(part) for part in text.split(':')]
+    if len(parts) == 1:
+        return parts[0], parts[0], 1.0
+    if len(parts) != 3:
+        raise argparse.ArgumentTypeError(f"Expected start:stop:step, got {text}")
+    return tuple(parts)
+
+
+def grid_candidates(ranges):
+    axes = [np.arange(start, stop + step / 2, step) for start, stop, step in ranges]
+    mesh = np.meshgrid(*axes, indexing='ij')
+    return [tuple(float(v) for v in values) for values in zip(*(axis.ravel() for axis in mesh))]
+
+
+def random_candidates(ranges, samples, seed=1):
+    rng = np.random.default_rng(seed)
+    columns = [rng.uniform(start, stop, samples) for start, stop, _ in ranges]
+    return [tuple(float(v) for v in values) for values in zip(*columns)]
+
+
+def successive_halving(sweep, candidates, eta=3, min_fraction=1 / 27):
+    """
+    Scores all candidates on a short prefix of the history, keeps the best
+    1/eta, and repeats on an eta-times longer prefix until the full history.
+    """
+    fraction = min_fraction
+    while True:
+        length = max(2, int(sweep.length * min(fraction, 1.0)))
+        rows = sweep.evaluate(candidates, length)
+        if fraction >= 1.0 or len(rows) <= 1:
+            return rows
+        keep = max(1, len(rows) // eta)
+        candidates = [tuple(row[param] for param in PARAMS) for row in rows[:keep]]
+        fraction *= eta
+
+
+def print_table(rows, limit):
+    print(f"{'rank':>4} {'threshold':>10} {'target%':>8} {'stop%':>7} {'trades':>7} {'return%':>9} {'maxDD%':>8} {'score':>9}")
+    for rank, row in enumerate(rows[:limit], start=1):
+        print(f"{rank:>4} {row['entry_threshold']:>10.2f} {row['profit_target']:>8.2f} {row['stop_loss']:>7.2f} "
+              f"{row['trades']:>7} {row['return_pct']:>9.2f} {row['max_drawdown_pct']:>8.2f} {row['score']:>9.3f}")
+
+
+def write_results(rows, path):
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=('rank',) + COLUMNS)
+        writer.writeheader()
+        for rank, row in enumerate(rows, start=1):
+            writer.writerow({'rank': rank, **row})
+
+
+def read_result(path, rank):
+    with open(path, newline='') as file:
+        for row in csv.DictReader(file):
+            if int(row['rank']) == rank:
+                return {param: float(row[param]) for param in PARAMS}
+    raise SystemExit(f"No rank {rank} in {path}")
+
+
+def apply_params(params, redis_url=None):
+    """
+    Writes ENTRY_THRESHOLD, PROFIT_TARGET and STOP_LOSS to bot_config; the
+    bot picks them up on its next config refresh.
+    """
+    import redis
+
+    redis_url = redis_url or os.environ.get('REDIS_URL', 'redis://localhost:6379')
+    client = redis.Redis.from_url(redis_url, **redis_tls_kwargs(redis_url))
+    client.hset('bot_config', mapping={
+        'ENTRY_THRESHOLD': params['entry_threshold'],
+        'PROFIT_TARGET': params['profit_target'],
+        'STOP_LOSS': params['stop_loss'],
+    })
+    print(f"Applied to bot_config: ENTRY_THRESHOLD={params['entry_threshold']}, "
+          f"PROFIT_TARGET={params['profit_target']}, STOP_LOSS={params['stop_loss']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parameter sweep for ENTRY_THRESHOLD, PROFIT_TARGET and STOP_LOSS')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    sweep_parser = subparsers.add_parser('sweep', help='Search the parameter space')
+    source = sweep_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--prices', help='.npy, .npz or CSV price file (see backtest.py fetch)')
+    source.add_argument('--synthetic', type=int, help='Use N random-walk prices instead')
+    sweep_parser.add_argument('--column', default='close')
+    sweep_parser.add_argument('--thresholds', type=parse_range, default=(55000, 65000, 1000),
+                              help='start:stop:step for ENTRY_THRESHOLD')
+    sweep_parser.add_argument('--targets', type=parse_range, default=(1, 10, 1), help='start:stop:step for PROFIT_TARGET')
+    sweep_parser.add_argument('--stops', type=parse_range, default=(-5, -0.5, 0.5),
+                              help='start:stop:step for STOP_LOSS; write as --stops=-5:-0.5:0.5')
+    sweep_parser.add_argument('--search', choices=('grid', 'random', 'halving'), default='grid')
+    sweep_parser.add_argument('--samples', type=int, default=500, help='Candidates for random and halving search')
+    sweep_parser.add_argument('--metric', choices=('return_pct', 'pnl', 'return_over_drawdown'), default='return_pct')
+    sweep_parser.add_argument('--workers', type=int, default=None)
+    sweep_parser.add_argument('--top', type=int, default=20, help='Rows to print')
+    sweep_parser.add_argument('--out', help='Write the ranked table to this CSV file')
+    sweep_parser.add_argument('--apply', action='store_true', help='Push the best parameters to bot_config')
+
+    apply_parser = subparsers.add_parser('apply', help='Push a ranked result to bot_config')
+    apply_parser.add_argument('results', help='CSV written by sweep --out')
+    apply_parser.add_argument('--rank', type=int, default=1)
+
+    args = parser.parse_args()
+
+    if args.command == 'apply':
+        apply_params(read_result(args.results, args.rank))
+        return
+
+    prices = synthetic_prices(args.synthetic) if args.synthetic else load_prices(args.prices, args.column)
+    ranges = [args.thresholds, args.targets, args.stops]
+    if args.search == 'grid':
+        candidates = grid_candidates(ranges)
+    else:
+        candidates = random_candidates(ranges, args.samples)
+
+    started = time.perf_counter()
+    with Sweep(prices, workers=args.workers, metric=args.metric) as sweep:
+        if args.search == 'halving':
+            rows = successive_halving(sweep, candidates)
+        else:
+            rows = sweep.evaluate(candidates)
+    elapsed = time.perf_counter() - started
+    print(f"Evaluated {len(candidates)} parameter sets over {len(prices)} prices "
+          f"on {sweep.workers} workers in {elapsed:.1f} s")
+    print_table(rows, args.top)
+
+    if args.out:
+        write_results(rows, args.out)
+    if args.apply and rows:
+        apply_params(rows[0])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+# order_journal.py
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger('bot')
+
+# Segment layout: a 32-byte header, then fixed-width little-endian records.
+# Records are appended in timestamp order, so a segment's timestamp column
+# is sorted and a time range is two binary searches.
+MAGIC = b'BOTJRNL1'
+HEADER = struct.Struct('<8sII16s')      # magic, version, record size, reserved
+RECORD = struct.Struct('<qBBBx16sdd40s')  # timestamp ns, kind, side, order type, symbol, qty, price, order id
+VERSION = 1
+HEADER_SIZE = HEADER.size
+RECORD_SIZE = RECORD.size
+
+KINDS = ('', 'order', 'fill', 'cancel', 'reject')
+SIDES = ('', 'buy', 'sell')
+ORDER_TYPES = ('', 'market', 'limit', 'stop', 'stop_limit')
+
+SEGMENT_PREFIX = 'orders-'
+SEGMENT_SUFFIX = '.bin'
+
+
+def journal_dtype():
+    """
+    NumPy dtype matching one record, for np.memmap.
+    """
+    import numpy as np
+    return np.dtype([
+        ('timestamp', '<i8'),
+        ('kind', 'u1'),
+        ('side', 'u1'),
+        ('order_type', 'u1'),
+        ('_pad', 'V1'),
+        ('symbol', 'S16'),
+        ('qty', '<f8'),
+        ('price', '<f8'),
+        ('order_id', 'S40'),
+    ])
+
+
+def _code(names, value):
+    value = getattr(value, 'value', value)
+    value = str(value).lower() if value else ''
+    return names.index(value) if value in names else 0
+
+
+def segment_paths(directory):
+    """
+    Returns the journal's segment files, oldest first.
+    """
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(
+        name for name in os.listdir(directory)
+        if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+    )
+    return [os.path.join(directory, name) for name in names]
+
+
+def _segment_count(path):
+    with open(path, 'rb') as file:
+        magic, version, record_size, _ = HEADER.unpack(file.read(HEADER_SIZE))
+    if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+        raise ValueError(f"{path} is not a version {VERSION} order journal segment")
+    return (os.path.getsize(path) - HEADER_SIZE) // RECORD_SIZE
+
+
+class OrderJournal:
+    """
+    Append-only order and fill journal split into segments of at most
+    segment_records records.
+
+    append() only packs the record into a buffer, so it is safe to call on
+    the event loop. run() writes the buffer from a worker thread every
+    flush_interval seconds with one fsync per batch; close() writes what
+    is left.
+    """
+
+    def __init__(self, directory, segment_records=100_000, flush_interval=1.0):
+        self.directory = directory
+        self.segment_records = segment_records
+        self.flush_interval = flush_interval
+        self.appended = 0
+        self.fsyncs = 0
+        self._buffer = bytearray()
+        self._last_timestamp = 0
+        # A write cancelled on the loop keeps running in its thread
+        self._write_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._open_latest()
+
+    def _open_latest(self):
+        paths = segment_paths(self.directory)
+        if not paths:
+            self._open_segment(0)
+            return
+        path = paths[-1]
+        count = _segment_count(path)
+        self._segment_index = int(os.path.basename(path)[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+        self._file = open(path, 'ab')
+        # Drop a partial record left by a crash so the records stay aligned
+        size = os.path.getsize(path)
+        partial = (size - HEADER_SIZE) % RECORD_SIZE
+        if partial:
+            self._file.truncate(size - partial)
+        self._segment_count = count
+        if count:
+            with open(path, 'rb') as file:
+                file.seek(HEADER_SIZE + (count - 1) * RECORD_SIZE)
+                self._last_timestamp = RECORD.unpack(file.read(RECORD_SIZE))[0]
+
+    def _open_segment(self, index):
+        self._segment_index = index
+        path = os.path.join(self.directory, f"{SEGMENT_PREFIX}{index:06d}{SEGMENT_SUFFIX}")
+        self._file = open(path, 'ab')
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE, b''))
+        self._segment_count = 0
+
+    def append(self, kind, symbol, side, qty, price, order_id='', order_type='market', timestamp=None):
+        """
+        Buffers one record. Timestamps never go backwards within the journal.
+        """
+        timestamp = time.time_ns() if timestamp is None else int(timestamp)
+        timestamp = self._last_timestamp = max(timestamp, self._last_timestamp)
+        self._buffer += RECORD.pack(
+            timestamp,
+            _code(KINDS, kind),
+            _code(SIDES, side),
+            _code(ORDER_TYPES, order_type),
+            symbol.encode('utf-8')[:16],
+            float(qty or 0),
+            float(price or 0),
+            str(order_id or '').encode('utf-8')[:40],
+        )
+        self.appended += 1
+
+    def _write(self, data):
+        with self._write_lock:
+            self._write_locked(data)
+
+    def _write_locked(self, data):
+        while data:
+            room = (self.segment_records - self._segment_count) * RECORD_SIZE
+            if room <= 0:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._open_segment(self._segment_index + 1)
+                continue
+            chunk, data = data[:room], data[room:]
+            self._file.write(chunk)
+            self._segment_count += len(chunk) // RECORD_SIZE
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.fsyncs += 1
+
+    def _take_buffer(self):
+        data, self._buffer = bytes(self._buffer), bytearray()
+        return data
+
+    def flush(self):
+        """
+        Writes and fsyncs buffered records, blocking the caller.
+        """
+        if self._buffer:
+            self._write(self._take_buffer())
+
+    async def run(self):
+        """
+        Writes buffered records every flush_interval until cancelled.
+        """
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                if self._buffer:
+                    try:
+                        await asyncio.to_thread(self._write, self._take_buffer())
+                    except Exception as e:
+                        logger.error(f"Error writing order journal: {e}")
+        finally:
+            self.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+def load_segment(path):
+    """
+    Memory-maps the complete records of one segment as a structured array.
+    """
+    import numpy as np
+    count = _segment_count(path)
+    if count == 0:
+        return np.zeros(0, dtype=journal_dtype())
+    return np.memmap(path, dtype=journal_dtype(), mode='r', offset=HEADER_SIZE, shape=(count,))
+
+
+def query(directory, start=None, end=None, symbol=None, kind=None):
+    """
+    Returns the records with start <= timestamp < end (ns since the epoch;
+    None leaves that end open), optionally for one symbol and kind.
+
+    Each segment is sorted by time, so the range is found with binary
+    searches; segments entirely outside it are skipped after reading
+    their first and last timestamps.
+    """
+    import numpy as np
+    parts = []
+    for path in segment_paths(directory):
+        records = load_segment(path)
+        if not len(records):
+            continue
+        timestamps = records['timestamp']
+        if (end is not None and timestamps[0] >= end) or (start is not None and timestamps[-1] < start):
+            continue
+        low = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        high = len(records) if end is None else int(np.searchsorted(timestamps, end, side='left'))
+        selected = records[low:high]
+        if symbol is not None:
+            selected = selected[selected['symbol'] == symbol.encode('utf-8')]
+        if kind is not None:
+            selected = selected[selected['kind'] == KINDS.index(kind)]
+        parts.append(np.array(selected))
+    if not parts:
+        return np.zeros(0, dtype=journal_dtype())
+    return np.concatenate(parts)
+
+
+def to_dicts(records):
+    """
+    Converts query() results to plain dicts, e.g. for JSON lines.
+    """
+    return [
+        {
+            'time': datetime.fromtimestamp(timestamp / 1e9, tz=timezone.utc).isoformat(),
+            'kind': KINDS[kind],
+            'side': SIDES[side],
+            'order_type': ORDER_TYPES[order_type],
+            'symbol': symbol.decode('utf-8'),
+            'qty': qty,
+            'price': price,
+            'order_id': order_id.decode('utf-8'),
+        }
+        for timestamp, kind, side, order_type, _, symbol, qty, price, order_id in records.tolist()
+    ]
+
+
+def _parse_time(text):
+    """
+    Parses an ISO date or datetime (UTC unless it has an offset) to ns.
+    """
+    moment = datetime.fromisoformat(text)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1_000_000_000)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Query the order journal')
+    parser.add_argument('directory', nargs='?', default=os.environ.get('ORDER_JOURNAL_DIR', 'journal'))
+    parser.add_argument('--start', type=_parse_time, help='ISO date/time, inclusive')
+    parser.add_argument('--end', type=_parse_time, help='ISO date/time, exclusive')
+    parser.add_argument('--symbol')
+    parser.add_argument('--kind', choices=KINDS[1:])
+    args = parser.parse_args()
+
+    # One JSON object per line
+    for row in to_dicts(query(args.directory, args.start, args.end, args.symbol, args.kind)):
+        print(json.dumps(row))
@@ -0,0 +1,167 @@
+# order_manager.py
+
+import itertools
+import logging
+import time
+
+from symbols import plain_symbol
+from trade_updates import FILL_EVENTS, CLOSED_EVENTS
+
+logger = logging.getLogger('bot')
+
+# Order states. An order is in flight while pending or accepted.
+PENDING = 'pending'    # Reserved; submit_order not answered yet
+ACCEPTED = 'accepted'  # Acknowledged by the exchange, not (fully) filled
+FILLED = 'filled'
+REJECTED = 'rejected'  # Refused, failed before submission, or lost
+CANCELED = 'canceled'  # Canceled or expired at the exchange
+
+FINAL_STATES = (FILLED, REJECTED, CANCELED)
+
+# States each state may move to; anything else is ignored, so a late REST
+# answer cannot undo a fill the trade-update stream already reported
+TRANSITIONS = {
+    PENDING: (ACCEPTED, FILLED, REJECTED, CANCELED),
+    ACCEPTED: (ACCEPTED, FILLED, REJECTED, CANCELED),
+}
+
+
+def _value(field):
+    return getattr(field, 'value', field)
+
+
+class ManagedOrder:
+    """
+    One order from the moment it is reserved until it reaches a final state.
+    """
+    __slots__ = ('client_order_id', 'symbol', 'side', 'state', 'qty', 'order_id', 'reserved_at', 'reason')
+
+    def __init__(self, client_order_id, symbol, side):
+        self.client_order_id = client_order_id
+        self.symbol = symbol
+        self.side = side
+        self.state = PENDING
+        self.qty = None
+        self.order_id = None
+        self.reserved_at = time.monotonic()
+        self.reason = ''
+
+    @property
+    def in_flight(self):
+        return self.state not in FINAL_STATES
+
+
+class OrderManager:
+    """
+    Tracks the orders in flight, at most one per symbol.
+
+    reserve() checks and claims the symbol without awaiting anything, so
+    every caller on the event loop (quotes, web app commands) sees an
+    order as soon as it is started, before submit_order is even called.
+    Each reservation gets its own client_order_id, sent with the order:
+    the exchange refuses a second order with the same id, and after a
+    dropped connection the order can be looked up by it.
+
+    Without a trade-update stream (fills_from_stream False) the
+    submit_order answer is taken as the fill, as the bot always has;
+    otherwise accepted orders stay in flight until their fill, cancel or
+    rejection arrives.
+    """
+
+    def __init__(self, prefix='bot', fills_from_stream=True):
+        self.prefix = prefix
+        self.fills_from_stream = fills_from_stream
+        self.orders = {}      # client_order_id -> ManagedOrder, in flight only
+        self.by_symbol = {}   # symbol -> ManagedOrder, in flight only
+        self.blocked = 0      # Orders not started because one was in flight
+        self.counts = dict.fromkeys((PENDING, ACCEPTED, FILLED, REJECTED, CANCELED), 0)
+        self._sequence = itertools.count(1)
+
+    def in_flight(self, symbol):
+        """
+        Returns the symbol's order in flight, or None.
+        """
+        return self.by_symbol.get(symbol)
+
+    def reserve(self, symbol, side):
+        """
+        Claims symbol for a new order. Returns the pending ManagedOrder, or
+        None when the symbol already has an order in flight.
+        """
+        if symbol in self.by_symbol:
+            self.blocked += 1
+            return None
+        client_order_id = f"{self.prefix}-{plain_symbol(symbol)}-{next(self._sequence)}"
+        order = ManagedOrder(client_order_id, symbol, side)
+        self.orders[client_order_id] = self.by_symbol[symbol] = order
+        self.counts[PENDING] += 1
+        return order
+
+    def _move(self, order, new_state, reason=''):
+        if new_state not in TRANSITIONS.get(order.state, ()):
+            return False
+        if new_state != order.state:
+            self.counts[new_state] += 1
+        order.state = new_state
+        if reason:
+            order.reason = reason
+        if new_state in FINAL_STATES:
+            self.orders.pop(order.client_order_id, None)
+            if self.by_symbol.get(order.symbol) is order:
+                del self.by_symbol[order.symbol]
+        return True
+
+    def acknowledged(self, order, response):
+        """
+        Records submit_order's answer (an alpaca Order).
+        """
+        order.order_id = response.id
+        order.qty = float(response.qty) if response.qty is not None else order.qty
+        status = _value(response.status)
+        if status in CLOSED_EVENTS:
+            self._move(order, CANCELED if status != 'rejected' else REJECTED, status)
+        elif status == 'filled' or not self.fills_from_stream:
+            self._move(order, FILLED)
+        else:
+            self._move(order, ACCEPTED)
+
+    def failed(self, order, reason):
+        """
+        Releases a reservation whose order was refused or never sent.
+        """
+        self._move(order, REJECTED, reason)
+
+    def apply(self, update):
+        """
+        Moves the order a trade update is about. Updates for orders this
+        manager did not start are ignored.
+        """
+        order = self.orders.get(update.order.client_order_id)
+        if order is None:
+            return None
+        event = _value(update.event)
+        if event == 'fill':
+            self._move(order, FILLED)
+        elif event in FILL_EVENTS or event in ('new', 'accepted', 'pending_new'):
+            self._move(order, ACCEPTED)
+        elif event in CLOSED_EVENTS:
+            self._move(order, REJECTED if event == 'rejected' else CANCELED, event)
+        return order
+
+    def expire(self, max_age):
+        """
+        Gives up on accepted orders in flight for longer than max_age
+        seconds, e.g. when their final trade update was missed;
+        reconciliation then settles the position. Pending orders are left
+        alone: their submit_order call is still running. Returns the
+        expired orders.
+        """
+        cutoff = time.monotonic() - max_age
+        expired = [order for order in self.orders.values() if order.state == ACCEPTED and order.reserved_at < cutoff]
+        for order in expired:
+            logger.warning(f"Order {order.client_order_id} still {order.state} after {max_age:.0f} s; no longer tracking it.")
+            self._move(order, REJECTED, 'expired locally')
+        return expired
+
+    def stats(self):
+        return {'in_flight': len(self.orders), 'blocked': self.blocked, **self.counts}
@@ -1,22 +1,16 @@
 import os
-from datetime import datetime
+from order_journal import OrderJournal
 
-def write_order_summary(order_type, symbol, qty, price, side):
-    summary = (
-        f"Order Type: {order_type}\n"
-        f"Symbol: {symbol}\n"
-        f"Quantity: {qty}\n"
-        f"Price: {price}\n"
-        f"Side: {side}\n"
-        f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-        "-------------------------------\n"
-    )
-
-    # Define the summary file path
-    summary_file = "order_summary.txt"
+# Orders are recorded in the binary order journal; query it with
+# python order_journal.py --start 2024-01-01 --kind order
+JOURNAL_DIR = os.environ.get('ORDER_JOURNAL_DIR', 'journal')
+_journal = None
 
-    # Write to the file (append mode)
-    with open(summary_file, "a") as file:
-        file.write(summary)
+def write_order_summary(order_type, symbol, qty, price, side):
+    global _journal
+    if _journal is None:
+        _journal = OrderJournal(JOURNAL_DIR)
 
-    print(f"Order summary written to {summary_file}")
+    # Append the order and write it to disk before returning
+    _journal.append('order', symbol, side, qty, price, order_type=order_type)
+    _journal.flush()
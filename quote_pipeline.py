@@ -0,0 +1,71 @@
+# quote_pipeline.py
+
+import asyncio
+import time
+
+
+class LatestQuoteQueue:
+    """
+    Conflating hand-off between the quote stream and the strategy.
+
+    Only the newest quote per symbol is kept: a quote that arrives while the
+    previous one for the same symbol is still waiting replaces it, so the
+    strategy never works through a backlog of stale prices.
+    """
+
+    def __init__(self):
+        self._latest = {}
+        self._ready = asyncio.Event()
+        self.ticks_received = 0
+        self.ticks_conflated = 0
+        self.ticks_evaluated = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._total_lag = 0.0
+
+    def put(self, symbol, quote):
+        """
+        Stores the quote as the newest for its symbol. Never blocks.
+        """
+        self.ticks_received += 1
+        if symbol in self._latest:
+            self.ticks_conflated += 1
+        # Replacing a key keeps the symbol's place in line
+        self._latest[symbol] = (quote, time.monotonic())
+        self._ready.set()
+
+    async def get(self):
+        """
+        Waits for a quote and returns (symbol, quote, received_at), taking
+        symbols in the order they became pending.
+        """
+        while not self._latest:
+            self._ready.clear()
+            await self._ready.wait()
+        symbol = next(iter(self._latest))
+        quote, received_at = self._latest.pop(symbol)
+        return symbol, quote, received_at
+
+    def record_evaluation(self, received_at):
+        """
+        Records the lag between receiving a quote and starting to evaluate it.
+        """
+        lag = time.monotonic() - received_at
+        self.ticks_evaluated += 1
+        self.last_lag = lag
+        self._total_lag += lag
+        if lag > self.max_lag:
+            self.max_lag = lag
+
+    def __len__(self):
+        return len(self._latest)
+
+    def stats(self):
+        return {
+            'ticks_received': self.ticks_received,
+            'ticks_conflated': self.ticks_conflated,
+            'ticks_evaluated': self.ticks_evaluated,
+            'last_lag_ms': self.last_lag * 1000,
+            'mean_lag_ms': self._total_lag / self.ticks_evaluated * 1000 if self.ticks_evaluated else 0.0,
+            'max_lag_ms': self.max_lag * 1000,
+        }
@@ -0,0 +1,154 @@
+# quote_snapshots.py
+
+import threading
+import time
+
+from alpaca.data.requests import CryptoLatestQuoteRequest
+from alpaca.data.historical import CryptoHistoricalDataClient
+
+# Columns of the DataFrame view, as df_price.get_latest_crypto_quote named them
+FRAME_COLUMNS = ('symbol', 'time', 'ask_price', 'ask_size', 'bid_price', 'bid_size')
+
+
+def snapshot_dtype():
+    """
+    NumPy dtype of get_array() rows.
+    """
+    import numpy as np
+    return np.dtype([
+        ('symbol', 'U16'),
+        ('timestamp', '<i8'),   # ns since the epoch
+        ('bid_price', '<f8'),
+        ('ask_price', '<f8'),
+        ('bid_size', '<f8'),
+        ('ask_size', '<f8'),
+    ])
+
+
+class QuoteSnapshot:
+    """
+    Latest quote for one symbol, with the time it was fetched.
+    """
+    __slots__ = ('symbol', 'timestamp', 'bid_price', 'ask_price', 'bid_size', 'ask_size', 'fetched_at')
+
+    def __init__(self, symbol, timestamp, bid_price, ask_price, bid_size, ask_size, fetched_at):
+        self.symbol = symbol
+        self.timestamp = timestamp
+        self.bid_price = bid_price
+        self.ask_price = ask_price
+        self.bid_size = bid_size
+        self.ask_size = ask_size
+        self.fetched_at = fetched_at
+
+    @classmethod
+    def from_quote(cls, symbol, quote, fetched_at):
+        return cls(symbol, quote.timestamp, float(quote.bid_price), float(quote.ask_price),
+                   float(quote.bid_size), float(quote.ask_size), fetched_at)
+
+
+class QuoteSnapshotService:
+    """
+    Latest crypto quotes for many symbols, cached for ttl seconds.
+
+    One data client (and its HTTP session) is reused for every fetch. All
+    symbols that are missing or expired are fetched in a single request,
+    and callers that arrive while a fetch is running wait for it instead
+    of starting their own.
+    """
+
+    def __init__(self, client=None, ttl=1.0, clock=time.monotonic):
+        self._client = client
+        self.ttl = ttl
+        self._clock = clock
+        self._cache = {}
+        self._lock = threading.Lock()
+        self.requested = 0
+        self.fetches = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = CryptoHistoricalDataClient()
+        return self._client
+
+    @property
+    def cache_hits(self):
+        return self.requested - self.fetches
+
+    def _stale(self, symbols, now):
+        return [
+            symbol for symbol in symbols
+            if symbol not in self._cache or now - self._cache[symbol].fetched_at >= self.ttl
+        ]
+
+    def get(self, symbols):
+        """
+        Returns {symbol: QuoteSnapshot}, fetching only symbols not cached
+        within the last ttl seconds.
+        """
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        self.requested += 1
+        if self._stale(symbols, self._clock()):
+            with self._lock:
+                # Another caller may have fetched them while we waited
+                stale = self._stale(symbols, self._clock())
+                if stale:
+                    self._fetch(stale)
+        return {symbol: self._cache[symbol] for symbol in symbols if symbol in self._cache}
+
+    def _fetch(self, symbols):
+        quotes = self.client.get_crypto_latest_quote(CryptoLatestQuoteRequest(symbol_or_symbols=symbols))
+        self.fetches += 1
+        fetched_at = self._clock()
+        for symbol, quote in quotes.items():
+            self._cache[symbol] = QuoteSnapshot.from_quote(symbol, quote, fetched_at)
+
+    def get_one(self, symbol):
+        """
+        Returns the QuoteSnapshot for one symbol, or None if Alpaca has none.
+        """
+        return self.get([symbol]).get(symbol)
+
+    def get_array(self, symbols):
+        """
+        Returns the snapshots as a NumPy structured array (see snapshot_dtype).
+        """
+        import numpy as np
+        snapshots = self.get(symbols)
+        rows = [
+            (s.symbol, _timestamp_ns(s.timestamp), s.bid_price, s.ask_price, s.bid_size, s.ask_size)
+            for s in snapshots.values()
+        ]
+        return np.array(rows, dtype=snapshot_dtype())
+
+    def get_frame(self, symbols):
+        """
+        Returns the snapshots as a pandas DataFrame, one row per symbol.
+        """
+        import pandas as pd
+        snapshots = self.get(symbols)
+        return pd.DataFrame(
+            [(s.symbol, s.timestamp, s.ask_price, s.ask_size, s.bid_price, s.bid_size) for s in snapshots.values()],
+            columns=FRAME_COLUMNS,
+        )
+
+
+def _timestamp_ns(timestamp):
+    if timestamp is None:
+        return 0
+    return int(timestamp.timestamp() * 1_000_000_000)
+
+
+# Shared by every caller in the process
+_default_service = None
+
+
+def default_service():
+    """
+    Returns the process-wide QuoteSnapshotService, creating it on first use.
+    """
+    global _default_service
+    if _default_service is None:
+        _default_service = QuoteSnapshotService()
+    return _default_service
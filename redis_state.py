@@ -0,0 +1,215 @@
+# redis_state.py
+
+import json
+import logging
+import time
+
+logger = logging.getLogger('bot')
+
+# Marks a field as absent in StatePublisher's view of the hash
+_ABSENT = object()
+
+
+def redis_tls_kwargs(url):
+    """
+    Connection options for the URL scheme.
+    """
+    if url.startswith('rediss://'):
+        # SSL/TLS connection to Heroku Redis
+        return {'ssl_cert_reqs': None}  # Disables SSL certificate verification
+    # Non-SSL connection (local development)
+    return {}
+
+
+class StatePublisher:
+    """
+    Keeps a local shadow of the bot_state hash and coalesces field writes.
+
+    Callers set fields as often as they like; only fields whose value changed
+    since the last flush are sent, as one pipelined HSET/HDEL round trip. The
+    same round trip publishes the changes on channel for live dashboards
+    and increments version_key, which the web app uses as an ETag. Changes
+    are compared with the hash as it will be once any flush still in
+    flight has landed.
+    """
+
+    def __init__(self, redis_client, key='bot_state', flush_interval=0.25, channel='bot_state_updates',
+                 version_key='bot_state:version'):
+        self.redis_client = redis_client
+        self.key = key
+        self.channel = channel
+        self.version_key = version_key
+        self.flush_interval = flush_interval
+        self._shadow = {}
+        self._dirty = {}
+        self._deleted = set()
+        # Fields being written by the flush awaiting Redis: value or _ABSENT
+        self._in_flight = {}
+        # Only one flush runs at a time; a flush requested meanwhile is
+        # done by the running one as soon as its round trip lands
+        self._flushing = False
+        self._flush_again = False
+        self._last_flush = 0.0
+        # Round trips a write-per-update client would have made
+        self.requested = 0
+        # Round trips actually made
+        self.round_trips = 0
+
+    @property
+    def round_trips_saved(self):
+        return self.requested - self.round_trips
+
+    def set(self, field, value):
+        """
+        Records a field value; it is written on the next flush if it changed.
+        """
+        self.requested += 1
+        if field not in self._deleted:
+            in_flight = self._in_flight
+            current = in_flight[field] if field in in_flight else self._shadow.get(field, _ABSENT)
+            if current == value:
+                self._dirty.pop(field, None)
+                return
+        self._dirty[field] = value
+        self._deleted.discard(field)
+
+    def delete(self, field):
+        """
+        Removes a field from the hash on the next flush.
+        """
+        self.requested += 1
+        self._dirty.pop(field, None)
+        current = self._in_flight[field] if field in self._in_flight else self._shadow.get(field, _ABSENT)
+        if current is not _ABSENT:
+            self._deleted.add(field)
+
+    def pending(self):
+        return bool(self._dirty or self._deleted)
+
+    async def flush(self):
+        """
+        Writes all pending changes in a single pipelined round trip. While
+        another flush is running, leaves the changes to it instead, so an
+        older pipeline can never land after a newer one.
+        """
+        self._last_flush = time.monotonic()
+        if self._flushing:
+            self._flush_again = True
+            return
+        self._flushing = True
+        try:
+            while await self._flush_once() and self._flush_again:
+                self._flush_again = False
+        finally:
+            self._flushing = False
+            self._flush_again = False
+
+    async def _flush_once(self):
+        """
+        One pipelined round trip; returns False if it failed.
+        """
+        if self.redis_client is None or not self.pending():
+            return True
+        # Swap the pending changes out so updates made while awaiting are kept
+        dirty, self._dirty = self._dirty, {}
+        deleted, self._deleted = self._deleted, set()
+        self._in_flight = {**dirty, **dict.fromkeys(deleted, _ABSENT)}
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            if dirty:
+                pipe.hset(self.key, mapping=dirty)
+            if deleted:
+                pipe.hdel(self.key, *deleted)
+            # After the writes, so a reader never pairs new data with an old version
+            if self.version_key:
+                pipe.incr(self.version_key)
+            if self.channel:
+                update = {'set': {field: str(value) for field, value in dirty.items()}, 'deleted': sorted(deleted)}
+                pipe.publish(self.channel, json.dumps(update))
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Error flushing bot state to Redis: {e}")
+            self._restore(dirty, deleted)
+            return False
+        except BaseException:
+            # Cancelled: the write may or may not have landed
+            self._restore(dirty, deleted)
+            raise
+        self.round_trips += 1
+        self._shadow.update(dirty)
+        for field in deleted:
+            self._shadow.pop(field, None)
+        self._in_flight = {}
+        return True
+
+    def _restore(self, dirty, deleted):
+        # Put the changes back so the next flush retries them
+        self._in_flight = {}
+        for field, value in dirty.items():
+            if field not in self._deleted:
+                self._dirty.setdefault(field, value)
+        for field in deleted:
+            if field not in self._dirty:
+                self._deleted.add(field)
+
+    async def maybe_flush(self):
+        """
+        Flushes only if flush_interval has passed since the last flush.
+        """
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            await self.flush()
+
+    def stats(self):
+        return {
+            'requested': self.requested,
+            'round_trips': self.round_trips,
+            'round_trips_saved': self.round_trips_saved,
+        }
+
+
+class ConfigCache:
+    """
+    Local copy of the bot_config hash, re-read by a background task.
+    """
+
+    def __init__(self, redis_client, key='bot_config'):
+        self.redis_client = redis_client
+        self.key = key
+        self._values = {}
+        self.requested = 0
+        self.round_trips = 0
+
+    @property
+    def round_trips_saved(self):
+        return self.requested - self.round_trips
+
+    async def refresh(self):
+        if self.redis_client is None:
+            return
+        try:
+            values = await self.redis_client.hgetall(self.key)
+        except Exception as e:
+            logger.error(f"Error reading bot config from Redis: {e}")
+            return
+        self.round_trips += 1
+        self._values = {k.decode('utf-8'): v for k, v in values.items()}
+
+    def seed(self, values):
+        """
+        Fills the cache from saved values until the first refresh succeeds.
+        """
+        if not self.round_trips:
+            self._values = {**values, **self._values}
+
+    def get_float(self, field, default):
+        """
+        Returns a float config value from the last refresh.
+        """
+        self.requested += 1
+        value = self._values.get(field)
+        if value is None:
+            return default
+        try:
+            return float(value)
+        except ValueError:
+            return default
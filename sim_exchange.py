@@ -0,0 +1,233 @@
+# sim_exchange.py
+
+import asyncio
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+
+from alpaca.trading.enums import OrderSide
+
+from symbols import plain_symbol
+
+
+class LocalTradingStream:
+    """
+    In-process stand-in for alpaca's TradingStream. push() may be called
+    from any thread; updates reach the handler in order on the loop that
+    runs _run_forever().
+    """
+
+    def __init__(self):
+        self.delivered = 0
+        self._handler = None
+        self._loop = None
+        self._queue = None
+        self._backlog = []
+
+    def subscribe_trade_updates(self, handler):
+        self._handler = handler
+
+    def push(self, update):
+        if self._loop is None:
+            self._backlog.append(update)
+        else:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, update)
+
+    async def _run_forever(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        for update in self._backlog:
+            self._queue.put_nowait(update)
+        self._backlog = []
+        while True:
+            update = await self._queue.get()
+            try:
+                await self._handler(update)
+                self.delivered += 1
+            finally:
+                self._queue.task_done()
+
+    async def drain(self):
+        """
+        Waits until every pushed update has been handled.
+        """
+        # Updates pushed from worker threads land on the next loop iteration
+        await asyncio.sleep(0)
+        if self._queue is not None:
+            await self._queue.join()
+
+
+class SimulatedTradeUpdate:
+    """
+    Trade update shaped like alpaca's TradeUpdate.
+    """
+    __slots__ = ('event', 'order', 'price', 'qty', 'position_qty', 'execution_id', 'timestamp')
+
+    def __init__(self, event, order, price=None, qty=None, position_qty=None):
+        self.event = event
+        self.order = order
+        self.price = price
+        self.qty = qty
+        self.position_qty = position_qty
+        self.execution_id = None
+        self.timestamp = None
+
+
+
+class SimulatedOrder:
+    """
+    Filled market order shaped like alpaca's Order.
+    """
+    __slots__ = ('id', 'client_order_id', 'symbol', 'side', 'qty', 'filled_qty', 'filled_avg_price', 'status')
+
+    def __init__(self, id, client_order_id, symbol, side, qty, price):
+        self.id = id
+        self.client_order_id = client_order_id
+        self.symbol = symbol
+        self.side = side
+        self.qty = qty
+        self.filled_qty = qty
+        self.filled_avg_price = price
+        self.status = 'filled'
+
+    def unfilled(self):
+        """
+        This order as Alpaca acknowledges a market order that has not
+        filled yet.
+        """
+        ack = SimulatedOrder(self.id, self.client_order_id, self.symbol, self.side, self.qty, None)
+        ack.filled_qty = '0'
+        ack.status = 'accepted'
+        return ack
+
+
+class SimulatedTradingClient:
+    """
+    In-process stand-in for the TradingClient methods the bot uses.
+
+    Market orders fill in full against the last quote fed in with
+    set_quote: buys at the ask, sells at the bid, each moved against the
+    order by slippage_bps. The fee (fee_bps of the notional) is folded
+    into the fill price, so cash, positions and the trade-update stream
+    agree the way they do at Alpaca. Every call first sleeps latency
+    seconds; the bot makes calls from worker threads, so quotes keep
+    arriving meanwhile and the fill uses the quote current after the
+    delay. With a trade_stream, each order is also reported as 'new' and
+    'fill' trade updates. Only the newest order_history orders are kept.
+    Like Alpaca, an order reusing a kept order's client_order_id is
+    refused, and get_order_by_client_id finds kept orders. With
+    order_ack='accepted', submit_order answers the way Alpaca usually
+    does, before the fill (status 'accepted', filled_qty '0').
+    """
+
+    def __init__(self, cash=100000.0, trade_stream=None, slippage_bps=0.0, fee_bps=0.0, latency=0.0,
+                 order_history=1000, order_ack='filled'):
+        if order_ack not in ('filled', 'accepted'):
+            raise ValueError(f"order_ack must be 'filled' or 'accepted', not {order_ack!r}")
+        self.cash = cash
+        self.trade_stream = trade_stream
+        self.slippage = slippage_bps / 10000
+        self.fee = fee_bps / 10000
+        self.latency = latency
+        self.order_ack = order_ack
+        self.positions = {}
+        self.quotes = {}
+        self.orders = deque(maxlen=order_history)
+        self.order_history = order_history
+        self.orders_by_client_id = {}
+        self.duplicates_refused = 0
+        self.order_count = 0
+        self.fees_paid = 0.0
+        self._order_ids = itertools.count(1)
+        # Orders can be submitted from several worker threads at once
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, cash=None, trade_stream=None):
+        """
+        Builds a simulator configured by SIM_CASH, SIM_SLIPPAGE_BPS,
+        SIM_FEE_BPS, SIM_LATENCY_MS and SIM_ORDER_ACK.
+        """
+        return cls(
+            cash=float(os.environ.get('SIM_CASH', 100000.0)) if cash is None else cash,
+            trade_stream=trade_stream,
+            slippage_bps=float(os.environ.get('SIM_SLIPPAGE_BPS', 0)),
+            fee_bps=float(os.environ.get('SIM_FEE_BPS', 0)),
+            latency=float(os.environ.get('SIM_LATENCY_MS', 0)) / 1000,
+            order_ack=os.environ.get('SIM_ORDER_ACK', 'filled'),
+        )
+
+    def set_quote(self, symbol, bid_price, ask_price):
+        self.quotes[plain_symbol(symbol)] = (bid_price, ask_price)
+
+    def get_account(self):
+        if self.latency:
+            time.sleep(self.latency)
+        return SimpleNamespace(cash=self.cash, buying_power=self.cash, status='ACTIVE')
+
+    def get_all_positions(self):
+        if self.latency:
+            time.sleep(self.latency)
+        return [
+            SimpleNamespace(symbol=symbol, qty=qty, avg_entry_price=avg_price)
+            for symbol, (qty, avg_price) in self.positions.items()
+        ]
+
+    def get_order_by_client_id(self, client_id):
+        if self.latency:
+            time.sleep(self.latency)
+        order = self.orders_by_client_id.get(client_id)
+        if order is None:
+            raise ValueError("order not found")
+        return order
+
+    def submit_order(self, order_data):
+        if self.latency:
+            time.sleep(self.latency)
+        symbol = plain_symbol(order_data.symbol)
+        qty = float(order_data.qty)
+        client_order_id = getattr(order_data, 'client_order_id', None)
+        with self._lock:
+            if client_order_id is not None and client_order_id in self.orders_by_client_id:
+                self.duplicates_refused += 1
+                raise ValueError("client_order_id must be unique")
+            bid_price, ask_price = self.quotes[symbol]
+            held, avg_price = self.positions.get(symbol, (0.0, 0.0))
+            if order_data.side == OrderSide.BUY:
+                price = ask_price * (1 + self.slippage)
+                fee = qty * price * self.fee
+                price += fee / qty
+                if qty * price > self.cash:
+                    raise ValueError("insufficient balance")
+                self.cash -= qty * price
+                total = held + qty
+                self.positions[symbol] = (total, (held * avg_price + qty * price) / total)
+            else:
+                price = bid_price * (1 - self.slippage)
+                if qty > held + 1e-12:
+                    raise ValueError("insufficient qty available for order")
+                fee = qty * price * self.fee
+                price -= fee / qty
+                self.cash += qty * price
+                remaining = held - qty
+                if remaining > 1e-12:
+                    self.positions[symbol] = (remaining, avg_price)
+                else:
+                    self.positions.pop(symbol, None)
+            self.fees_paid += fee
+            self.order_count += 1
+            order = SimulatedOrder(next(self._order_ids), client_order_id, symbol, order_data.side, qty, price)
+            self.orders.append(order)
+            if client_order_id is not None:
+                self.orders_by_client_id[client_order_id] = order
+                if len(self.orders_by_client_id) > self.order_history:
+                    # Dicts keep insertion order: drop the oldest
+                    del self.orders_by_client_id[next(iter(self.orders_by_client_id))]
+            position_qty = self.positions.get(symbol, (0.0, 0.0))[0]
+        if self.trade_stream is not None:
+            self.trade_stream.push(SimulatedTradeUpdate('new', order))
+            self.trade_stream.push(SimulatedTradeUpdate('fill', order, price, qty, position_qty))
+        return order.unfilled() if self.order_ack == 'accepted' else order
@@ -0,0 +1,93 @@
+# startup_snapshot.py
+
+import json
+import logging
+import time
+
+logger = logging.getLogger('bot')
+
+# Hash with one field per bot worker holding its last saved snapshot
+SNAPSHOT_KEY = 'bot_snapshot'
+# Bumped whenever the snapshot layout changes; other versions are ignored
+SNAPSHOT_VERSION = 1
+
+
+def build_snapshot(symbol_states, thresholds, account):
+    """
+    The state a restarted worker needs before its first tick: each
+    symbol's position and entry threshold, and the account balances.
+    """
+    return {
+        'version': SNAPSHOT_VERSION,
+        'saved_at': time.time(),
+        'symbols': {
+            sym.symbol: {'qty': sym.qty, 'entry_price': sym.entry_price, 'threshold': thresholds.get(sym.symbol)}
+            for sym in symbol_states
+        },
+        'account': account,
+    }
+
+
+class SnapshotStore:
+    """
+    Saves and loads one worker's snapshot in the bot_snapshot hash.
+
+    The bot saves it whenever a position changes (dirty is set), every
+    interval seconds and on shutdown, so a restart can trade on it before
+    REST has answered. Snapshots older than max_age or of another
+    version are not used.
+    """
+
+    def __init__(self, redis_client, field, interval=5.0, max_age=3600.0, key=SNAPSHOT_KEY):
+        self.redis_client = redis_client
+        self.field = field
+        self.interval = interval
+        self.max_age = max_age
+        self.key = key
+        self.dirty = False
+        self.saves = 0
+        self._last_save = 0.0
+
+    def due(self):
+        return self.dirty or time.monotonic() - self._last_save >= self.interval
+
+    async def save(self, snapshot):
+        if self.redis_client is None:
+            return
+        self.dirty = False
+        self._last_save = time.monotonic()
+        try:
+            await self.redis_client.hset(self.key, self.field, json.dumps(snapshot))
+            self.saves += 1
+        except Exception as e:
+            self.dirty = True
+            logger.error(f"Error saving startup snapshot: {e}")
+
+    async def load(self):
+        """
+        Returns the saved snapshot, or None when there is no usable one.
+        """
+        if self.redis_client is None:
+            return None
+        try:
+            raw = await self.redis_client.hget(self.key, self.field)
+        except Exception as e:
+            logger.error(f"Error loading startup snapshot: {e}")
+            return None
+        if raw is None:
+            logger.info("No startup snapshot saved yet.")
+            return None
+        try:
+            snapshot = json.loads(raw)
+        except ValueError:
+            logger.warning("Ignoring unreadable startup snapshot.")
+            return None
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            logger.warning(f"Ignoring version {snapshot.get('version')} startup snapshot (expected {SNAPSHOT_VERSION}).")
+            return None
+        age = time.time() - snapshot.get('saved_at', 0)
+        if age > self.max_age:
+            logger.warning(f"Ignoring startup snapshot saved {age:.0f} s ago (limit {self.max_age:.0f} s).")
+            return None
+        snapshot['age'] = age
+        return snapshot
@@ -0,0 +1,44 @@
+# strategy.py
+
+# Trading parameters shared by the live bot and the backtester
+PROFIT_TARGET = 5          # Profit target in percentage
+STOP_LOSS = -2             # Stop loss in percentage
+DEFAULT_ENTRY_THRESHOLD = 60000
+BUYING_POWER_DIVISOR = 3   # Each entry uses a third of the buying power
+
+# Exit reasons, as logged by the bot
+PROFIT_TARGET_REASON = 'Profit target reached'
+STOP_LOSS_REASON = 'Stop-loss triggered'
+
+
+def profit_percentage(price, entry_price):
+    """
+    Returns the open profit of a position in percent.
+    """
+    return ((price - entry_price) / entry_price) * 100
+
+
+def should_enter(price, entry_threshold):
+    """
+    Returns True when a flat bot should buy at price.
+    """
+    return price <= entry_threshold
+
+
+def exit_reason(profit_pct, profit_target=PROFIT_TARGET, stop_loss=STOP_LOSS):
+    """
+    Returns the reason to close a position with the given open profit, or
+    None to keep holding. The profit target is checked first.
+    """
+    if profit_pct >= profit_target:
+        return PROFIT_TARGET_REASON
+    if profit_pct <= stop_loss:
+        return STOP_LOSS_REASON
+    return None
+
+
+def order_quantity(buying_power, price):
+    """
+    Returns the quantity bought at price for one entry.
+    """
+    return (buying_power / BUYING_POWER_DIVISOR) / price
@@ -0,0 +1,100 @@
+# symbols.py
+
+import json
+
+
+def plain_symbol(symbol):
+    """
+    The trading API's spelling of a data stream symbol: 'BTC/USD' -> 'BTCUSD'.
+    """
+    return symbol.replace('/', '')
+
+
+def parse_symbols(text):
+    """
+    Parses a comma-separated symbol list such as 'BTC/USD,ETH/USD'.
+    """
+    symbols = []
+    for symbol in text.split(','):
+        symbol = symbol.strip().upper()
+        if symbol and symbol not in symbols:
+            symbols.append(symbol)
+    if not symbols:
+        raise ValueError("No symbols configured")
+    return symbols
+
+
+def shard_from_dyno(dyno, default=0):
+    """
+    Returns the zero-based shard index for a Heroku DYNO name like 'worker.3'.
+    """
+    try:
+        return int(dyno.rsplit('.', 1)[1]) - 1
+    except (AttributeError, IndexError, ValueError):
+        return default
+
+
+def shard_symbols(symbols, shard_index, shard_count):
+    """
+    Returns this shard's part of the symbol list. Symbols are dealt out
+    round-robin, so every process must be given the same list.
+    """
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(f"Shard index {shard_index} is outside 0..{shard_count - 1}")
+    return symbols[shard_index::shard_count]
+
+
+class SymbolState:
+    """
+    Trading state for one symbol. The Redis field names used on every tick
+    are built once here. The primary symbol keeps the original unsuffixed
+    bot_state fields and falls back to the global ENTRY_THRESHOLD; every
+    other symbol uses '<field>:<symbol>'.
+    """
+    __slots__ = (
+        'symbol', 'key', 'primary', 'latest_price', 'entry_price', 'qty',
+        'threshold_field', 'price_field', 'position_field', 'pnl_field', 'status_field',
+        'indicators_field', 'indicators', 'bars',
+    )
+
+    def __init__(self, symbol, primary=False):
+        self.symbol = symbol
+        self.key = plain_symbol(symbol)
+        self.primary = primary
+        self.latest_price = None
+        self.entry_price = 0.0
+        self.qty = 0.0  # 0 while flat
+        suffix = '' if primary else f':{symbol}'
+        self.threshold_field = f'ENTRY_THRESHOLD:{symbol}'
+        self.price_field = 'latest_price' + suffix
+        self.position_field = 'position' + suffix
+        self.pnl_field = 'pnl' + suffix
+        self.status_field = 'status' + suffix
+        self.indicators_field = 'indicators' + suffix
+        self.indicators = None  # Optional indicators.IndicatorSet fed by bot.track_quote
+        self.bars = None  # Optional bars.BarBuilder fed by bot.track_quote
+
+    @property
+    def position(self):
+        """
+        The open position as the dict published to bot_state, or None.
+        """
+        if not self.qty:
+            return None
+        return {'entry_price': self.entry_price, 'qty': self.qty}
+
+    def open(self, entry_price, qty):
+        self.entry_price = entry_price
+        self.qty = qty
+
+    def close(self):
+        self.entry_price = 0.0
+        self.qty = 0.0
+
+    def position_json(self):
+        return json.dumps(self.position)
+
+    def pnl(self):
+        if self.qty and self.latest_price:
+            return (self.latest_price - self.entry_price) * self.qty
+        return 0.0
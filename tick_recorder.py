@@ -0,0 +1,136 @@
+# tick_recorder.py
+
+import os
+import struct
+
+# File layout: a 32-byte header, then fixed-width little-endian records of
+# (timestamp ns, bid, ask, bid size, ask size). Records are only ever
+# appended, so the file can be memory-mapped while it is being written.
+MAGIC = b'BOTTICK1'
+HEADER = struct.Struct('<8sII16s')   # magic, version, record size, symbol
+RECORD = struct.Struct('<qdddd')
+VERSION = 1
+HEADER_SIZE = HEADER.size
+RECORD_SIZE = RECORD.size
+
+
+def tick_dtype():
+    """
+    NumPy dtype matching one record, for np.memmap.
+    """
+    import numpy as np
+    return np.dtype([
+        ('timestamp', '<i8'),
+        ('bid_price', '<f8'),
+        ('ask_price', '<f8'),
+        ('bid_size', '<f8'),
+        ('ask_size', '<f8'),
+    ])
+
+
+class Tick:
+    """
+    Quote read back from a tick file, shaped like Alpaca's Quote.
+    """
+    __slots__ = ('symbol', 'timestamp', 'bid_price', 'ask_price', 'bid_size', 'ask_size')
+
+    def __init__(self, symbol, timestamp, bid_price, ask_price, bid_size, ask_size):
+        self.symbol = symbol
+        self.timestamp = timestamp
+        self.bid_price = bid_price
+        self.ask_price = ask_price
+        self.bid_size = bid_size
+        self.ask_size = ask_size
+
+
+def _timestamp_ns(timestamp):
+    if timestamp is None:
+        return 0
+    if isinstance(timestamp, (int, float)):
+        return int(timestamp)
+    return int(timestamp.timestamp() * 1_000_000_000)
+
+
+class TickRecorder:
+    """
+    Appends quotes to a tick file through a write buffer. Call flush()
+    periodically and close() on shutdown.
+    """
+
+    def __init__(self, path, symbol, buffer_records=4096):
+        self.path = path
+        self.symbol = symbol
+        self.buffer_records = buffer_records
+        self.recorded = 0
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not new_file:
+            read_header(path)  # Refuse to append to a different format
+        self._file = open(path, 'ab')
+        if new_file:
+            self._file.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE, symbol.encode('utf-8')))
+        else:
+            # Drop a partial record left by a crash so the records stay aligned
+            size = os.path.getsize(path)
+            partial = (size - HEADER_SIZE) % RECORD_SIZE
+            if partial:
+                self._file.truncate(size - partial)
+        self._buffer = bytearray()
+        self._pending = 0
+
+    def record(self, quote):
+        self._buffer += RECORD.pack(
+            _timestamp_ns(quote.timestamp),
+            float(quote.bid_price),
+            float(quote.ask_price),
+            float(quote.bid_size),
+            float(quote.ask_size),
+        )
+        self._pending += 1
+        self.recorded += 1
+        if self._pending >= self.buffer_records:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._file.flush()
+            self._buffer = bytearray()
+            self._pending = 0
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+def read_header(path):
+    """
+    Returns (symbol, record count) for a tick file.
+    """
+    with open(path, 'rb') as file:
+        magic, version, record_size, symbol = HEADER.unpack(file.read(HEADER_SIZE))
+    if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+        raise ValueError(f"{path} is not a version {VERSION} tick file")
+    count = (os.path.getsize(path) - HEADER_SIZE) // RECORD_SIZE
+    return symbol.rstrip(b'\0').decode('utf-8'), count
+
+
+def load_ticks(path):
+    """
+    Memory-maps the complete records of a tick file as a structured array.
+    """
+    import numpy as np
+    _, count = read_header(path)
+    if count == 0:
+        return np.zeros(0, dtype=tick_dtype())
+    return np.memmap(path, dtype=tick_dtype(), mode='r', offset=HEADER_SIZE, shape=(count,))
+
+
+def iter_ticks(path, chunk_records=65536):
+    """
+    Yields Tick objects from a tick file, converting a chunk at a time.
+    """
+    symbol, _ = read_header(path)
+    ticks = load_ticks(path)
+    for start in range(0, len(ticks), chunk_records):
+        for timestamp, bid, ask, bid_size, ask_size in ticks[start:start + chunk_records].tolist():
+            yield Tick(symbol, timestamp, bid, ask, bid_size, ask_size)
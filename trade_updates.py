@@ -0,0 +1,103 @@
+# trade_updates.py
+
+from symbols import plain_symbol
+
+from collections import OrderedDict
+
+FILL_EVENTS = ('fill', 'partial_fill')
+CLOSED_EVENTS = ('canceled', 'expired', 'rejected', 'replaced', 'done_for_day')
+
+
+def _event(update):
+    event = update.event
+    return getattr(event, 'value', event)
+
+
+def _is_buy(side):
+    return getattr(side, 'value', side) == 'buy'
+
+
+class PositionBook:
+    """
+    Positions and cash kept current from Alpaca trade updates.
+
+    Fills are applied by the change in each order's cumulative filled_qty,
+    so duplicated or out-of-order fills are not double counted. The
+    filled qty is remembered for the order_history most recently updated
+    orders, finished ones included, so a fill replayed after a stream
+    reconnect is recognised.
+    """
+
+    def __init__(self, order_history=10000):
+        self.positions = {}
+        self.cash = None
+        self.fills_applied = 0
+        self.order_history = order_history
+        self._filled = OrderedDict()
+
+    def load(self, positions, cash):
+        """
+        Replaces the book with a REST snapshot.
+        """
+        self.positions = {
+            plain_symbol(pos.symbol): (float(pos.qty), float(pos.avg_entry_price)) for pos in positions
+        }
+        self.cash = float(cash)
+
+    def position(self, symbol):
+        """
+        Returns (qty, avg_entry_price) for symbol, or None when flat.
+        """
+        return self.positions.get(plain_symbol(symbol))
+
+    def apply(self, update):
+        """
+        Applies one trade update. Returns (symbol, cash delta) when it
+        changed the book, otherwise None.
+        """
+        event = _event(update)
+        order = update.order
+        if event not in FILL_EVENTS:
+            return None
+
+        filled = float(order.filled_qty or 0)
+        delta = filled - self._filled.get(order.id, 0.0)
+        if delta <= 0:
+            return None
+        self._filled[order.id] = filled
+        self._filled.move_to_end(order.id)
+        if len(self._filled) > self.order_history:
+            self._filled.popitem(last=False)
+
+        price = float(update.price if getattr(update, 'price', None) is not None else order.filled_avg_price)
+        symbol = plain_symbol(order.symbol)
+        qty, avg_price = self.positions.get(symbol, (0.0, 0.0))
+        if _is_buy(order.side):
+            total = qty + delta
+            self.positions[symbol] = (total, (qty * avg_price + delta * price) / total)
+            cash_delta = -delta * price
+        else:
+            remaining = qty - delta
+            if remaining > 1e-12:
+                self.positions[symbol] = (remaining, avg_price)
+            else:
+                self.positions.pop(symbol, None)
+            cash_delta = delta * price
+        if self.cash is not None:
+            self.cash += cash_delta
+        self.fills_applied += 1
+        return symbol, cash_delta
+
+    def diff(self, positions, cash, tolerance=1e-6):
+        """
+        Lists differences between the book and a REST snapshot.
+        """
+        differences = []
+        rest = {plain_symbol(pos.symbol): float(pos.qty) for pos in positions}
+        for symbol in sorted(set(rest) | set(self.positions)):
+            book_qty = self.positions.get(symbol, (0.0, 0.0))[0]
+            if abs(book_qty - rest.get(symbol, 0.0)) > tolerance:
+                differences.append(f"{symbol} qty {book_qty} != {rest.get(symbol, 0.0)}")
+        if self.cash is not None and abs(self.cash - float(cash)) > 0.01:
+            differences.append(f"cash {self.cash:.2f} != {float(cash):.2f}")
+        return differences